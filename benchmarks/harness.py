@@ -0,0 +1,164 @@
+""" Timing, statistics and baselines for the benchmark suite. """
+
+from __future__ import annotations
+
+import json
+import platform
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+
+class Result:
+    """Latency samples of one benchmark, in seconds per operation"""
+
+    name: str
+    samples: List[float]
+
+    def __init__(self, name: str, samples: List[float]) -> None:
+        self.name = name
+        self.samples = sorted(samples)
+
+    @property
+    def ops_per_second(self) -> float:
+        """Returns the throughput over every sample"""
+        return len(self.samples) / sum(self.samples)
+
+    def percentile(self, percent: float) -> float:
+        """Returns the latency below which the given percent of samples fall"""
+        index = round(percent / 100 * (len(self.samples) - 1))
+        return self.samples[index]
+
+    @property
+    def p50(self) -> float:
+        """Returns the median latency"""
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> float:
+        """Returns the 99th percentile latency"""
+        return self.percentile(99)
+
+    def to_dict(self) -> Dict[str, float]:
+        """Returns the summary stored in baselines"""
+        return {
+            "ops_per_second": self.ops_per_second,
+            "p50": self.p50,
+            "p99": self.p99,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name:<32} {self.ops_per_second:>14,.0f} ops/s"
+            + f"  p50 {_format_seconds(self.p50):>10}"
+            + f"  p99 {_format_seconds(self.p99):>10}"
+        )
+
+
+def _format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def run(
+    name: str,
+    func: Callable[[], Any],
+    iterations: int = 1000,
+    batch: int = 100,
+    warmup: int = 1,
+) -> Result:
+    """
+    Times a synchronous operation.
+
+    Each sample times `batch` calls and records the mean, so the cost of the timer
+    itself doesn't swamp operations that take microseconds.
+    """
+
+    for _ in range(warmup * batch):
+        func()
+
+    samples: List[float] = []
+    for _ in range(max(iterations // batch, 1)):
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        samples.append((time.perf_counter() - start) / batch)
+
+    return Result(name, samples)
+
+
+async def run_async(
+    name: str,
+    func: Callable[[], Awaitable[Any]],
+    iterations: int = 100,
+    warmup: int = 1,
+) -> Result:
+    """Times an asynchronous operation, one sample per call"""
+
+    for _ in range(warmup):
+        await func()
+
+    samples: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - start)
+
+    return Result(name, samples)
+
+
+def save_baseline(results: List[Result], path: str) -> None:
+    """Writes the results to a JSON baseline"""
+
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {result.name: result.to_dict() for result in results},
+    }
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, Dict[str, float]]:
+    """Returns the results stored in a baseline, by benchmark name"""
+
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+
+def compare(
+    results: List[Result],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float = 0.1,
+) -> List[str]:
+    """
+    Prints how each result moved against the baseline.
+
+    :param threshold: Fraction of throughput a benchmark may lose before it counts
+    as a regression.
+    :return: The names of the benchmarks that regressed.
+    """
+
+    regressions: List[str] = []
+
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            print(f"{result.name:<32} new")
+            continue
+
+        change = result.ops_per_second / previous["ops_per_second"] - 1
+        p99_change = result.p99 / previous["p99"] - 1
+        regressed = change < -threshold
+
+        print(
+            f"{result.name:<32} {change:>+8.1%} ops/s  {p99_change:>+8.1%} p99"
+            + ("  REGRESSION" if regressed else "")
+        )
+
+        if regressed:
+            regressions.append(result.name)
+
+    return regressions
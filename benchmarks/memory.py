@@ -0,0 +1,81 @@
+""" Measures the memory held by each Device, including its valves and schedules.
+
+Run with `poetry run python -m benchmarks.memory`.
+"""
+
+import argparse
+import asyncio
+import gc
+import tracemalloc
+from types import SimpleNamespace
+
+from melnor_bluetooth import protocol
+from melnor_bluetooth.constants import (
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+    VALVE_MODE_UUIDS,
+    VALVE_ON_OFF_UUID,
+)
+from melnor_bluetooth.device import Device
+from melnor_bluetooth.utils import date
+
+MANUAL_SETTINGS = protocol.encode_manual_settings([(True, 10)] * 4)
+MANUAL_STATES = protocol.MANUAL_STATES_STRUCT.pack(1, 0, 1, 0, 1, 0, 1, 0)
+ON_OFF = protocol.encode_on_off([True] * 4)
+
+
+def _populated_device(ble_device) -> Device:
+    """Builds a device in the state it's in after a full fetch"""
+
+    device = Device(ble_device)
+    mode = protocol.encode_mode((date.get_timestamp(), 10, 24))
+
+    # pylint: disable=protected-access
+    device._update_state(VALVE_MANUAL_SETTINGS_UUID, MANUAL_SETTINGS)
+    device._update_state(VALVE_MANUAL_STATES_UUID, MANUAL_STATES)
+    device._update_state(VALVE_ON_OFF_UUID, ON_OFF)
+    for uuid in VALVE_MODE_UUIDS:
+        device._update_state(uuid, mode)
+
+    # Reading the schedule computes and caches its derived fields
+    for valve in device.valves:
+        _ = valve.frequency.next_run_time
+
+    return device
+
+
+async def measure(count: int) -> float:
+    """Returns the bytes allocated per populated device"""
+
+    ble_devices = [
+        SimpleNamespace(address=f"00:00:00:00:{i // 256:02X}:{i % 256:02X}")
+        for i in range(count)
+    ]
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    devices = [_populated_device(ble_device) for ble_device in ble_devices]
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(devices) == count
+
+    return (after - before) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=1000)
+    args = parser.parse_args()
+
+    per_device = asyncio.run(measure(args.devices))
+
+    print(f"{args.devices} devices: {per_device:,.0f} bytes per device")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+""" Throughput and latency of the codecs, schedule math and device operations.
+
+Run with `poetry run python -m benchmarks.suite`. Save a baseline with
+`--save baseline.json` and check a change against it with
+`--compare baseline.json`, which exits with 1 when a benchmark regressed.
+
+`benchmarks/baseline.json` is a reference run with the default arguments. The codec
+and date numbers depend on the machine, so save a baseline of your own before
+comparing against it.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+from typing import Awaitable, Callable, List
+
+from benchmarks.harness import (
+    Result,
+    compare,
+    load_baseline,
+    run,
+    run_async,
+    save_baseline,
+)
+from melnor_bluetooth import protocol
+from melnor_bluetooth.constants import (
+    PUSH_PIPELINED,
+    PUSH_RELIABLE,
+    VALVE_0_MODE_UUID,
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+)
+from melnor_bluetooth.device import Device
+from melnor_bluetooth.models.frequency import Frequency
+from melnor_bluetooth.simulator import SimulatedBackend
+from melnor_bluetooth.utils import date
+from melnor_bluetooth.utils.battery import parse_battery_value
+
+MANUAL_SETTINGS = protocol.encode_manual_settings([(True, 10)] * 4)
+MANUAL_STATES = protocol.MANUAL_STATES_STRUCT.pack(1, 0, 1, 0, 1, 0, 1, 0)
+MODE = protocol.encode_mode((date.get_timestamp(), 10, 24))
+
+
+def codec_benchmarks(iterations: int) -> List[Result]:
+    """Decoding payloads into valves and schedules"""
+
+    valve = Device(SimpleNamespace(address="00:00:00:00:00:00")).zone1
+    frequency = Frequency()
+    now = time.time()
+
+    return [
+        run(
+            "valve.update_state/manual",
+            lambda: valve.update_state(MANUAL_SETTINGS, VALVE_MANUAL_SETTINGS_UUID),
+            iterations,
+        ),
+        run(
+            "valve.update_state/states",
+            lambda: valve.update_state(MANUAL_STATES, VALVE_MANUAL_STATES_UUID),
+            iterations,
+        ),
+        run(
+            "valve.update_state/mode",
+            lambda: valve.update_state(MODE, VALVE_0_MODE_UUID),
+            iterations,
+        ),
+        run("frequency.update_state", lambda: frequency.update_state(MODE), iterations),
+        run(
+            "frequency._compute_dates",
+            # pylint: disable=protected-access
+            lambda: frequency._compute_dates(now),
+            iterations,
+        ),
+        run(
+            "parse_battery_value", lambda: parse_battery_value(b"\x02\x85"), iterations
+        ),
+    ]
+
+
+def date_benchmarks(iterations: int) -> List[Result]:
+    """Conversions between the device clock and unix time"""
+
+    start = date.to_start_time(date.get_timestamp())
+
+    return [
+        run("date.time_shift", date.time_shift, iterations),
+        run("date.get_timestamp", date.get_timestamp, iterations),
+        run(
+            "date.to_start_time",
+            lambda: date.to_start_time(1_700_000_000),
+            iterations,
+        ),
+        run("date.from_start_time", lambda: date.from_start_time(start), iterations),
+    ]
+
+
+async def device_benchmarks(
+    iterations: int, latency_seconds: float, jitter_seconds: float
+) -> List[Result]:
+    """Device operations against simulated timers, latency included"""
+
+    backend = SimulatedBackend(
+        latency_seconds=latency_seconds, jitter_seconds=jitter_seconds, seed=0
+    )
+
+    results: List[Result] = []
+
+    device = backend.device(backend.add_timer().mac)
+    await device.connect()
+
+    results.append(
+        await run_async(
+            "device.fetch_state/force",
+            lambda: device.fetch_state(force=True),
+            iterations,
+        )
+    )
+    results.append(
+        await run_async("device.fetch_state/cached", device.fetch_state, iterations)
+    )
+
+    for strategy in (PUSH_RELIABLE, PUSH_PIPELINED):
+        device = backend.device(backend.add_timer().mac, push_strategy=strategy)
+        await device.connect()
+
+        results.append(
+            await run_async(
+                f"device.push_state/{strategy}", _toggle_zone(device), iterations
+            )
+        )
+
+    return results
+
+
+def _toggle_zone(device: Device) -> Callable[[], Awaitable[None]]:
+    """Returns a one zone on/off command, the most common push"""
+
+    async def toggle() -> None:
+        await device.zone1.set_is_watering(not device.zone1.is_watering)
+
+    return toggle
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--device-iterations", type=int, default=50)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.03,
+        help="Seconds per simulated radio operation",
+    )
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--filter", default="", help="Only run matching benchmarks")
+    parser.add_argument("--save", help="Write the results to a baseline")
+    parser.add_argument("--compare", help="Compare the results with a baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Throughput a benchmark may lose before it counts as a regression",
+    )
+    args = parser.parse_args()
+
+    results = codec_benchmarks(args.iterations) + date_benchmarks(args.iterations)
+    results += asyncio.run(
+        device_benchmarks(args.device_iterations, args.latency, args.jitter)
+    )
+    results = [result for result in results if args.filter in result.name]
+
+    for result in results:
+        print(result)
+
+    if args.save:
+        save_baseline(results, args.save)
+
+    if args.compare:
+        print()
+        if compare(results, load_baseline(args.compare), args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
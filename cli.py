@@ -1,43 +1,43 @@
 import asyncio
 import logging
 import sys
-from typing import List
 
 import aioconsole
 from bleak.backends.device import BLEDevice
 
-from melnor_bluetooth.device import Device
-from melnor_bluetooth.scanner import scanner
+from melnor_bluetooth.fleet import DeviceFleet
+from melnor_bluetooth.scanner import scan
 from melnor_bluetooth.utils.formatter import CustomFormatter
 
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger().handlers[0].setFormatter(CustomFormatter())
 logging.getLogger("bleak").setLevel(logging.WARNING)
 
-devices: List[Device] = []
+fleet = DeviceFleet()
 
 _LOGGER = logging.getLogger(__name__)
 
 
 def detection_callback(ble_device: BLEDevice):
-    address = ble_device.address
+    if ble_device.address not in fleet:
+        device = fleet.add_ble_device(ble_device)
+        _LOGGER.info("Found device %s", device.mac)
 
-    has_device = [d for d in devices if d.mac == address]
 
-    if len(has_device) == 0:
-        device = Device(ble_device)
-        devices.append(device)
-        _LOGGER.info("Found device %s", device.mac)
+async def discover():
+    # The CLI only drives the first timer it finds
+    async for ble_device in scan(count=1, scan_timeout_seconds=10):
+        detection_callback(ble_device)
 
 
 async def main():
-    await scanner(detection_callback, scan_timeout_seconds=10)
+    await discover()
 
-    if len(devices) == 0:
+    if len(fleet) == 0:
         _LOGGER.warning("No devices found")
         return
 
-    device = devices[0]
+    device = fleet.devices[0]
 
     await device.connect()
 
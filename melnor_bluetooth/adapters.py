@@ -0,0 +1,245 @@
+""" Spread devices across several Bluetooth adapters. """
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from bleak.backends.device import BLEDevice
+
+from .connection import ConnectionPool
+from .device import Device
+from .scanner import scan_advertisements
+from .utils.ble import advertisement_rssi
+from .utils.lock import set_adapter_concurrency
+
+_LOGGER = logging.getLogger(__name__)
+
+# RSSI assumed for devices discovered without one
+UNKNOWN_RSSI = -100
+
+
+class AdapterScheduler:
+    """
+    Assigns devices to adapters by signal strength and load.
+
+    Every adapter scans on its own with `discover`, so the scheduler knows which
+    adapters can reach each device and how well. `connect` then picks the adapter
+    with the best RSSI, minus `load_penalty` for every device already connected
+    through it, and fails over to the next one when connecting fails. An adapter
+    that failed a device is skipped for that device for `failure_cooldown_seconds`.
+
+    With `max_connections`, the scheduler keeps a `ConnectionPool` per adapter and
+    moves devices to the pool of their adapter along with them. Without it, devices
+    keep the pool they were given.
+
+        scheduler = AdapterScheduler({"hci0": 3, "hci1": 3}, max_connections=5)
+        scheduler.apply_concurrency_limits()
+        await scheduler.discover(addresses=known_macs)
+        for device in fleet:
+            await scheduler.connect(device)
+    """
+
+    _adapters: List[str]
+    _concurrency_limits: Dict[str, int | None]
+    _devices: Dict[str, Device]
+    _failed_at: Dict[Tuple[str, str], float]
+    _failure_cooldown_seconds: float
+    _load_penalty: float
+    _pools: Dict[str, ConnectionPool]
+    _sightings: Dict[str, Dict[str, Tuple[BLEDevice, int]]]
+
+    def __init__(
+        self,
+        adapters: Mapping[str, int | None] | Iterable[str],
+        load_penalty: float = 10,
+        failure_cooldown_seconds: float = 60,
+        max_connections: int | None = None,
+    ) -> None:
+        """
+        :param adapters: The adapters to use, e.g. ["hci0", "hci1"]. Pass a mapping
+        to also limit how many devices use each adapter at the same time, applied
+        by `apply_concurrency_limits`.
+        :param load_penalty: dBm an adapter loses for each device connected through
+        it.
+        :param failure_cooldown_seconds: How long an adapter that failed to connect
+        a device isn't used for that device.
+        :param max_connections: Max number of devices connected through each adapter
+        at the same time. None leaves the connections unlimited.
+        """
+
+        self._adapters = list(adapters)
+        self._concurrency_limits = (
+            dict(adapters) if isinstance(adapters, Mapping) else {}
+        )
+        self._devices = {}
+        self._failed_at = {}
+        self._failure_cooldown_seconds = failure_cooldown_seconds
+        self._load_penalty = load_penalty
+        self._pools = (
+            {adapter: ConnectionPool(max_connections) for adapter in self._adapters}
+            if max_connections is not None
+            else {}
+        )
+        self._sightings = {}
+
+    @property
+    def adapters(self) -> List[str]:
+        """Returns the adapters devices are spread across"""
+        return list(self._adapters)
+
+    @property
+    def concurrency_limits(self) -> Dict[str, int | None]:
+        """Returns the concurrency limit of each adapter given one"""
+        return dict(self._concurrency_limits)
+
+    def apply_concurrency_limits(self) -> None:
+        """Sets the concurrency limit of each adapter with `set_adapter_concurrency`.
+        The limits are global, they replace those set by any other scheduler for the
+        same adapters."""
+
+        for adapter, limit in self._concurrency_limits.items():
+            set_adapter_concurrency(limit, adapter)
+
+    def pool(self, adapter: str) -> ConnectionPool | None:
+        """Returns the connection pool of an adapter, None without
+        `max_connections`"""
+        return self._pools.get(adapter)
+
+    def observe(
+        self, adapter: str, ble_device: BLEDevice, rssi: int | None = None
+    ) -> None:
+        """Records that an adapter discovered a device, with the RSSI of its
+        advertisement"""
+
+        self._sightings.setdefault(ble_device.address, {})[adapter] = (
+            ble_device,
+            UNKNOWN_RSSI if rssi is None else rssi,
+        )
+
+    async def discover(
+        self,
+        addresses: Iterable[str] | None = None,
+        count: int | None = None,
+        scan_timeout_seconds: float = 10,
+    ) -> List[str]:
+        """
+        Scans with every adapter at the same time.
+
+        :return: The MAC addresses discovered by at least one adapter.
+        """
+
+        addresses = list(addresses) if addresses is not None else None
+
+        async def discover_with(adapter: str) -> None:
+            async for ble_device, advertisement_data in scan_advertisements(
+                addresses=addresses,
+                count=count,
+                scan_timeout_seconds=scan_timeout_seconds,
+                adapter=adapter,
+            ):
+                self.observe(
+                    adapter,
+                    ble_device,
+                    advertisement_rssi(ble_device, advertisement_data),
+                )
+
+        results = await asyncio.gather(
+            *[discover_with(adapter) for adapter in self._adapters],
+            return_exceptions=True,
+        )
+
+        for adapter, result in zip(self._adapters, results):
+            if isinstance(result, BaseException):
+                _LOGGER.error("Failed to scan with %s: %r", adapter, result)
+
+        return list(self._sightings)
+
+    def load(self, adapter: str) -> int:
+        """Returns the number of devices connected through an adapter"""
+        return sum(
+            1
+            for device in self._devices.values()
+            if device.is_connected and device.adapter == adapter
+        )
+
+    def candidates(self, mac: str) -> List[str]:
+        """Returns the adapters able to reach a device, best first"""
+
+        now = time.monotonic()
+        sightings = self._sightings.get(mac, {})
+
+        def score(adapter: str) -> float:
+            _, rssi = sightings[adapter]
+            return rssi - self._load_penalty * self.load(adapter)
+
+        usable = [
+            adapter
+            for adapter in self._adapters
+            if adapter in sightings
+            and now - self._failed_at.get((mac, adapter), -float("inf"))
+            >= self._failure_cooldown_seconds
+        ]
+
+        return sorted(usable, key=score, reverse=True)
+
+    def assign(self, device: Device) -> str | None:
+        """Moves a disconnected device to its best adapter. Returns the adapter, or
+        None if no adapter has discovered the device."""
+
+        self._devices[device.mac] = device
+
+        candidates = self.candidates(device.mac)
+        if not candidates:
+            return None
+
+        adapter = candidates[0]
+        if not device.is_connected:
+            self._move(device, adapter)
+
+        return adapter
+
+    async def connect(self, device: Device, retry_attempts: int = 2) -> bool:
+        """
+        Connects a device through its best adapter, trying the others in order when
+        connecting fails. Devices no adapter has discovered connect as they are.
+
+        :return: Whether the device is connected.
+        """
+
+        self._devices[device.mac] = device
+
+        if device.is_connected:
+            return True
+
+        candidates = self.candidates(device.mac)
+        if not candidates:
+            await device.connect(retry_attempts=retry_attempts)
+            return device.is_connected
+
+        for adapter in candidates:
+            self._move(device, adapter)
+
+            await device.connect(retry_attempts=retry_attempts)
+            if device.is_connected:
+                return True
+
+            _LOGGER.warning("Failed to connect to %s with %s", device.mac, adapter)
+            self._failed_at[(device.mac, adapter)] = time.monotonic()
+
+        return False
+
+    def _move(self, device: Device, adapter: str) -> None:
+        ble_device, _ = self._sightings[device.mac][adapter]
+        # Without max_connections the device keeps whatever pool it was given
+        pool = self._pools.get(adapter) if self._pools else device.pool
+        device.use_adapter(adapter, ble_device, pool)
+
+    def forget(self, mac: str) -> None:
+        """Drops everything known about a device"""
+        self._devices.pop(mac, None)
+        self._sightings.pop(mac, None)
+        for key in [key for key in self._failed_at if key[0] == mac]:
+            del self._failed_at[key]
@@ -0,0 +1,325 @@
+""" Keep the right devices connected when there are more timers than adapter slots. """
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Set, Tuple
+
+from bleak.exc import BleakError
+
+from .device import Device
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def next_activity(device: Device) -> int | None:
+    """Returns the unix timestamp of the next, or current, scheduled run on any of
+    the device's valves. Manual watering counts as a run ending at its end time."""
+
+    timestamps: List[int] = []
+
+    for valve in device.valves:
+        if valve.is_watering:
+            timestamps.append(valve.watering_end_time)
+
+        if valve.schedule_enabled:
+            timestamp = valve.frequency.next_run_timestamp
+            if timestamp is not None:
+                timestamps.append(timestamp)
+
+    return min(timestamps, default=None)
+
+
+class ConnectionPool:
+    """
+    Caps the number of devices connected through an adapter at the same time.
+
+    Devices created with the pool take a slot when they connect and give it back
+    when they disconnect. Once every slot is taken, the least recently used device
+    that isn't busy is disconnected to make room. If every connected device is
+    busy, connecting waits until one of them is done. Use one pool per adapter.
+
+        pool = ConnectionPool(max_connections=5)
+        device = Device(ble_device, pool=pool)
+    """
+
+    _connected: Dict[str, Device]
+    _max_connections: int
+    _poll_seconds: float
+    _primitives: Tuple[asyncio.AbstractEventLoop, asyncio.Lock, asyncio.Event] | None
+
+    def __init__(self, max_connections: int = 5, poll_seconds: float = 0.1) -> None:
+        """
+        :param max_connections: Max number of devices connected at the same time.
+        :param poll_seconds: How often a waiting connect checks whether a busy device
+        can be evicted.
+        """
+
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+
+        self._connected = {}
+        self._max_connections = max_connections
+        self._poll_seconds = poll_seconds
+
+        # The acquire lock and release event, created on first use inside the event
+        # loop that waits on them
+        self._primitives = None
+
+    @property
+    def connected(self) -> List[Device]:
+        """Returns the devices holding a slot"""
+        return list(self._connected.values())
+
+    @property
+    def max_connections(self) -> int:
+        """Returns the number of slots"""
+        return self._max_connections
+
+    async def acquire(self, device: Device) -> None:
+        """Takes a slot for the device, evicting the least recently used idle device
+        when the pool is full. Called by `Device.connect`."""
+
+        loop = asyncio.get_running_loop()
+        if self._primitives is None or self._primitives[0] is not loop:
+            self._primitives = (loop, asyncio.Lock(), asyncio.Event())
+
+        _, acquire_lock, released = self._primitives
+
+        async with acquire_lock:
+            while device.mac not in self._connected:
+                if len(self._connected) < self._max_connections:
+                    self._connected[device.mac] = device
+                    return
+
+                victim = self._eviction_candidate()
+                if victim is not None:
+                    _LOGGER.debug("Evicting %s for %s", victim.mac, device.mac)
+                    await self._evict(victim)
+                    continue
+
+                released.clear()
+                try:
+                    await asyncio.wait_for(released.wait(), self._poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def release(self, device: Device) -> None:
+        """Gives back the slot of the device. Called when it disconnects."""
+        if (
+            self._connected.pop(device.mac, None) is not None
+            and self._primitives is not None
+        ):
+            self._primitives[2].set()
+
+    def _eviction_candidate(self) -> Device | None:
+        # Devices that haven't connected yet are still connecting
+        idle = [
+            device
+            for device in self._connected.values()
+            if device.is_connected and not device.lock.locked()
+        ]
+        return min(idle, key=lambda device: device.last_used, default=None)
+
+    async def _evict(self, device: Device) -> None:
+        try:
+            if device.is_connected:
+                await device.disconnect()
+        except BleakError:
+            _LOGGER.error("Failed to disconnect from %s", device.mac)
+        finally:
+            self.release(device)
+
+    def __contains__(self, mac: str) -> bool:
+        return mac in self._connected
+
+    def __len__(self) -> int:
+        return len(self._connected)
+
+
+class ConnectionManager:
+    """
+    Connection policy for a set of devices.
+
+    A device is kept connected while it's hot: pinned with `keep_connected`, used
+    within `idle_timeout_seconds`, or watering or about to water within
+    `preconnect_seconds`. Idle devices are disconnected to free their adapter slot,
+    and devices with a run coming up are connected ahead of it so the state can be
+    fetched without waiting on a connect.
+
+        manager = ConnectionManager(fleet, idle_timeout_seconds=60)
+        manager.start()
+        ...
+        await manager.stop()
+    """
+
+    _connects: Dict[str, asyncio.Task]
+    _devices: Dict[str, Device]
+    _idle_timeout_seconds: float
+    _interval_seconds: float
+    _pinned: Set[str]
+    _preconnect_seconds: float
+    _retry_attempts: int
+    _task: asyncio.Task | None
+
+    def __init__(
+        self,
+        devices: Iterable[Device] = (),
+        idle_timeout_seconds: float = 60,
+        preconnect_seconds: float = 120,
+        interval_seconds: float = 10,
+        retry_attempts: int = 4,
+    ) -> None:
+        """
+        :param devices: Devices to manage.
+        :param idle_timeout_seconds: Disconnect devices unused for this long.
+        :param preconnect_seconds: Connect devices this long before a scheduled run.
+        :param interval_seconds: How often the policy is applied by `start`.
+        :param retry_attempts: Connection attempts per device and interval.
+        """
+
+        self._connects = {}
+        self._devices = {}
+        self._idle_timeout_seconds = idle_timeout_seconds
+        self._interval_seconds = interval_seconds
+        self._pinned = set()
+        self._preconnect_seconds = preconnect_seconds
+        self._retry_attempts = retry_attempts
+        self._task = None
+
+        for device in devices:
+            self.add(device)
+
+    def add(self, device: Device) -> Device:
+        """Manages a device. Returns the device already managed for the MAC address
+        if there is one."""
+        return self._devices.setdefault(device.mac, device)
+
+    def remove(self, mac: str) -> Device | None:
+        """Stops managing the device with the given MAC address. Its connection is
+        left as is."""
+        self._pinned.discard(mac)
+        return self._devices.pop(mac, None)
+
+    def keep_connected(self, mac: str, pinned: bool = True) -> None:
+        """Keeps a device connected regardless of how long it's been idle"""
+        if pinned:
+            self._pinned.add(mac)
+        else:
+            self._pinned.discard(mac)
+
+    @property
+    def devices(self) -> List[Device]:
+        """Returns every managed device"""
+        return list(self._devices.values())
+
+    def is_hot(self, device: Device) -> bool:
+        """Returns whether the device should be connected right now"""
+
+        if device.mac in self._pinned:
+            return True
+
+        if time.monotonic() - device.last_used < self._idle_timeout_seconds:
+            return True
+
+        activity = next_activity(device)
+        return (
+            activity is not None and activity - time.time() <= self._preconnect_seconds
+        )
+
+    async def apply(self) -> None:
+        """Connects the hot devices and disconnects the idle ones, concurrently"""
+        await self._apply(wait_for_connects=True)
+
+    async def _apply(self, wait_for_connects: bool) -> None:
+        connects: List[asyncio.Task] = []
+        disconnects = []
+
+        for device in self.devices:
+            hot = self.is_hot(device)
+
+            if hot and not device.is_connected:
+                connects.append(self._connect(device))
+
+            # A held lock means an operation is running, it'll mark the device as used
+            elif not hot and device.is_connected and not device.lock.locked():
+                disconnects.append(self._disconnect(device))
+
+        await asyncio.gather(*disconnects, return_exceptions=True)
+
+        if connects and wait_for_connects:
+            await asyncio.wait(connects)
+
+    def _connect(self, device: Device) -> asyncio.Task:
+        """Connects a device in the background, so slow or unreachable devices
+        don't hold up the others. Returns the connect already running, if any."""
+
+        task = self._connects.get(device.mac)
+        if task is not None:
+            return task
+
+        _LOGGER.debug("Connecting to hot device %s", device.mac)
+        task = asyncio.get_running_loop().create_task(
+            device.connect(retry_attempts=self._retry_attempts)
+        )
+        self._connects[device.mac] = task
+        task.add_done_callback(lambda _: self._connect_done(device.mac, task))
+
+        return task
+
+    def _connect_done(self, mac: str, task: asyncio.Task) -> None:
+        if self._connects.get(mac) is task:
+            del self._connects[mac]
+
+        if not task.cancelled() and task.exception() is not None:
+            _LOGGER.error("Failed to connect to %s: %r", mac, task.exception())
+
+    async def _disconnect(self, device: Device) -> None:
+        _LOGGER.debug("Disconnecting idle device %s", device.mac)
+        try:
+            await device.disconnect()
+        except BleakError:
+            _LOGGER.error("Failed to disconnect from %s", device.mac)
+
+    def start(self) -> asyncio.Task:
+        """Applies the policy every `interval_seconds` in the background"""
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+        return self._task
+
+    async def stop(self) -> None:
+        """Stops applying the policy and cancels the connects still running.
+        Established connections are left as they are."""
+
+        tasks = list(self._connects.values())
+        if self._task is not None:
+            tasks.append(self._task)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._apply(wait_for_connects=False)
+            await asyncio.sleep(self._interval_seconds)
+
+    async def __aenter__(self) -> ConnectionManager:
+        self.start()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.stop()
+
+    def __contains__(self, mac: str) -> bool:
+        return mac in self._devices
+
+    def __len__(self) -> int:
+        return len(self._devices)
@@ -21,6 +21,32 @@ VALVE_1_MODE_UUID = _uuid("ec10")
 VALVE_2_MODE_UUID = _uuid("ec11")
 VALVE_3_MODE_UUID = _uuid("ec12")
 
+VALVE_MODE_UUIDS = (
+    VALVE_0_MODE_UUID,
+    VALVE_1_MODE_UUID,
+    VALVE_2_MODE_UUID,
+    VALVE_3_MODE_UUID,
+)
+
+# How `Device.push_state` writes to the device, see `Device.push_strategy`
+PUSH_RELIABLE = "reliable"
+PUSH_PIPELINED = "pipelined"
+PUSH_STRATEGIES = (PUSH_RELIABLE, PUSH_PIPELINED)
+
+# Seconds a read stays fresh in `Device.fetch_state`. Battery level and schedules
+# rarely change, everything else is read on every fetch.
+DEFAULT_READ_TTLS = {
+    BATTERY_UUID: 900,
+    VALVE_0_MODE_UUID: 300,
+    VALVE_1_MODE_UUID: 300,
+    VALVE_2_MODE_UUID: 300,
+    VALVE_3_MODE_UUID: 300,
+}
+
+# Seconds a subscribed characteristic goes without a notification before
+# `Device.fetch_state` reads it anyway, in case notifications stalled
+NOTIFY_POLL_SECONDS = 600
+
 # Manufacturers
 EDEN = "Eden"
 MELNOR = "Melnor"
@@ -4,40 +4,127 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import struct
+from contextlib import asynccontextmanager
 from datetime import datetime, time
-from typing import List
+from time import monotonic
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Set,
+    Tuple,
+)
 
+from bleak.backends.characteristic import BleakGATTCharacteristic
 from bleak.backends.device import BLEDevice
+from bleak.backends.service import BleakGATTServiceCollection
 from bleak.exc import BleakError
 from bleak_retry_connector import BleakClient  # type: ignore - this is a valid import
 from bleak_retry_connector import establish_connection
 from deprecated import deprecated
 
+from . import protocol
 from .constants import (
     BATTERY_UUID,
+    DEFAULT_READ_TTLS,
     MANUFACTURER_UUID,
+    NOTIFY_POLL_SECONDS,
+    PUSH_PIPELINED,
+    PUSH_RELIABLE,
+    PUSH_STRATEGIES,
     UPDATED_AT_UUID,
-    VALVE_0_MODE_UUID,
-    VALVE_1_MODE_UUID,
-    VALVE_2_MODE_UUID,
-    VALVE_3_MODE_UUID,
     VALVE_MANUAL_SETTINGS_UUID,
     VALVE_MANUAL_STATES_UUID,
+    VALVE_MODE_UUIDS,
     VALVE_ON_OFF_UUID,
 )
 from .models.frequency import Frequency
+from .models.model_info import (
+    ModelInfo,
+    cache_model,
+    cached_model,
+    is_model_verified,
+)
 from .utils import date
-from .utils.battery import parse_battery_value
-from .utils.lock import GLOBAL_BLUETOOTH_LOCK, bluetooth_lock
+from .utils.cache import ReadCache
+from .utils.lock import DEFAULT_ADAPTER, BluetoothLock, bluetooth_lock
+from .utils.metrics import (
+    CONNECT_ATTEMPTS,
+    CONNECT_FAILURES,
+    CONNECT_SECONDS,
+    CONNECTS,
+    READ_BYTES,
+    READ_FAILURES,
+    READ_SECONDS,
+    WRITE_BYTES,
+    WRITE_FAILURES,
+    WRITE_SECONDS,
+    Metrics,
+)
+
+if TYPE_CHECKING:
+    from .connection import ConnectionPool
 
 _LOGGER = logging.getLogger(__name__)
 
+# Every characteristic the library reads or writes
+_CHARACTERISTIC_UUIDS = (
+    BATTERY_UUID,
+    MANUFACTURER_UUID,
+    UPDATED_AT_UUID,
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+    VALVE_ON_OFF_UUID,
+    *VALVE_MODE_UUIDS,
+)
+
+DeviceCallbackType = Callable[["Device"], None]
+
+# Signature of bleak_retry_connector's establish_connection
+ConnectorType = Callable[..., Awaitable[BleakClient]]
+
+
+class _MeteredBleakClient(BleakClient):
+    """Reports every connection attempt establish_connection makes"""
+
+    def __init__(self, *args, on_connect_attempt: Callable[[], None], **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_connect_attempt = on_connect_attempt
+
+    async def connect(self, **kwargs) -> bool:
+        self._on_connect_attempt()
+        return await super().connect(**kwargs)
+
+
+# Bit flags for the shared characteristics a valve has changed locally
+_DIRTY_FLAGS = {
+    VALVE_MANUAL_SETTINGS_UUID: 1,
+    VALVE_ON_OFF_UUID: 2,
+}
+
 
 class Valve:
     """Wrapper class to handle interacting with individual valves on a Melnor timer"""
 
+    __slots__ = (
+        "_device",
+        "_dirty",
+        "_end_time",
+        "_frequency",
+        "_id",
+        "_is_watering",
+        "_is_frequency_schedule_enabled",
+        "_manual_minutes",
+    )
+
     _device: Device
+    _dirty: int
+    _end_time: int
     _frequency: Frequency
     _id: int
     _is_watering: bool
@@ -46,6 +133,7 @@ class Valve:
 
     def __init__(self, identifier: int, device) -> None:
         self._device = device
+        self._dirty = 0
         self._frequency = Frequency()
         self._id = identifier
         self._is_watering = False
@@ -56,52 +144,48 @@ class Valve:
     def update_state(self, raw_bytes: bytes, uuid: str) -> None:
         """Update the state of the valve from the raw bytes"""
 
-        offset = self._id * 5
-
-        if uuid == VALVE_MANUAL_SETTINGS_UUID:
-            # Parses a 5 byte segment from the device and updates the state of the zone
-            # [
-            #     0   - 0x00, # is_watering - boolean
-            #     1-2 - 0x00, # manual_watering_time - unsigned short
-            #     3-4 - 0x00, # duplicate of byte 1
-            # ]
-
-            self._is_watering = struct.unpack_from(">?", raw_bytes, offset)[0]
-            self._manual_minutes = struct.unpack_from(">H", raw_bytes, offset + 1)[0]
-
-        elif uuid == VALVE_MANUAL_STATES_UUID:
-            # byte segment for manual watering time left
-            # [
-            #     0   - 0x00, # unclear, 0-2
-            #     1-4 - 0x00, # timestamp - unsigned int
-            # ]
-
-            parsed_time = self._end_time = struct.unpack_from(
-                ">I", raw_bytes, offset + 1
-            )[0]
-
-            self._end_time = parsed_time - date.time_shift() if parsed_time != 0 else 0
-
-        elif uuid == VALVE_ON_OFF_UUID:
-            self._is_frequency_schedule_enabled = struct.unpack_from(
-                ">?", raw_bytes, self._id
-            )[0]
-
-        elif (
-            (self._id == 0 and uuid == VALVE_0_MODE_UUID)
-            or (self._id == 1 and uuid == VALVE_1_MODE_UUID)
-            or (self._id == 2 and uuid == VALVE_2_MODE_UUID)
-            or (self._id == 3 and uuid == VALVE_3_MODE_UUID)
-        ):
-            # byte segment for valve mode
-            # [
-            #     0   - 0x00, # unclear, always 0
-            #     1-4 - 0x00, # timestamp - unsigned int
-            #     5-6 - 0x00, # duration - unsigned short
-            #     7   - 0x00, # frequency - unsigned char
-            # ]
+        index = protocol.MODE_UUID_VALVE_INDEX.get(uuid)
+        if index is not None and index != self._id:
+            return
+
+        if uuid in _VALVE_APPLIERS:
+            self.apply_decoded(uuid, protocol.decode(uuid, raw_bytes))
+
+    def apply_decoded(self, uuid: str, decoded: Any) -> None:
+        """Update the state of the valve from a payload decoded by `protocol.decode`.
+        Payloads holding every valve are shared between valves, mode payloads must
+        only be given to the valve they belong to."""
+        _VALVE_APPLIERS[uuid](self, decoded)
+
+    def _apply_manual_settings(self, decoded: List[protocol.ManualSetting]) -> None:
+        self._is_watering, self._manual_minutes = decoded[self._id]
+        self._dirty &= ~_DIRTY_FLAGS[VALVE_MANUAL_SETTINGS_UUID]
+
+    def _apply_manual_states(self, decoded: List[int]) -> None:
+        self._end_time = decoded[self._id]
 
-            self._frequency.update_state(raw_bytes)
+    def _apply_on_off(self, decoded: Tuple[bool, ...]) -> None:
+        self._is_frequency_schedule_enabled = decoded[self._id]
+        self._dirty &= ~_DIRTY_FLAGS[VALVE_ON_OFF_UUID]
+
+    def _apply_mode(self, decoded: protocol.Mode) -> None:
+        self._frequency.apply_decoded(decoded)
+
+    @property
+    def dirty_characteristics(self) -> Set[str]:
+        """Returns the characteristic UUIDs with local changes that haven't been
+        pushed to the device yet"""
+        dirty = {uuid for uuid, flag in _DIRTY_FLAGS.items() if self._dirty & flag}
+        if self._frequency.is_dirty:
+            dirty.add(VALVE_MODE_UUIDS[self._id])
+        return dirty
+
+    def mark_clean(self, uuid: str) -> None:
+        """Marks the given characteristic as written to the device"""
+        if uuid == VALVE_MODE_UUIDS[self._id]:
+            self._frequency.mark_clean()
+        else:
+            self._dirty &= ~_DIRTY_FLAGS.get(uuid, 0)
 
     @property
     def frequency_bytes(self) -> bytes | None:
@@ -114,6 +198,11 @@ class Valve:
         """Returns the raw valve id"""
         return self._id
 
+    @property
+    def lock(self) -> BluetoothLock:
+        """Returns the lock of the device this valve belongs to"""
+        return self._device.lock
+
     @property
     def is_watering(self) -> bool:
         """Returns the zone watering state"""
@@ -147,11 +236,16 @@ class Valve:
         conjunction with `Device.push_state`
         if other processes are calling `Device.fetch_state`"""
         self._is_watering = value
+        self._dirty |= _DIRTY_FLAGS[VALVE_MANUAL_SETTINGS_UUID]
+
+    def _set_is_watering(self, value: bool) -> None:
+        self._is_watering = value
+        self._dirty |= _DIRTY_FLAGS[VALVE_MANUAL_SETTINGS_UUID]
 
     @bluetooth_lock
     async def set_is_watering(self, value: bool) -> None:
         """Atomically sets zone watering state"""
-        self._is_watering = value
+        self._set_is_watering(value)
         await self._device._unsafe_push_state()  # pylint: disable=protected-access
 
     @property
@@ -169,38 +263,53 @@ class Valve:
         conjunction with `Device.push_state`
         if other processes are calling `Device.fetch_state`"""
         self._manual_minutes = value
+        self._dirty |= _DIRTY_FLAGS[VALVE_MANUAL_SETTINGS_UUID]
+
+    def _set_manual_watering_minutes(self, value: int) -> None:
+        self._manual_minutes = value
+        self._dirty |= _DIRTY_FLAGS[VALVE_MANUAL_SETTINGS_UUID]
 
     @bluetooth_lock
     async def set_manual_watering_minutes(self, value: int) -> None:
         """Atomically set the number of seconds the valve should water."""
-        self._manual_minutes = value
+        self._set_manual_watering_minutes(value)
         await self._device._unsafe_push_state()  # pylint: disable=protected-access
 
+    def _set_frequency_interval_hours(self, value: int) -> None:
+        self._frequency.interval_hours = value
+
     @bluetooth_lock
     async def set_frequency_interval_hours(self, value: int) -> None:
         """Atomically set the frequency interval hours"""
-        if self._frequency is not None:
-            self._frequency.interval_hours = value
-            await self._device._unsafe_push_state()  # pylint: disable=protected-access
+        self._set_frequency_interval_hours(value)
+        await self._device._unsafe_push_state()  # pylint: disable=protected-access
+
+    def _set_frequency_duration_minutes(self, value: int) -> None:
+        self._frequency.duration_minutes = value
 
     @bluetooth_lock
     async def set_frequency_duration_minutes(self, value: int) -> None:
         """Atomically set the frequency duration"""
-        if self._frequency is not None:
-            self._frequency.duration_minutes = value
-            await self._device._unsafe_push_state()  # pylint: disable=protected-access
+        self._set_frequency_duration_minutes(value)
+        await self._device._unsafe_push_state()  # pylint: disable=protected-access
+
+    def _set_frequency_start_time(self, value: time) -> None:
+        self._frequency.start_time = value
 
     @bluetooth_lock
     async def set_frequency_start_time(self, value: time) -> None:
         """Atomically set the frequency start time"""
-        if self._frequency is not None:
-            self._frequency.start_time = value
-            await self._device._unsafe_push_state()  # pylint: disable=protected-access
+        self._set_frequency_start_time(value)
+        await self._device._unsafe_push_state()  # pylint: disable=protected-access
+
+    def _set_frequency_enabled(self, value: bool) -> None:
+        self._is_frequency_schedule_enabled = value
+        self._dirty |= _DIRTY_FLAGS[VALVE_ON_OFF_UUID]
 
     @bluetooth_lock
     async def set_frequency_enabled(self, value: bool) -> None:
         """Atomically set the frequency enabled state"""
-        self._is_frequency_schedule_enabled = value
+        self._set_frequency_enabled(value)
         await self._device._unsafe_push_state()  # pylint: disable=protected-access
 
     @property
@@ -209,16 +318,6 @@ class Valve:
         from the device. To influence the value use `set_manual_watering_minutes`"""
         return self._end_time
 
-    def _manual_setting_bytes(self) -> bytes:
-        """Returns the 5 byte payload to be written to the device"""
-
-        return struct.pack(
-            ">?HH",
-            self._is_watering,
-            self._manual_minutes,
-            self._manual_minutes,
-        )
-
     def __str__(self) -> str:
         return (
             f"      Valve(id={self._id}|"
@@ -229,48 +328,280 @@ class Valve:
         )
 
 
+_VALVE_APPLIERS: Dict[str, Callable[[Valve, Any], None]] = {
+    # pylint: disable=protected-access
+    VALVE_MANUAL_SETTINGS_UUID: Valve._apply_manual_settings,
+    VALVE_MANUAL_STATES_UUID: Valve._apply_manual_states,
+    VALVE_ON_OFF_UUID: Valve._apply_on_off,
+    **{uuid: Valve._apply_mode for uuid in VALVE_MODE_UUIDS},
+}
+
+
+def _snapshot(state: Any) -> Tuple[Any, ...]:
+    """Returns the value of every slot of a state object"""
+    return tuple(getattr(state, slot) for slot in type(state).__slots__)
+
+
+def _restore(state: Any, snapshot: Tuple[Any, ...]) -> None:
+    """Sets every slot of a state object back to a `_snapshot`"""
+    for slot, value in zip(type(state).__slots__, snapshot):
+        setattr(state, slot, value)
+
+
+# Fields a transaction can change, named after the `Valve.set_*` coroutines
+_VALVE_SETTERS: Dict[str, Callable[[Valve, Any], None]] = {
+    # pylint: disable=protected-access
+    "is_watering": Valve._set_is_watering,
+    "manual_watering_minutes": Valve._set_manual_watering_minutes,
+    "frequency_interval_hours": Valve._set_frequency_interval_hours,
+    "frequency_duration_minutes": Valve._set_frequency_duration_minutes,
+    "frequency_start_time": Valve._set_frequency_start_time,
+    "frequency_enabled": Valve._set_frequency_enabled,
+}
+
+
+class Transaction:
+    """
+    Valve changes staged while holding the device lock.
+
+    Changes are only applied when the transaction commits, so the valves keep
+    their current values until then and an exception leaves them untouched.
+    Created by `Device.transaction`.
+    """
+
+    __slots__ = ("_changes", "_device")
+
+    _changes: Dict[Valve, Dict[str, Any]]
+    _device: Device
+
+    def __init__(self, device: Device) -> None:
+        self._changes = {}
+        self._device = device
+
+    def set(self, valve: Valve | str, **changes: Any) -> None:
+        """
+        Stages changes to a valve. Later changes to a field replace earlier ones.
+
+        :param valve: The valve, or its key, e.g. "zone1".
+        :param changes: New values by field, e.g. `is_watering=True`. The fields
+        are the ones with a `Valve.set_*` coroutine.
+        """
+
+        if isinstance(valve, str):
+            key = valve
+            valve = self._device[key]
+            if valve is None:
+                raise ValueError(f"{self._device.mac} has no valve {key}")
+
+        elif valve._device is not self._device:  # pylint: disable=protected-access
+            raise ValueError(f"Valve {valve.id} doesn't belong to {self._device.mac}")
+
+        unknown = set(changes) - set(_VALVE_SETTERS)
+        if unknown:
+            raise ValueError(f"Unknown valve fields: {', '.join(sorted(unknown))}")
+
+        self._changes.setdefault(valve, {}).update(changes)
+
+    @property
+    def changes(self) -> Dict[Valve, Dict[str, Any]]:
+        """Returns the staged changes by valve"""
+        return {valve: dict(changes) for valve, changes in self._changes.items()}
+
+    def _apply(self) -> None:
+        """Applies every staged change, or none of them if a setter raises"""
+
+        snapshots = [
+            (valve, _snapshot(valve), _snapshot(valve.frequency))
+            for valve in self._changes
+        ]
+
+        try:
+            for valve, changes in self._changes.items():
+                for field, value in changes.items():
+                    _VALVE_SETTERS[field](valve, value)
+        except BaseException:
+            for valve, valve_state, frequency_state in snapshots:
+                _restore(valve, valve_state)
+                _restore(valve.frequency, frequency_state)
+            raise
+
+
 class Device:
     """A wrapper class to interact with Melnor Bluetooth devices"""
 
+    __slots__ = (
+        "_battery",
+        "_ble_device",
+        "_brand",
+        "_characteristics",
+        "_connection",
+        "_connection_lock",
+        "_connector",
+        "_handles",
+        "_is_connected",
+        "_lock",
+        "_mac",
+        "_metrics",
+        "_model",
+        "_notify_callback",
+        "_notify_enabled",
+        "_pool",
+        "_push_strategy",
+        "_read_cache",
+        "_resolved_services",
+        "_sensor",
+        "_subscriptions",
+        "_valves",
+        "_valve_count",
+    )
+
     _battery: int
     _ble_device: BLEDevice
-    _brand: str
+    _brand: str | None
+    _characteristics: Dict[str, BleakGATTCharacteristic]
     _connection: BleakClient
-    _connection_lock = asyncio.Lock()
+    _connection_lock: asyncio.Lock
+    _connector: ConnectorType | None
+    _handles: Mapping[str, int] | None
     _is_connected: bool
-    _model: str
-    _sensor: bool
+    _lock: BluetoothLock
+    _mac: str
+    _metrics: Metrics | None
+    _model: str | None
+    _notify_callback: DeviceCallbackType | None
+    _notify_enabled: bool
+    _pool: ConnectionPool | None
+    _push_strategy: str
+    _read_cache: ReadCache
+    _resolved_services: BleakGATTServiceCollection | None
+    _sensor: bool | None
+    _subscriptions: Set[str]
     _valves: List[Valve]
     _valve_count: int
 
-    def __init__(self, ble_device: BLEDevice) -> None:
+    def __init__(
+        self,
+        ble_device: BLEDevice,
+        adapter: str = DEFAULT_ADAPTER,
+        read_ttls: Dict[str, float] | None = None,
+        push_strategy: str = PUSH_RELIABLE,
+        pool: ConnectionPool | None = None,
+        connector: ConnectorType | None = None,
+        metrics: Metrics | None = None,
+        characteristic_handles: Mapping[str, int] | None = None,
+    ) -> None:
+        """
+        :param ble_device: The device to connect to.
+        :param adapter: The adapter the device's lock and concurrency limit belong to.
+        :param read_ttls: Seconds a read stays fresh, by characteristic UUID.
+        :param push_strategy: How `push_state` writes, see `push_strategy`.
+        :param pool: Connection pool the device takes a slot from.
+        :param connector: Replaces bleak_retry_connector's `establish_connection`,
+        e.g. `SimulatedBackend.establish_connection`.
+        :param metrics: Collects connect, lock, read and write metrics. Nothing is
+        measured without it.
+        :param characteristic_handles: Handles from an earlier connection, see
+        `characteristic_handles()`. Characteristics are looked up by handle first,
+        falling back to their UUID when the handle doesn't match.
+        """
+
         self._battery = 0
         self._ble_device = ble_device
+        self._brand = None
+        self._characteristics = {}
+        self._connection_lock = asyncio.Lock()
+        self._connector = connector
+        self._handles = characteristic_handles
         self._is_connected = False
+        self._lock = BluetoothLock(adapter, metrics, ble_device.address)
         self._mac = ble_device.address
+        self._metrics = metrics
+        self._model = None
+        self._notify_callback = None
+        self._notify_enabled = False
+        self._pool = pool
+        self.push_strategy = push_strategy
+        self._read_cache = ReadCache(
+            {**DEFAULT_READ_TTLS, **read_ttls} if read_ttls else DEFAULT_READ_TTLS
+        )
+        self._resolved_services = None
+        self._sensor = None
+        self._subscriptions = set()
         self._valves = []
 
+        # Until the model is read we have to assume every valve exists
+        self._valve_count = 4
+
+        model_info = cached_model(self._mac)
+        if model_info is not None:
+            self._apply_model_info(model_info)
+
         # The 1 and 2 valve devices still use 4 valve bytes
         # So we'll instantiate 4 valves to mimic that behavior
         # set of bytes too 🤦‍♂️
         for i in range(4):
             self._valves.append(Valve(i, self))
 
+    def _apply_model_info(self, model_info: ModelInfo) -> None:
+        self._brand = model_info.brand
+        self._model = model_info.name
+        self._sensor = model_info.sensor
+        self._valve_count = model_info.valve_count
+
     async def _read_model(self):
-        """Initializes the device"""
+        """Initializes the device. The manufacturer characteristic is only read when
+        no model is cached, advertised models are checked against it by the next
+        `fetch_state` instead of on every connect."""
+
+        model_info = cached_model(self._mac)
+        if model_info is not None:
+            self._apply_model_info(model_info)
+            return
+
         if not self._is_connected:
             return
 
-        try:
-            manufacturer_data = await self._connection.read_gatt_char(MANUFACTURER_UUID)
-        except BleakError:
+        manufacturer_data = await self._read(MANUFACTURER_UUID)
+        if manufacturer_data is None:
             _LOGGER.error("Failed to read model from %s", self._mac)
             return
 
+        self._update_model(manufacturer_data)
+
+    def _update_model(self, manufacturer_data: bytes) -> None:
+        """Applies the model read from the manufacturer characteristic, which wins
+        over an advertised one"""
+
         string = manufacturer_data.decode("utf-8")
+        name = string[0:5]
+        valve_count = int(string[6:7])
+
+        model_info = cached_model(self._mac)
+        if (
+            model_info is not None
+            and model_info.name == name
+            and model_info.valve_count == valve_count
+        ):
+            cache_model(self._mac, model_info, verified=True)
+            return
+
+        if model_info is not None:
+            _LOGGER.debug(
+                "Advertised model of %s doesn't match the device, replacing it",
+                self._mac,
+            )
+
+        known = ModelInfo.from_name(name)
+        model_info = ModelInfo(
+            known.model_number if known is not None else None,
+            name,
+            known.brand if known is not None else None,
+            valve_count,
+            known.sensor if known is not None else None,
+        )
 
-        self._model = string[0:5]
-        self._valve_count = int(string[6:7])
+        cache_model(self._mac, model_info, verified=True)
+        self._apply_model_info(model_info)
 
     def disconnected_callback(self, client):  # pylint: disable=unused-argument
         """Callback for when the device is disconnected"""
@@ -278,7 +609,18 @@ class Device:
         _LOGGER.warning("Disconnected from %s", self._mac)
         self._is_connected = False
 
-    @bluetooth_lock
+        # Subscriptions don't survive the connection, fetch_state reads everything
+        # again until they're restored on the next connect
+        self._subscriptions.clear()
+        self._invalidate_characteristics()
+
+        # Another client, like the official app, may change the device while we're
+        # disconnected
+        self._read_cache.invalidate()
+
+        if self._pool is not None:
+            self._pool.release(self)
+
     async def connect(self, retry_attempts=4) -> None:
         """Connects to the device"""
 
@@ -286,187 +628,648 @@ class Device:
             return
 
         async with self._connection_lock:
-            try:
-                _LOGGER.debug("Connecting to %s", self._mac)
-
-                self._connection = await establish_connection(
-                    client_class=BleakClient,
-                    device=self._ble_device,
-                    name=self._mac,
-                    disconnected_callback=self.disconnected_callback,
-                    max_attempts=retry_attempts,
-                    use_services_cache=True,
-                )
-
-                self._is_connected = True
+            last_used = self._lock.released_at
 
-                # Bluez handles certain types of advertisements poorly
-                # To work around the missing data we grab it here
-                # Callers simply need to connect and it'll be populated
-                await self._read_model()
+            # The pool slot is taken before the device lock and adapter slot, so
+            # waiting for it never blocks the devices that would free one
+            if self._pool is not None:
+                await self._pool.acquire(self)
 
-                _LOGGER.debug("Successfully connected to %s", self._mac)
+            try:
+                async with self._lock:
+                    await self._unsafe_connect(retry_attempts)
 
             except BleakError:
                 _LOGGER.error("Failed to connect to %s", self._mac)
                 self._is_connected = False
 
-    @bluetooth_lock
+            finally:
+                if not self._is_connected:
+                    # Failing to connect doesn't make the device recently used
+                    self._lock.released_at = last_used
+
+                    if self._pool is not None:
+                        self._pool.release(self)
+
+    async def _unsafe_connect(self, retry_attempts: int) -> None:
+        """Connects to the device. WARNING: This function runs without an internal
+        lock."""
+
+        _LOGGER.debug("Connecting to %s", self._mac)
+
+        self._connection = await self._establish_connection(retry_attempts)
+
+        self._is_connected = True
+        self._invalidate_characteristics()
+
+        # Bluez handles certain types of advertisements poorly
+        # To work around the missing data we grab it here
+        # Callers simply need to connect and it'll be populated
+        await self._read_model()
+
+        if self._notify_enabled:
+            await self._unsafe_start_notify()
+
+        _LOGGER.debug("Successfully connected to %s", self._mac)
+
+    async def _establish_connection(self, retry_attempts: int) -> BleakClient:
+        """Returns a connected client, recording how long it took and how many
+        attempts were made when metrics are enabled"""
+
+        connector = self._connector or establish_connection
+        kwargs: Dict[str, Any] = {
+            "client_class": BleakClient,
+            "device": self._ble_device,
+            "name": self._mac,
+            "disconnected_callback": self.disconnected_callback,
+            "max_attempts": retry_attempts,
+            "use_services_cache": True,
+        }
+
+        metrics = self._metrics
+        if metrics is None:
+            return await connector(**kwargs)
+
+        attempts = 0
+
+        def count_attempt() -> None:
+            nonlocal attempts
+            attempts += 1
+
+        kwargs["client_class"] = _MeteredBleakClient
+        kwargs["on_connect_attempt"] = count_attempt
+
+        started_at = monotonic()
+        try:
+            client = await connector(**kwargs)
+        except BleakError:
+            metrics.increment(CONNECT_FAILURES)
+            raise
+        finally:
+            metrics.observe(CONNECT_SECONDS, monotonic() - started_at)
+            metrics.observe(CONNECT_ATTEMPTS, attempts)
+
+        metrics.increment(CONNECTS)
+        return client
+
     async def disconnect(self) -> None:
         """Disconnects the device"""
-        await self._connection.disconnect()
 
-    async def fetch_state(self) -> None:
-        """Updates the state of the device with the given bytes"""
+        last_used = self._lock.released_at
+
+        async with self._lock:
+            await self._connection.disconnect()
+
+        # Disconnecting an idle device doesn't make it recently used
+        self._lock.released_at = last_used
+
+    async def fetch_state(self, force: bool = False) -> None:
+        """Updates the state of the device with the given bytes
+
+        :param force: Read every characteristic, even the ones still fresh according
+        to their TTL.
+        """
 
         if not self._is_connected:
             await self.connect(retry_attempts=1)
 
-        async with GLOBAL_BLUETOOTH_LOCK:
-            uuids = [
-                BATTERY_UUID,
-                VALVE_MANUAL_SETTINGS_UUID,
-                VALVE_MANUAL_STATES_UUID,
-                VALVE_ON_OFF_UUID,
-                VALVE_0_MODE_UUID,
-                VALVE_1_MODE_UUID,
-                VALVE_2_MODE_UUID,
-                VALVE_3_MODE_UUID,
-            ]
+        if not self._is_connected:
+            return
+
+        async with self._lock:
+            uuids = self._uuids_to_fetch(force)
 
             try:
-                bytes_array: List[bytes] = await asyncio.gather(
+                bytes_array: List[bytes | BaseException | None] = await asyncio.gather(
                     *[self._read(uuid) for uuid in uuids],
                     return_exceptions=True,
                 )
 
-                for i, some_bytes in enumerate(bytes_array):
-                    uuid = uuids[i]
+                for uuid, some_bytes in zip(uuids, bytes_array):
+                    if isinstance(some_bytes, BaseException):
+                        raise some_bytes
 
-                    # This is a little awkward, but it's the only single
-                    # attribute we read regularly.
-                    if uuid == BATTERY_UUID:
-                        self._battery = parse_battery_value(some_bytes)
+                    if some_bytes is None:
+                        continue
 
-                    for valve in self._valves:
-                        some_bytes = uuids.index(uuid)
-                        valve.update_state(bytes_array[some_bytes], uuids[i])
+                    if uuid == MANUFACTURER_UUID:
+                        self._update_model(some_bytes)
+                    else:
+                        self._update_state(uuid, some_bytes)
+                        self._read_cache.mark(uuid)
 
             except BleakError as error:
                 # Only throw this error if the device is still connected
                 if self._is_connected:
                     raise error
 
+    def _uuids_to_fetch(self, force: bool) -> List[str]:
+        """Returns the characteristics `fetch_state` has to read"""
+
+        # Subscribed characteristics are kept up to date by notifications, they're
+        # only read when no notification arrived for NOTIFY_POLL_SECONDS
+        uuids = [
+            uuid
+            for uuid in (BATTERY_UUID, *self._valve_uuids)
+            if force
+            or not self._read_cache.is_fresh(
+                uuid,
+                NOTIFY_POLL_SECONDS if uuid in self._subscriptions else None,
+            )
+        ]
+
+        # Advertised models are checked along with the first state read
+        if not is_model_verified(self._mac):
+            uuids.append(MANUFACTURER_UUID)
+
+        return uuids
+
+    def _update_state(self, uuid: str, payload: bytes) -> None:
+        """Routes a characteristic value read from or pushed by the device"""
+
+        decoded = protocol.decode(uuid, payload)
+
+        # This is a little awkward, but it's the only single
+        # attribute we read regularly.
+        if uuid == BATTERY_UUID:
+            self._battery = decoded
+            return
+
+        # Mode payloads belong to a single valve, everything else holds all four
+        index = protocol.MODE_UUID_VALVE_INDEX.get(uuid)
+        if index is not None:
+            self._valves[index].apply_decoded(uuid, decoded)
+            return
+
+        for valve in self._valves:
+            valve.apply_decoded(uuid, decoded)
+
+    @bluetooth_lock
+    async def start_notify(self, callback: DeviceCallbackType | None = None) -> None:
+        """Opt in to notifications for the valve characteristics that support them.
+        Notified values update the valves as they arrive and `fetch_state` only
+        reads them when no notification arrived for `NOTIFY_POLL_SECONDS`.
+        Subscriptions are restored whenever the device reconnects.
+
+        :param callback: Called with the device after each notification.
+        """
+
+        self._notify_callback = callback
+        self._notify_enabled = True
+
+        if self._is_connected:
+            await self._unsafe_start_notify()
+
+    @bluetooth_lock
+    async def stop_notify(self) -> None:
+        """Unsubscribes from every notification and returns to polling"""
+
+        self._notify_callback = None
+        self._notify_enabled = False
+
+        for uuid in list(self._subscriptions):
+            self._subscriptions.discard(uuid)
+
+            if not self._is_connected:
+                continue
+
+            characteristic = self._characteristic(uuid)
+            if characteristic is None:
+                continue
+
+            try:
+                await self._connection.stop_notify(characteristic)
+            except BleakError:
+                _LOGGER.error("Failed to unsubscribe from %s on %s", uuid, self._mac)
+
+    async def _unsafe_start_notify(self) -> None:
+        """Subscribes to every notifying characteristic that isn't subscribed yet.
+        WARNING: This function runs without an internal lock."""
+
+        # Only the characteristics the device advertises as notify/indicate are
+        # subscribed to
+        for uuid in self._valve_uuids:
+            if uuid in self._subscriptions:
+                continue
+
+            characteristic = self._characteristic(uuid)
+            if characteristic is None or not (
+                "notify" in characteristic.properties
+                or "indicate" in characteristic.properties
+            ):
+                continue
+
+            try:
+                await self._connection.start_notify(
+                    characteristic, self._notification_handler(uuid)
+                )
+            except BleakError:
+                _LOGGER.error("Failed to subscribe to %s on %s", uuid, self._mac)
+                continue
+
+            self._subscriptions.add(uuid)
+
+    def _notification_handler(self, uuid: str) -> Callable[[Any, bytearray], None]:
+        """Returns the notification handler for a characteristic"""
+
+        def handler(_sender: Any, data: bytearray) -> None:
+            # A locked operation, like a push, owns the valve state. Applying the
+            # value now could clear dirty flags mid-push, so the next fetch reads it
+            if self._lock.locked():
+                self._read_cache.invalidate(uuid)
+                return
+
+            self._update_state(uuid, bytes(data))
+            self._read_cache.mark(uuid)
+
+            if self._notify_callback is not None:
+                self._notify_callback(self)
+
+        return handler
+
+    def _characteristic(self, uuid: str) -> BleakGATTCharacteristic | None:
+        """Returns the resolved characteristic for a UUID. Every characteristic is
+        resolved once per connection, and again if the services change."""
+
+        services = self._connection.services
+        if services is not self._resolved_services:
+            self._characteristics = {}
+            for known_uuid in _CHARACTERISTIC_UUIDS:
+                characteristic = None
+
+                # A handle lookup is a dict hit, a UUID lookup scans every
+                # characteristic
+                handle = self._handles.get(known_uuid) if self._handles else None
+                if handle is not None:
+                    characteristic = services.get_characteristic(handle)
+                    if characteristic is not None and characteristic.uuid != known_uuid:
+                        characteristic = None
+
+                if characteristic is None:
+                    characteristic = services.get_characteristic(known_uuid)
+                if characteristic is not None:
+                    self._characteristics[known_uuid] = characteristic
+
+            self._resolved_services = services
+
+        return self._characteristics.get(uuid)
+
+    def _invalidate_characteristics(self) -> None:
+        """Drops the resolved characteristics, they're only valid for a connection"""
+        self._characteristics = {}
+        self._resolved_services = None
+
     async def _read(self, uuid: str) -> bytes | None:
         """Reads the given characteristic from the device"""
         if not self._is_connected:
             return
 
+        characteristic = self._characteristic(uuid)
+        if characteristic is None:
+            _LOGGER.error("Characteristic %s not found on %s", uuid, self._mac)
+            return
+
+        metrics = self._metrics
+        started_at = monotonic() if metrics is not None else 0
+
         try:
-            return await self._connection.read_gatt_char(uuid)
+            data = await self._connection.read_gatt_char(characteristic)
         except BleakError:
             _LOGGER.error("Failed to read %s from %s", uuid, self._mac)
+            if metrics is not None:
+                metrics.increment(READ_FAILURES, label=uuid)
+            return
+
+        if metrics is not None:
+            metrics.observe(READ_SECONDS, monotonic() - started_at, uuid)
+            metrics.increment(READ_BYTES, len(data), uuid)
+
+        return data
+
+    async def _write(self, uuid: str, data: bytes, response: bool = True) -> bool:
+        """Writes the given characteristic. Returns whether the device has the
+        characteristic.
+
+        :param response: Wait for the device to acknowledge the write. Ignored for
+        characteristics that don't support write-without-response.
+        """
+
+        characteristic = self._characteristic(uuid)
+        if characteristic is None:
+            _LOGGER.error("Characteristic %s not found on %s", uuid, self._mac)
+            return False
+
+        if not response and "write-without-response" not in characteristic.properties:
+            response = True
+
+        metrics = self._metrics
+        if metrics is None:
+            await self._connection.write_gatt_char(characteristic, data, response)
+            return True
+
+        started_at = monotonic()
+        try:
+            await self._connection.write_gatt_char(characteristic, data, response)
+        except BleakError:
+            metrics.increment(WRITE_FAILURES, label=uuid)
+            raise
+
+        metrics.observe(WRITE_SECONDS, monotonic() - started_at, uuid)
+        metrics.increment(WRITE_BYTES, len(data), uuid)
+        return True
+
+    def _pending_writes(self) -> List[Tuple[str, bytes]]:
+        """Returns the payload of every characteristic with local changes, in the
+        order they're written. The manual settings and on/off characteristics hold
+        every valve, so they're written in full if any valve changed them."""
+
+        dirty: Set[str] = set()
+        for valve in self._valves:
+            dirty |= valve.dirty_characteristics
+
+        writes: List[Tuple[str, bytes]] = []
+
+        if VALVE_MANUAL_SETTINGS_UUID in dirty:
+            writes.append(
+                (
+                    VALVE_MANUAL_SETTINGS_UUID,
+                    protocol.encode_manual_settings(
+                        [
+                            (valve.is_watering, valve.manual_watering_minutes)
+                            for valve in self._valves
+                        ]
+                    ),
+                )
+            )
+
+        if VALVE_ON_OFF_UUID in dirty:
+            writes.append(
+                (
+                    VALVE_ON_OFF_UUID,
+                    protocol.encode_on_off(
+                        [valve.schedule_enabled for valve in self._valves]
+                    ),
+                )
+            )
+
+        # Valves the hardware doesn't have keep their last known schedule
+        for valve in self._valves[: len(self._mode_uuids)]:
+            mode_uuid = VALVE_MODE_UUIDS[valve.id]
+            frequency_bytes = valve.frequency_bytes
+            if mode_uuid in dirty and frequency_bytes is not None:
+                writes.append((mode_uuid, frequency_bytes))
+
+        return writes
 
     async def _unsafe_push_state(self) -> None:
         """Pushes the new state of the device to the device. WARNING: This
         function runs without an internal lock. Public callers should use `push_state`
-        instead"""
+        instead
+
+        Only the characteristics with local changes are written, following
+        `push_strategy`."""
 
         if not self._is_connected:
             return
 
-        on_off = self._connection.services.get_characteristic(
-            VALVE_MANUAL_SETTINGS_UUID
-        )
+        writes = self._pending_writes()
+        if len(writes) == 0:
+            return
 
-        if on_off is not None:
-            await self._connection.write_gatt_char(
-                on_off.handle,
-                (
-                    # pylint: disable=protected-access
-                    self._valves[0]._manual_setting_bytes()
-                    + self._valves[1]._manual_setting_bytes()
-                    + self._valves[2]._manual_setting_bytes()
-                    + self._valves[3]._manual_setting_bytes()
-                ),
-                True,
-            )
+        if self._push_strategy == PUSH_PIPELINED:
+            await self._push_pipelined(writes)
+            return
 
-        await self._connection.write_gatt_char(
-            VALVE_ON_OFF_UUID,
-            struct.pack(
-                ">????",
-                # pylint: disable=protected-access
-                self._valves[0].schedule_enabled,
-                self._valves[1].schedule_enabled,
-                self._valves[2].schedule_enabled,
-                self._valves[3].schedule_enabled,
+        for uuid, payload in writes:
+            if await self._write(uuid, payload):
+                self._mark_clean(uuid)
+
+        await self._write(
+            UPDATED_AT_UUID, protocol.encode_updated_at(date.get_timestamp())
+        )
+
+    async def _push_pipelined(self, writes: List[Tuple[str, bytes]]) -> None:
+        """Sends every write at once without waiting for acknowledgements, then
+        reads each written characteristic back, again all at once. Only the
+        characteristics that read back as written are marked clean, the rest are
+        sent again by the next push."""
+
+        results = await asyncio.gather(
+            *(self._write(uuid, payload, response=False) for uuid, payload in writes),
+            self._write(
+                UPDATED_AT_UUID,
+                protocol.encode_updated_at(date.get_timestamp()),
+                response=False,
             ),
-            True,
         )
 
-        zone_1_frequency_bytes = self._valves[0].frequency_bytes
-        if zone_1_frequency_bytes is not None:
-            await self._connection.write_gatt_char(
-                VALVE_0_MODE_UUID, zone_1_frequency_bytes, True
-            )
+        written = [write for write, result in zip(writes, results) if result]
+        if len(written) == 0:
+            return
 
-        zone_2_frequency_bytes = self._valves[1].frequency_bytes
-        if zone_2_frequency_bytes is not None:
-            await self._connection.write_gatt_char(
-                VALVE_1_MODE_UUID, zone_2_frequency_bytes, True
-            )
+        read_back = await asyncio.gather(*(self._read(uuid) for uuid, _ in written))
 
-        zone_3_frequency_bytes = self._valves[2].frequency_bytes
-        if zone_3_frequency_bytes is not None:
-            await self._connection.write_gatt_char(
-                VALVE_2_MODE_UUID, zone_3_frequency_bytes, True
-            )
+        verified = True
+        for (uuid, payload), data in zip(written, read_back):
+            if data == payload:
+                self._mark_clean(uuid)
+            else:
+                verified = False
 
-        zone_4_frequency_bytes = self._valves[3].frequency_bytes
-        if zone_4_frequency_bytes is not None:
-            await self._connection.write_gatt_char(
-                VALVE_3_MODE_UUID, zone_4_frequency_bytes, True
-            )
+        if not verified:
+            raise BleakError(f"Failed to verify the push to {self._mac}")
+
+    @property
+    def _valve_uuids(self) -> Tuple[str, ...]:
+        """Returns the valve state characteristics of the model"""
+        return (
+            VALVE_MANUAL_SETTINGS_UUID,
+            VALVE_MANUAL_STATES_UUID,
+            VALVE_ON_OFF_UUID,
+            *self._mode_uuids,
+        )
 
-        updated_at = self._connection.services.get_characteristic(UPDATED_AT_UUID)
+    @property
+    def _mode_uuids(self) -> Tuple[str, ...]:
+        """Returns the mode characteristics of the valves the hardware has. The
+        manual and on/off characteristics always hold all four valves."""
+        return VALVE_MODE_UUIDS[: self._valve_count]
 
-        if updated_at is not None:
-            await self._connection.write_gatt_char(
-                updated_at.handle,
-                struct.pack(">I", date.get_timestamp()),
-                True,
-            )
+    def _mark_clean(self, uuid: str) -> None:
+        """Marks a characteristic shared by all valves as written to the device"""
+        for valve in self._valves:
+            valve.mark_clean(uuid)
+
+        self._read_cache.mark(uuid)
 
     async def push_state(self) -> None:
         """Pushes the new state of the device to the device"""
 
-        async with GLOBAL_BLUETOOTH_LOCK:
+        async with self._lock:
+            await self._unsafe_push_state()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Transaction]:
+        """Stages valve changes and pushes them together when the block exits,
+        writing each changed characteristic once. Holds the device lock
+        throughout, so the locking `Valve.set_*` coroutines raise a `RuntimeError`
+        when called inside.
+
+            async with device.transaction() as transaction:
+                transaction.set("zone1", is_watering=True, manual_watering_minutes=5)
+                transaction.set("zone2", frequency_enabled=False)
+
+        Nothing is changed if the block raises.
+        """
+
+        async with self._lock:
+            transaction = Transaction(self)
+            yield transaction
+
+            # pylint: disable=protected-access
+            transaction._apply()
             await self._unsafe_push_state()
 
+    async def apply(self, changes: Mapping[Valve | str, Mapping[str, Any]]) -> None:
+        """Applies changes to many valves with a single push, see `transaction`
+
+        :param changes: New values by field, by valve or valve key, e.g.
+        `{"zone1": {"is_watering": True}, "zone2": {"frequency_enabled": False}}`.
+        """
+
+        async with self.transaction() as transaction:
+            for valve, valve_changes in changes.items():
+                transaction.set(valve, **valve_changes)
+
+    def use_adapter(
+        self,
+        adapter: str,
+        ble_device: BLEDevice | None = None,
+        pool: ConnectionPool | None = None,
+    ) -> None:
+        """Moves the device to another adapter. Takes effect on the next connect.
+
+        :param adapter: The adapter the device's lock and concurrency limit belong to.
+        :param ble_device: The device as discovered by that adapter. On Linux the
+        discovering adapter is the one that connects.
+        :param pool: The connection pool of that adapter. Pools belong to a single
+        adapter, so the device leaves its current pool when none is given.
+        """
+
+        if self._lock.locked():
+            raise RuntimeError(f"Can't change the adapter of busy device {self._mac}")
+
+        if pool is not self._pool and self._is_connected:
+            raise RuntimeError(f"Can't change the pool of connected device {self._mac}")
+
+        self._lock.adapter = adapter
+        self._pool = pool
+
+        if ble_device is not None:
+            self._ble_device = ble_device
+
+    @property
+    def adapter(self) -> str:
+        """Returns the adapter the device connects through"""
+        return self._lock.adapter
+
     @property
     def battery_level(self) -> int:
         """Returns the battery level of the device"""
         return self._battery
 
     @property
-    def brand(self) -> str:
-        """Returns the manufacturer of the device"""
+    def ble_device(self) -> BLEDevice:
+        """Returns the BLEDevice the device connects through"""
+        return self._ble_device
+
+    @property
+    def brand(self) -> str | None:
+        """Returns the manufacturer of the device, None until the model is known"""
         return self._brand
 
+    def characteristic_handles(self) -> Dict[str, int]:
+        """Returns the handle of each characteristic the device exposes, keyed by
+        UUID. Empty while disconnected."""
+
+        if not self._is_connected:
+            return {}
+
+        handles: Dict[str, int] = {}
+        for uuid in _CHARACTERISTIC_UUIDS:
+            characteristic = self._characteristic(uuid)
+            if characteristic is not None:
+                handles[uuid] = characteristic.handle
+
+        return handles
+
+    @property
+    def has_sensor(self) -> bool | None:
+        """Returns whether the device has a rain sensor input, None until the model
+        is known"""
+        return self._sensor
+
     @property
     def is_connected(self) -> bool:
         """Returns whether the device is currently connected"""
         return self._is_connected
 
+    @property
+    def is_notifying(self) -> bool:
+        """Returns whether any characteristic is currently pushing notifications"""
+        return len(self._subscriptions) > 0
+
+    @property
+    def last_used(self) -> float:
+        """Returns the `time.monotonic()` timestamp of the last bluetooth operation
+        on the device"""
+        return self._lock.released_at
+
+    @property
+    def lock(self) -> BluetoothLock:
+        """Returns the lock serializing bluetooth operations on this device"""
+        return self._lock
+
+    @property
+    def pool(self) -> ConnectionPool | None:
+        """Returns the pool the device takes a connection slot from"""
+        return self._pool
+
+    @property
+    def push_strategy(self) -> str:
+        """Returns how `push_state` writes to the device.
+
+        `PUSH_RELIABLE` waits for the device to acknowledge every write.
+        `PUSH_PIPELINED` sends the writes at once, without responses where the
+        device allows it, then verifies each of them by reading it back.
+        """
+        return self._push_strategy
+
+    @push_strategy.setter
+    def push_strategy(self, value: str) -> None:
+        """Sets how `push_state` writes to the device"""
+        if value not in PUSH_STRATEGIES:
+            raise ValueError(f"Unknown push strategy {value}")
+        self._push_strategy = value
+
+    @property
+    def read_cache(self) -> ReadCache:
+        """Returns the freshness policy used by `fetch_state`"""
+        return self._read_cache
+
     @property
     def mac(self) -> str:
         """Returns the MAC address of the device"""
         return self._mac
 
     @property
-    def model(self) -> str:
-        """Returns the name of the device"""
+    def metrics(self) -> Metrics | None:
+        """Returns the metrics collected for the device, if enabled"""
+        return self._metrics
+
+    @property
+    def model(self) -> str | None:
+        """Returns the model name of the device, None until it's known"""
         return self._model
 
     @property
@@ -489,6 +1292,11 @@ class Device:
         """Sets the number of valves on the device"""
         self._valve_count = value
 
+    @property
+    def valves(self) -> List[Valve]:
+        """Returns the valves the hardware has"""
+        return self._valves[: self._valve_count]
+
     @property
     def zone1(self) -> Valve:
         """Returns the first zone on the device"""
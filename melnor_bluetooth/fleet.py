@@ -0,0 +1,179 @@
+""" Manage many Melnor Bluetooth devices at once. """
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Iterable, Iterator, List
+
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+
+from .device import Device
+from .utils.metrics import Metrics
+
+if TYPE_CHECKING:
+    from .connection import ConnectionPool
+
+_LOGGER = logging.getLogger(__name__)
+
+DeviceOperationType = Callable[[Device], Awaitable[None]]
+
+
+class FleetResult:
+    """The outcome of running an operation across every device in a fleet"""
+
+    failed: Dict[str, BaseException]
+    succeeded: List[str]
+
+    def __init__(self) -> None:
+        self.failed = {}
+        self.succeeded = []
+
+    @property
+    def ok(self) -> bool:
+        """Returns whether the operation succeeded on every device"""
+        return len(self.failed) == 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(succeeded={len(self.succeeded)}|"
+            + f"failed={len(self.failed)})"
+        )
+
+
+class DeviceFleet:
+    """Owns many devices, indexed by MAC address, and drives them concurrently"""
+
+    _devices: Dict[str, Device]
+    _max_concurrency: int
+    _metrics: Metrics | None
+    _pool: ConnectionPool | None
+    _timeout_seconds: float | None
+
+    def __init__(
+        self,
+        devices: Iterable[Device] = (),
+        max_concurrency: int = 8,
+        timeout_seconds: float | None = 30,
+        pool: ConnectionPool | None = None,
+        metrics: Metrics | None = None,
+    ) -> None:
+        """
+        :param devices: Devices to start the fleet with.
+        :param max_concurrency: Max number of devices operated on at the same time.
+        :param timeout_seconds: Deadline for each device once its operation starts.
+        None waits forever.
+        :param pool: Connection pool given to the devices created by
+        `add_ble_device`.
+        :param metrics: Metrics shared by the devices created by `add_ble_device`.
+        """
+
+        self._devices = {}
+        self._max_concurrency = max_concurrency
+        self._metrics = metrics
+        self._pool = pool
+        self._timeout_seconds = timeout_seconds
+
+        for device in devices:
+            self.add(device)
+
+    def add(self, device: Device) -> Device:
+        """Adds a device to the fleet. Returns the device already registered for
+        the MAC address if there is one."""
+        return self._devices.setdefault(device.mac, device)
+
+    def add_ble_device(self, ble_device: BLEDevice) -> Device:
+        """Returns the device for a discovered BLEDevice, creating it if it's new to
+        the fleet and refreshing the cached BLEDevice otherwise"""
+
+        device = self._devices.get(ble_device.address)
+
+        if device is None:
+            device = self._devices[ble_device.address] = Device(
+                ble_device, pool=self._pool, metrics=self._metrics
+            )
+        else:
+            device.update_ble_device(ble_device)
+
+        return device
+
+    def get(self, mac: str) -> Device | None:
+        """Returns the device with the given MAC address"""
+        return self._devices.get(mac)
+
+    def remove(self, mac: str) -> Device | None:
+        """Removes the device with the given MAC address from the fleet"""
+        return self._devices.pop(mac, None)
+
+    @property
+    def devices(self) -> List[Device]:
+        """Returns every device in the fleet"""
+        return list(self._devices.values())
+
+    async def fetch_all(self, timeout_seconds: float | None = None) -> FleetResult:
+        """Fetches the state of every device in the fleet"""
+        return await self._run(_fetch, timeout_seconds)
+
+    async def push_all(self, timeout_seconds: float | None = None) -> FleetResult:
+        """Pushes the local state of every device in the fleet"""
+        return await self._run(_push, timeout_seconds)
+
+    async def _run(
+        self, operation: DeviceOperationType, timeout_seconds: float | None
+    ) -> FleetResult:
+        """Runs the operation on every device, at most `max_concurrency` at a time.
+        A failure or timeout on one device never stops the others."""
+
+        if timeout_seconds is None:
+            timeout_seconds = self._timeout_seconds
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def run_one(device: Device) -> None:
+            async with semaphore:
+                await asyncio.wait_for(operation(device), timeout_seconds)
+
+        devices = self.devices
+        outcomes = await asyncio.gather(
+            *[run_one(device) for device in devices], return_exceptions=True
+        )
+
+        result = FleetResult()
+        for device, outcome in zip(devices, outcomes):
+            if isinstance(outcome, BaseException):
+                _LOGGER.error("Operation failed on %s: %r", device.mac, outcome)
+                result.failed[device.mac] = outcome
+            else:
+                result.succeeded.append(device.mac)
+
+        return result
+
+    def __contains__(self, mac: str) -> bool:
+        return mac in self._devices
+
+    def __getitem__(self, mac: str) -> Device:
+        return self._devices[mac]
+
+    def __iter__(self) -> Iterator[Device]:
+        return iter(self.devices)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+
+async def _fetch(device: Device) -> None:
+    await device.fetch_state()
+
+    if not device.is_connected:
+        raise BleakError(f"Failed to connect to {device.mac}")
+
+
+async def _push(device: Device) -> None:
+    if not device.is_connected:
+        await device.connect(retry_attempts=1)
+
+    if not device.is_connected:
+        raise BleakError(f"Failed to connect to {device.mac}")
+
+    await device.push_state()
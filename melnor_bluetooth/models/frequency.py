@@ -1,26 +1,45 @@
 from __future__ import annotations
 
-import struct
+import math
+import time as time_module
 from datetime import datetime, time
 
 from tzlocal import get_localzone
 
+from .. import protocol  # pylint: disable=relative-beyond-top-level
 from ..utils import date  # pylint: disable=relative-beyond-top-level
 
 
 class Frequency:
     """A class representing the Frequency schedule for a valve"""
 
-    _attr_bytes: bytes
+    __slots__ = (
+        "_attr_computed_at",
+        "_attr_computed_offset",
+        "_attr_dirty",
+        "_attr_duration_minutes",
+        "_attr_interval_hours",
+        "_attr_is_watering",
+        "_attr_next_run_timestamp",
+        "_attr_raw_start_time",
+        "_attr_schedule_end_timestamp",
+        "_attr_valid_until",
+    )
+
+    _attr_dirty: bool
     _attr_raw_start_time: int
 
     _attr_duration_minutes: int
     _attr_interval_hours: int
 
-    # Computed values
-    _attr_next_run_time: datetime | None
+    # Computed values, as unix timestamps. They're only computed when read and
+    # stay valid until the inputs change or the clock passes `_attr_valid_until`
+    _attr_computed_at: float
+    _attr_computed_offset: int | None
     _attr_is_watering: bool
-    _attr_schedule_end: datetime
+    _attr_next_run_timestamp: int | None
+    _attr_schedule_end_timestamp: int | None
+    _attr_valid_until: float | None
 
     def __init__(self) -> None:
         self._attr_duration_minutes = 10
@@ -28,39 +47,75 @@ class Frequency:
         self._attr_raw_start_time = int(
             datetime.now(tz=get_localzone()).timestamp() + date.time_shift()
         )
-        self._attr_next_run_time = None
+        self._attr_dirty = False
+
+        # Nothing is scheduled until the device or a setter provides a schedule
+        self._attr_computed_at = -math.inf
+        self._attr_computed_offset = None
+        self._attr_is_watering = False
+        self._attr_next_run_timestamp = None
+        self._attr_schedule_end_timestamp = None
+        self._attr_valid_until = math.inf
 
     def __str__(self) -> str:
         return (
             f"Next run time: {self.next_run_time} "
             f"(Frequency: {self._attr_interval_hours} hours, Duration: {self.duration_minutes} minutes)"  # noqa: E501
-            f"{' (Watering ends at ' + str(self._attr_schedule_end) + ')' if self._attr_is_watering else ''}"  # noqa: E501
+            f"{' (Watering ends at ' + str(self.schedule_end) + ')' if self.is_watering else ''}"  # noqa: E501
         )
 
     def to_bytes(self) -> bytes:
         """Convert the frequency to bytes for writing to the device"""
-        return struct.pack(
-            ">BIHB",
-            0,
-            self._attr_raw_start_time,
-            self._attr_duration_minutes,
-            self._attr_interval_hours,
+        return protocol.encode_mode(
+            (
+                self._attr_raw_start_time,
+                self._attr_duration_minutes,
+                self._attr_interval_hours,
+            )
         )
 
-    def _compute_dates(self):
+    def _invalidate(self) -> None:
+        """Drops the computed values, they're recomputed on the next read"""
+        self._attr_valid_until = None
+
+    def _ensure_computed(self) -> None:
+        now = time_module.time()
+
+        # The start time is converted with the local UTC offset and the device
+        # time shift, a DST transition moves every computed timestamp. Nothing is
+        # computed, so nothing moves, until a schedule is provided. Both are packed
+        # into one int to keep the slot small.
+        offset = time_module.localtime(now).tm_gmtoff * 1_000_000 + date.time_shift()
+
+        if (
+            self._attr_valid_until is None
+            or now >= self._attr_valid_until
+            or now < self._attr_computed_at
+            or (
+                self._attr_computed_offset is not None
+                and offset != self._attr_computed_offset
+            )
+        ):
+            self._compute_dates(now)
+            self._attr_computed_offset = offset
+
+    def _compute_dates(self, current_time_seconds: float) -> None:
+        self._attr_computed_at = int(current_time_seconds)
+
         if (
             self._attr_raw_start_time == 0
             or self._attr_interval_hours == 0
             or self._attr_duration_minutes == 0
         ):
-            self._attr_next_run_time = None
             self._attr_is_watering = False
+            self._attr_next_run_timestamp = None
+            self._attr_schedule_end_timestamp = None
+            self._attr_valid_until = math.inf
             return
 
         # Get the actual date for the start time
-        start_time = date.to_start_time(self._attr_raw_start_time)
-        start_time_seconds = start_time.timestamp()
-        current_time_seconds = datetime.now(tz=get_localzone()).timestamp()
+        start_time_seconds = date.to_start_time(self._attr_raw_start_time).timestamp()
+        duration_seconds = self._attr_duration_minutes * 60
 
         # The device clock could have the start time as years ago, so we need to
         # calculate the next run time based on the current time
@@ -68,44 +123,54 @@ class Frequency:
         seconds_since_start_time = current_time_seconds - start_time_seconds
         remainder_seconds = seconds_since_start_time % (interval_seconds)
 
-        last_run_time_seconds = current_time_seconds - remainder_seconds
+        last_run_time_seconds = int(current_time_seconds - remainder_seconds)
         next_run_time_seconds = last_run_time_seconds + (interval_seconds)
 
-        if (
-            last_run_time_seconds + (self._attr_duration_minutes * 60)
-            > current_time_seconds
-        ):
+        if last_run_time_seconds + duration_seconds > current_time_seconds:
             self._attr_is_watering = True
-            self._attr_next_run_time = datetime.fromtimestamp(
-                last_run_time_seconds, tz=get_localzone()
-            )
-            self._attr_schedule_end = datetime.fromtimestamp(
-                last_run_time_seconds + (self._attr_duration_minutes * 60),
-                tz=get_localzone(),
-            )
-
+            self._attr_next_run_timestamp = last_run_time_seconds
         else:
             self._attr_is_watering = False
-            self._attr_next_run_time = datetime.fromtimestamp(
-                next_run_time_seconds, tz=get_localzone()
-            )
-            self._attr_schedule_end = datetime.fromtimestamp(
-                next_run_time_seconds + (self._attr_duration_minutes * 60),
-                tz=get_localzone(),
-            )
+            self._attr_next_run_timestamp = next_run_time_seconds
+
+        self._attr_schedule_end_timestamp = (
+            self._attr_next_run_timestamp + duration_seconds
+        )
+
+        # The values only change once the current run ends or the next one starts
+        self._attr_valid_until = (
+            self._attr_schedule_end_timestamp
+            if self._attr_is_watering
+            else self._attr_next_run_timestamp
+        )
 
     def update_state(self, payload: bytes):
         """Update the state of the frequency from the payload"""
-        self._attr_bytes = payload
+        self.apply_decoded(protocol.decode_mode(payload))
+
+    def apply_decoded(self, decoded: protocol.Mode) -> None:
+        """Update the state of the frequency from a payload decoded by
+        `protocol.decode_mode`"""
 
         (
-            _,
             self._attr_raw_start_time,
             self._attr_duration_minutes,
             self._attr_interval_hours,
-        ) = struct.unpack_from(">BIHB", self._attr_bytes)
+        ) = decoded
+
+        # The device is now the source of truth, any local edits are discarded
+        self._attr_dirty = False
+
+        self._invalidate()
+
+    @property
+    def is_dirty(self) -> bool:
+        """True if the schedule has local changes that haven't been pushed"""
+        return self._attr_dirty
 
-        self._compute_dates()
+    def mark_clean(self) -> None:
+        """Marks the local changes as written to the device"""
+        self._attr_dirty = False
 
     @property
     def duration_minutes(self) -> int:
@@ -117,7 +182,8 @@ class Frequency:
         # The Melnor app crashes if the duration is greater than 360 minutes
         value = min([value, 360])
         self._attr_duration_minutes = value
-        self._compute_dates()
+        self._attr_dirty = True
+        self._invalidate()
 
     @property
     def interval_hours(self) -> int:
@@ -129,7 +195,8 @@ class Frequency:
         # The Melnor app crashes if the frequency is greater than 168 hours
         value = min([value, 168])
         self._attr_interval_hours = value
-        self._compute_dates()
+        self._attr_dirty = True
+        self._invalidate()
 
     @property
     def start_time(self) -> time:
@@ -137,6 +204,8 @@ class Frequency:
 
         if self._attr_raw_start_time == 0:
             self._attr_raw_start_time = date.from_start_time(datetime.now())
+            self._attr_dirty = True
+            self._invalidate()
 
         # This date we get from the device, even with the time_shift, is always
         # wrong but the time should be correcct
@@ -151,20 +220,50 @@ class Frequency:
                 microsecond=0,
             )
         )
-        self._compute_dates()
+        self._attr_dirty = True
+        self._invalidate()
+
+    @property
+    def start_timestamp(self) -> int | None:
+        """The unix timestamp every run is scheduled from, None if the schedule has
+        no start time"""
+
+        if self._attr_raw_start_time == 0:
+            return None
+
+        return int(date.to_start_time(self._attr_raw_start_time).timestamp())
 
     @property
     def is_watering(self) -> bool:
         """True if the valve is currently watering"""
+        self._ensure_computed()
         return self._attr_is_watering
 
+    @property
+    def next_run_timestamp(self) -> int | None:
+        """The unix timestamp of the next run, or the current run while watering"""
+        self._ensure_computed()
+        return self._attr_next_run_timestamp
+
     @property
     def next_run_time(self) -> datetime | None:
         """The next time the valve will run. Only the hour and minute are used.
         The date is always wrong."""
-        return self._attr_next_run_time
+        timestamp = self.next_run_timestamp
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, tz=get_localzone())
+
+    @property
+    def schedule_end_timestamp(self) -> int | None:
+        """The unix timestamp the next, or current, run stops watering at"""
+        self._ensure_computed()
+        return self._attr_schedule_end_timestamp
 
     @property
-    def schedule_end(self) -> datetime:
+    def schedule_end(self) -> datetime | None:
         """The time the valve will stop watering"""
-        return self._attr_schedule_end
+        timestamp = self.schedule_end_timestamp
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, tz=get_localzone())
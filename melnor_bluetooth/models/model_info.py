@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from typing import Dict, Mapping, Set
+
+from ..constants import (  # pylint: disable=relative-beyond-top-level
+    MODEL_BRAND_MAP,
+    MODEL_NAME_MAP,
+    MODEL_SENSOR_MAP,
+    MODEL_VALVE_MAP,
+)
+
+# Manufacturer id the model number is advertised under
+MANUFACTURER_ID = 13
+
+# Models we've learned from advertisements, keyed by MAC address
+_MODEL_CACHE: Dict[str, ModelInfo] = {}
+
+# MAC addresses whose cached model was read from the device itself
+_VERIFIED_MODELS: Set[str] = set()
+
+
+class ModelInfo:
+    """Static information about a Melnor timer model. Only the name and valve count
+    are known for models missing from the constant maps."""
+
+    __slots__ = ("brand", "model_number", "name", "sensor", "valve_count")
+
+    brand: str | None
+    model_number: str | None
+    name: str
+    sensor: bool | None
+    valve_count: int
+
+    def __init__(
+        self,
+        model_number: str | None,
+        name: str,
+        brand: str | None,
+        valve_count: int,
+        sensor: bool | None,
+    ) -> None:
+        self.brand = brand
+        self.model_number = model_number
+        self.name = name
+        self.sensor = sensor
+        self.valve_count = valve_count
+
+    @classmethod
+    def from_model_number(cls, model_number: str) -> ModelInfo | None:
+        """Returns the model for an advertised model number, e.g. "5908" """
+
+        if model_number not in MODEL_VALVE_MAP:
+            return None
+
+        return cls(
+            model_number,
+            MODEL_NAME_MAP[model_number],
+            MODEL_BRAND_MAP[model_number],
+            MODEL_VALVE_MAP[model_number],
+            MODEL_SENSOR_MAP[model_number],
+        )
+
+    @classmethod
+    def from_name(cls, name: str) -> ModelInfo | None:
+        """Returns the model for the name read from the device, e.g. "93280".
+        Model numbers sharing a name only differ in their advertisement."""
+
+        for model_number, model_name in MODEL_NAME_MAP.items():
+            if model_name == name:
+                return cls.from_model_number(model_number)
+
+        return None
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ModelInfo) and self.model_number == other.model_number
+
+    def __hash__(self) -> int:
+        return hash(self.model_number)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(model_number={self.model_number}|"
+            + f"name={self.name}|brand={self.brand}|valves={self.valve_count})"
+        )
+
+
+def parse_advertisement(manufacturer_data: Mapping[int, bytes]) -> ModelInfo | None:
+    """
+    Decodes the model from advertisement manufacturer data.
+
+    Bluez handles certain types of advertisements poorly, see
+    https://github.com/vanstinator/melnor-bluetooth/issues/17, so anything that
+    isn't a known model number is treated as missing.
+    """
+
+    data = manufacturer_data.get(MANUFACTURER_ID)
+    if data is None or len(data) < 2:
+        return None
+
+    return ModelInfo.from_model_number(f"{data[0]:02x}{data[1]:02x}")
+
+
+def cache_model(mac: str, model_info: ModelInfo, verified: bool = False) -> None:
+    """Remembers the model of the device with the given MAC address
+
+    :param verified: Whether the model was read from the device rather than
+    decoded from an advertisement.
+    """
+    _MODEL_CACHE[mac] = model_info
+
+    if verified:
+        _VERIFIED_MODELS.add(mac)
+    else:
+        _VERIFIED_MODELS.discard(mac)
+
+
+def cached_model(mac: str) -> ModelInfo | None:
+    """Returns the model learned for the given MAC address, if any"""
+    return _MODEL_CACHE.get(mac)
+
+
+def is_model_verified(mac: str) -> bool:
+    """Returns whether the cached model was read from the device itself"""
+    return mac in _VERIFIED_MODELS
+
+
+def clear_model_cache() -> None:
+    """Forgets every model learned from advertisements"""
+    _MODEL_CACHE.clear()
+    _VERIFIED_MODELS.clear()
@@ -0,0 +1,122 @@
+""" Codecs for the characteristic payloads of Melnor Bluetooth devices. """
+
+from __future__ import annotations
+
+import struct
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .constants import (
+    BATTERY_UUID,
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+    VALVE_MODE_UUIDS,
+    VALVE_ON_OFF_UUID,
+)
+from .utils import date
+from .utils.battery import parse_battery_value
+
+# 5 byte segment per valve
+# [
+#     0   - 0x00, # is_watering - boolean
+#     1-2 - 0x00, # manual_watering_time - unsigned short
+#     3-4 - 0x00, # duplicate of byte 1
+# ]
+VALVE_MANUAL_SETTING_STRUCT = struct.Struct(">?HH")
+MANUAL_SETTINGS_STRUCT = struct.Struct(">" + "?HH" * 4)
+
+# 5 byte segment per valve for the manual watering time left
+# [
+#     0   - 0x00, # unclear, 0-2
+#     1-4 - 0x00, # timestamp - unsigned int
+# ]
+MANUAL_STATES_STRUCT = struct.Struct(">" + "BI" * 4)
+
+# 1 byte per valve, whether the frequency schedule is enabled
+ON_OFF_STRUCT = struct.Struct(">????")
+
+# 8 byte segment for a single valve mode
+# [
+#     0   - 0x00, # unclear, always 0
+#     1-4 - 0x00, # timestamp - unsigned int
+#     5-6 - 0x00, # duration - unsigned short
+#     7   - 0x00, # frequency - unsigned char
+# ]
+MODE_STRUCT = struct.Struct(">BIHB")
+
+UPDATED_AT_STRUCT = struct.Struct(">I")
+
+# (is_watering, manual_minutes)
+ManualSetting = Tuple[bool, int]
+
+# (raw_start_time, duration_minutes, interval_hours)
+Mode = Tuple[int, int, int]
+
+# The valve each mode characteristic belongs to
+MODE_UUID_VALVE_INDEX: Dict[str, int] = {
+    uuid: index for index, uuid in enumerate(VALVE_MODE_UUIDS)
+}
+
+
+def decode_manual_settings(payload: bytes) -> List[ManualSetting]:
+    """Decodes the manual watering settings of all four valves"""
+    values = MANUAL_SETTINGS_STRUCT.unpack_from(payload)
+    return [(values[i], values[i + 1]) for i in range(0, 12, 3)]
+
+
+def encode_manual_settings(settings: Sequence[ManualSetting]) -> bytes:
+    """Encodes the manual watering settings of all four valves"""
+    values: List[Any] = []
+    for is_watering, minutes in settings:
+        values += (is_watering, minutes, minutes)
+    return MANUAL_SETTINGS_STRUCT.pack(*values)
+
+
+def decode_manual_states(payload: bytes) -> List[int]:
+    """Decodes the unix timestamp each valve stops manually watering at. 0 means the
+    valve isn't watering."""
+    values = MANUAL_STATES_STRUCT.unpack_from(payload)
+    shift = date.time_shift()
+    return [value - shift if value != 0 else 0 for value in values[1::2]]
+
+
+def decode_on_off(payload: bytes) -> Tuple[bool, ...]:
+    """Decodes whether the frequency schedule of each valve is enabled"""
+    return ON_OFF_STRUCT.unpack_from(payload)
+
+
+def encode_on_off(enabled: Sequence[bool]) -> bytes:
+    """Encodes whether the frequency schedule of each valve is enabled"""
+    return ON_OFF_STRUCT.pack(*enabled)
+
+
+def decode_mode(payload: bytes) -> Mode:
+    """Decodes the frequency schedule of a single valve"""
+    _, raw_start_time, duration_minutes, interval_hours = MODE_STRUCT.unpack_from(
+        payload
+    )
+    return raw_start_time, duration_minutes, interval_hours
+
+
+def encode_mode(mode: Mode) -> bytes:
+    """Encodes the frequency schedule of a single valve"""
+    return MODE_STRUCT.pack(0, *mode)
+
+
+def encode_updated_at(timestamp: int) -> bytes:
+    """Encodes the device clock timestamp of the last update"""
+    return UPDATED_AT_STRUCT.pack(timestamp)
+
+
+DECODERS: Dict[str, Callable[[bytes], Any]] = {
+    BATTERY_UUID: parse_battery_value,
+    VALVE_MANUAL_SETTINGS_UUID: decode_manual_settings,
+    VALVE_MANUAL_STATES_UUID: decode_manual_states,
+    VALVE_ON_OFF_UUID: decode_on_off,
+    **{uuid: decode_mode for uuid in VALVE_MODE_UUIDS},
+}
+
+
+def decode(uuid: str, payload: bytes) -> Any:
+    """Decodes the payload of the given characteristic. Raises a KeyError for
+    characteristics without a decoder."""
+    return DECODERS[uuid](payload)
@@ -0,0 +1,351 @@
+""" Persist what we know about devices to speed up cold starts. """
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+
+from bleak.backends.device import BLEDevice
+
+from .device import ConnectorType, Device
+from .models.model_info import ModelInfo, cache_model, is_model_verified
+from .scanner import scan_advertisements
+from .utils.ble import advertisement_rssi, make_ble_device
+from .utils.lock import DEFAULT_ADAPTER
+from .utils.metrics import Metrics
+
+if TYPE_CHECKING:
+    from .connection import ConnectionPool
+
+_LOGGER = logging.getLogger(__name__)
+
+REGISTRY_VERSION = 1
+
+
+class RegistryEntry:
+    """Everything needed to connect to a device without scanning for it first"""
+
+    __slots__ = (
+        "brand",
+        "handles",
+        "mac",
+        "model",
+        "name",
+        "path",
+        "rssi",
+        "sensor",
+        "updated_at",
+        "valve_count",
+    )
+
+    brand: str | None
+    handles: Dict[str, int]
+    mac: str
+    model: str | None
+    name: str | None
+    path: str | None
+    rssi: int | None
+    sensor: bool | None
+    updated_at: float
+    valve_count: int
+
+    def __init__(
+        self,
+        mac: str,
+        name: str | None = None,
+        path: str | None = None,
+        model: str | None = None,
+        brand: str | None = None,
+        sensor: bool | None = None,
+        valve_count: int = 4,
+        rssi: int | None = None,
+        handles: Dict[str, int] | None = None,
+        updated_at: float | None = None,
+    ) -> None:
+        self.brand = brand
+        self.handles = handles or {}
+        self.mac = mac
+        self.model = model
+        self.name = name
+        self.path = path
+        self.rssi = rssi
+        self.sensor = sensor
+        self.updated_at = time.time() if updated_at is None else updated_at
+        self.valve_count = valve_count
+
+    @property
+    def model_info(self) -> ModelInfo | None:
+        """Returns the recorded model, None if the device was never connected"""
+
+        if self.model is None:
+            return None
+
+        return ModelInfo(None, self.model, self.brand, self.valve_count, self.sensor)
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        """Returns whether the entry is older than the given age"""
+        return time.time() - self.updated_at > max_age_seconds
+
+    def to_ble_device(self) -> BLEDevice:
+        """Returns a BLEDevice that can be connected to without scanning. Only the
+        BlueZ backend keeps connection details we can persist, the D-Bus path."""
+        details = {"path": self.path, "props": {}} if self.path else None
+        return make_ble_device(self.mac, self.name, details)
+
+    def update_ble_device(self, ble_device: BLEDevice, rssi: int | None = None) -> None:
+        """Refreshes the entry from a discovered BLEDevice and the RSSI it was
+        discovered with, if known"""
+
+        details = ble_device.details
+        if isinstance(details, dict) and isinstance(details.get("path"), str):
+            self.path = details["path"]
+
+        self.name = ble_device.name
+        if rssi is not None:
+            self.rssi = rssi
+        self.updated_at = time.time()
+
+    def update_device(self, device: Device) -> None:
+        """Refreshes the entry from a device, including its model and characteristic
+        handles once it has connected. Only models read from the device are
+        recorded, not advertised ones."""
+
+        self.update_ble_device(device.ble_device)
+
+        if device.model is not None and is_model_verified(device.mac):
+            self.brand = device.brand
+            self.model = device.model
+            self.sensor = device.has_sensor
+            self.valve_count = device.valve_count
+
+        handles = device.characteristic_handles()
+        if handles:
+            self.handles = handles
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the entry as a JSON serializable dict"""
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> RegistryEntry:
+        """Returns the entry stored in a dict made by `to_dict`"""
+        return cls(**{attr: data[attr] for attr in cls.__slots__ if attr in data})
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(mac={self.mac}|model={self.model}|"
+            + f"valves={self.valve_count}|rssi={self.rssi})"
+        )
+
+
+class DeviceRegistry:
+    """
+    On-disk registry of known devices, keyed by MAC address.
+
+    Devices built from the registry skip the discovery scan and know their model
+    before connecting, so a restarted process can send its first command right
+    away.
+
+        registry = DeviceRegistry("~/.melnor/devices.json")
+        device = registry.device("00:00:00:00:00:01")
+        await device.connect()
+        registry.record(device)
+        registry.save()
+    """
+
+    _entries: Dict[str, RegistryEntry]
+    _path: str
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: JSON file the registry is stored in. It's created on the first
+        save.
+        """
+
+        self._entries = {}
+        self._path = os.path.expanduser(path)
+
+        self.load()
+
+    @property
+    def path(self) -> str:
+        """Returns the file the registry is stored in"""
+        return self._path
+
+    def load(self) -> None:
+        """Reads the registry from disk. A missing, corrupt or malformed file is
+        treated as an empty registry."""
+
+        self._entries = {}
+
+        try:
+            with open(self._path, encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            _LOGGER.error("Failed to load device registry %s", self._path)
+            return
+
+        if not isinstance(data, dict):
+            _LOGGER.error("Failed to load device registry %s", self._path)
+            return
+
+        if data.get("version") != REGISTRY_VERSION:
+            _LOGGER.warning("Ignoring device registry %s, unknown version", self._path)
+            return
+
+        entries: Dict[str, RegistryEntry] = {}
+        try:
+            for item in data.get("devices", []):
+                entry = RegistryEntry.from_dict(item)
+                entries[entry.mac] = entry
+        except (AttributeError, KeyError, TypeError, ValueError):
+            _LOGGER.error("Failed to load device registry %s", self._path)
+            return
+
+        self._entries = entries
+
+    def save(self) -> None:
+        """Writes the registry to disk. The file is replaced atomically so a crash
+        never leaves a partial registry behind."""
+
+        directory = os.path.dirname(self._path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "version": REGISTRY_VERSION,
+            "devices": [entry.to_dict() for entry in self._entries.values()],
+        }
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2, sort_keys=True)
+            os.replace(temp_path, self._path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get(self, mac: str) -> RegistryEntry | None:
+        """Returns the entry of the device with the given MAC address"""
+        return self._entries.get(mac)
+
+    def remove(self, mac: str) -> RegistryEntry | None:
+        """Forgets the device with the given MAC address"""
+        return self._entries.pop(mac, None)
+
+    @property
+    def entries(self) -> List[RegistryEntry]:
+        """Returns every entry in the registry"""
+        return list(self._entries.values())
+
+    def record(self, device: Device) -> RegistryEntry:
+        """Creates or refreshes the entry of a device"""
+
+        entry = self._entries.get(device.mac)
+        if entry is None:
+            entry = self._entries[device.mac] = RegistryEntry(device.mac)
+
+        entry.update_device(device)
+
+        return entry
+
+    def device(
+        self,
+        mac: str,
+        adapter: str = DEFAULT_ADAPTER,
+        read_ttls: Dict[str, float] | None = None,
+        pool: ConnectionPool | None = None,
+        connector: ConnectorType | None = None,
+        metrics: Metrics | None = None,
+    ) -> Device:
+        """Builds a device from its entry, ready to connect without a scan. Raises a
+        KeyError for unknown MAC addresses. The other arguments are passed on to
+        `Device`."""
+
+        entry = self._entries[mac]
+
+        model_info = entry.model_info
+        if model_info is not None:
+            cache_model(mac, model_info, verified=True)
+
+        return Device(
+            entry.to_ble_device(),
+            adapter=adapter,
+            read_ttls=read_ttls,
+            pool=pool,
+            connector=connector,
+            metrics=metrics,
+            characteristic_handles=entry.handles or None,
+        )
+
+    def devices(
+        self,
+        adapter: str = DEFAULT_ADAPTER,
+        pool: ConnectionPool | None = None,
+        connector: ConnectorType | None = None,
+        metrics: Metrics | None = None,
+    ) -> List[Device]:
+        """Builds every device in the registry"""
+        return [
+            self.device(
+                mac, adapter=adapter, pool=pool, connector=connector, metrics=metrics
+            )
+            for mac in self._entries
+        ]
+
+    async def refresh(
+        self, max_age_seconds: float = 86400, scan_timeout_seconds: float = 30
+    ) -> List[str]:
+        """
+        Rescans for the devices whose entry is older than `max_age_seconds` and
+        saves the registry if any were found.
+
+        :return: The MAC addresses that were refreshed.
+        """
+
+        stale = [entry.mac for entry in self if entry.is_stale(max_age_seconds)]
+        if not stale:
+            return []
+
+        refreshed: List[str] = []
+        async for ble_device, advertisement_data in scan_advertisements(
+            addresses=stale, scan_timeout_seconds=scan_timeout_seconds
+        ):
+            entry = self._entries.get(ble_device.address)
+            if entry is not None:
+                entry.update_ble_device(
+                    ble_device, advertisement_rssi(ble_device, advertisement_data)
+                )
+                refreshed.append(entry.mac)
+
+        if refreshed:
+            self.save()
+
+        _LOGGER.debug("Refreshed %d of %d stale devices", len(refreshed), len(stale))
+
+        return refreshed
+
+    def refresh_in_background(
+        self, max_age_seconds: float = 86400, scan_timeout_seconds: float = 30
+    ) -> asyncio.Task:
+        """Starts `refresh` without waiting for it. Keep a reference to the returned
+        task until it's done."""
+        return asyncio.get_running_loop().create_task(
+            self.refresh(max_age_seconds, scan_timeout_seconds)
+        )
+
+    def __contains__(self, mac: str) -> bool:
+        return mac in self._entries
+
+    def __iter__(self) -> Iterator[RegistryEntry]:
+        return iter(self.entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
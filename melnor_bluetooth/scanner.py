@@ -1,64 +1,264 @@
 """ Cheap scanner implementation for discovering Melnor Bluetooth devices."""
 
+from __future__ import annotations
+
 import asyncio
 import logging
 import sys
-from typing import Callable
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Iterable, Set, Tuple
 
 from bleak import BleakScanner  # type: ignore - this is a valid import
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
+from .models.model_info import cache_model, is_model_verified, parse_advertisement
+
 _LOGGER = logging.getLogger(__name__)
 
 DeviceCallbackType = Callable[[BLEDevice], None]
+AdvertisementCallbackType = Callable[[BLEDevice, AdvertisementData], None]
+
+# Advertisement events
+NEW_DEVICE = "new_device"
+CHANGED_ADVERTISEMENT = "changed_advertisement"
 
 lock = asyncio.Lock()
 
 
+class AdvertisementCache:
+    """
+    Bounded LRU cache of the last advertisement seen from each address.
+
+    Devices advertise many times per second, `event` filters that stream down to
+    the first advertisement of a device and the ones whose content changed. Changes
+    are reported at most once per `min_interval_seconds` for each address.
+    """
+
+    _entries: OrderedDict[str, Tuple[tuple, float]]
+    _max_size: int
+    _min_interval_seconds: float
+
+    def __init__(self, max_size: int = 256, min_interval_seconds: float = 5) -> None:
+        """
+        :param max_size: Max number of addresses remembered. The least recently
+        seen address is forgotten first and reported as new if it comes back.
+        :param min_interval_seconds: Min time between two change events of an
+        address.
+        """
+
+        self._entries = OrderedDict()
+        self._max_size = max_size
+        self._min_interval_seconds = min_interval_seconds
+
+    def event(
+        self, ble_device: BLEDevice, ble_advertisement_data: AdvertisementData
+    ) -> str | None:
+        """Returns `NEW_DEVICE` or `CHANGED_ADVERTISEMENT` if the advertisement
+        should be reported, None if it's a repeat or rate limited"""
+
+        address = ble_device.address
+        fingerprint = (
+            ble_device.name,
+            tuple(sorted(ble_advertisement_data.manufacturer_data.items())),
+        )
+        now = time.monotonic()
+
+        entry = self._entries.get(address)
+
+        if entry is None:
+            self._entries[address] = (fingerprint, now)
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+            return NEW_DEVICE
+
+        self._entries.move_to_end(address)
+
+        last_fingerprint, reported_at = entry
+        if last_fingerprint == fingerprint:
+            return None
+
+        # The change is kept pending and reported once the interval has passed
+        if now - reported_at < self._min_interval_seconds:
+            return None
+
+        self._entries[address] = (fingerprint, now)
+        return CHANGED_ADVERTISEMENT
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 def _callback(
     ble_device: BLEDevice,
     ble_advertisement_data: AdvertisementData,
-    callback: DeviceCallbackType,
+    callback: AdvertisementCallbackType,
+    cache: AdvertisementCache | None = None,
 ):
     if ble_advertisement_data.manufacturer_data.get(13) is not None:
 
         if ble_device.address == "C52127E4-C39B-D0A0-22BD-5837BC84AB9C":
             return
 
-        #  we need to ignore the advertisement data for now
-        # https://github.com/vanstinator/melnor-bluetooth/issues/17
-        # data = ble_advertisement_data.manufacturer_data[13]
-        # model_number = f"{data[0]:02x}{data[1]:02x}"
+        if (
+            cache is not None
+            and cache.event(ble_device, ble_advertisement_data) is None
+        ):
+            return
+
+        # Lets devices know their model before connecting, a verified one is kept
+        model_info = parse_advertisement(ble_advertisement_data.manufacturer_data)
+        if model_info is not None and not is_model_verified(ble_device.address):
+            cache_model(ble_device.address, model_info)
 
         _LOGGER.debug("Found device %s: %s", ble_device.name, ble_device.address)
-        callback(ble_device)
+        callback(ble_device, ble_advertisement_data)
+
+
+def _bleak_scanner(
+    detection_callback: Callable[[BLEDevice, AdvertisementData], None],
+    adapter: str | None,
+) -> BleakScanner:
+    if adapter is None:
+        return BleakScanner(detection_callback=detection_callback)
+    return BleakScanner(detection_callback=detection_callback, adapter=adapter)
 
 
 async def scanner(
     callback: DeviceCallbackType,
     scan_timeout_seconds=60,
+    advertisement_cache: AdvertisementCache | None = None,
+    adapter: str | None = None,
 ):
     """
     Scan for devices.
 
-    :param callback: Callback function.
+    :param callback: Callback function. Called for every advertisement of a Melnor
+    device, repeats included, so RSSI updates keep flowing.
     :param scan_timeout_seconds: Timeout in seconds. Default 60 seconds
+    :param advertisement_cache: Opt in to filtering repeated advertisements: the
+    callback is then only called when a device is first seen and when its
+    advertisement changes. RSSI isn't part of the comparison. Reuse the cache to
+    keep the state across scans.
+    :param adapter: Bluetooth adapter to scan with, e.g. "hci1". Defaults to bleak's
+    default adapter.
     """
 
     _LOGGER.debug("Scanning for devices")
 
-    _scanner = BleakScanner()
+    def _device_callback(ble_device: BLEDevice, _: AdvertisementData):
+        callback(ble_device)
 
     def _callback_wrapper(
         ble_device: BLEDevice,
         ble_advertisement_data: AdvertisementData,
     ):
-        _callback(ble_device, ble_advertisement_data, callback)
+        _callback(
+            ble_device, ble_advertisement_data, _device_callback, advertisement_cache
+        )
 
-    _scanner.register_detection_callback(_callback_wrapper)
+    _scanner = _bleak_scanner(_callback_wrapper, adapter)
 
     await _scanner.start()
     if "unittest" not in sys.modules.keys():
         await asyncio.sleep(scan_timeout_seconds)
     await _scanner.stop()
+
+
+async def scan(
+    addresses: Iterable[str] | None = None,
+    count: int | None = None,
+    scan_timeout_seconds: float = 60,
+    adapter: str | None = None,
+) -> AsyncIterator[BLEDevice]:
+    """
+    Scan for devices, yielding each Melnor device once as it's discovered.
+
+    The scan stops as soon as every address in `addresses` or `count` devices have
+    been found, and after `scan_timeout_seconds` at the latest. When breaking out
+    of the loop early, close the generator to stop the scanner right away:
+
+        devices = scan(addresses=known_macs, scan_timeout_seconds=10)
+        try:
+            async for ble_device in devices:
+                fleet.add_ble_device(ble_device)
+        finally:
+            await devices.aclose()
+
+    :param addresses: Only yield these devices and stop once all were found.
+    :param count: Stop after this many devices were yielded.
+    :param scan_timeout_seconds: Upper bound on the scan in seconds. Default 60
+    :param adapter: Bluetooth adapter to scan with, e.g. "hci1". Defaults to bleak's
+    default adapter.
+    """
+
+    advertisements = scan_advertisements(
+        addresses, count, scan_timeout_seconds, adapter
+    )
+    try:
+        async for ble_device, _ in advertisements:
+            yield ble_device
+    finally:
+        await advertisements.aclose()
+
+
+async def scan_advertisements(
+    addresses: Iterable[str] | None = None,
+    count: int | None = None,
+    scan_timeout_seconds: float = 60,
+    adapter: str | None = None,
+) -> AsyncIterator[Tuple[BLEDevice, AdvertisementData]]:
+    """
+    Like `scan`, but yields each device with the advertisement it was discovered
+    by, e.g. for its RSSI.
+    """
+
+    targets = {address.upper() for address in addresses} if addresses else None
+    found: Set[str] = set()
+
+    queue: asyncio.Queue[Tuple[BLEDevice, AdvertisementData]] = asyncio.Queue()
+    cache = AdvertisementCache()
+
+    def _put(ble_device: BLEDevice, ble_advertisement_data: AdvertisementData):
+        queue.put_nowait((ble_device, ble_advertisement_data))
+
+    def _callback_wrapper(
+        ble_device: BLEDevice,
+        ble_advertisement_data: AdvertisementData,
+    ):
+        _callback(ble_device, ble_advertisement_data, _put, cache)
+
+    _LOGGER.debug("Scanning for devices")
+
+    _scanner = _bleak_scanner(_callback_wrapper, adapter)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + scan_timeout_seconds
+
+    await _scanner.start()
+
+    try:
+        while True:
+            if targets is not None and targets <= found:
+                return
+
+            if count is not None and len(found) >= count:
+                return
+
+            try:
+                ble_device, ble_advertisement_data = await asyncio.wait_for(
+                    queue.get(), max(deadline - loop.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                return
+
+            address = ble_device.address.upper()
+            if address in found or (targets is not None and address not in targets):
+                continue
+
+            found.add(address)
+            yield ble_device, ble_advertisement_data
+
+    finally:
+        await _scanner.stop()
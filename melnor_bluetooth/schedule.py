@@ -0,0 +1,205 @@
+""" Vectorized projection of valve schedules over a time window.
+
+This module needs numpy, which isn't installed with melnor-bluetooth by default.
+Install the `schedule` extra to use it, e.g. `pip install melnor-bluetooth[schedule]`.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, tzinfo
+from typing import TYPE_CHECKING, Iterable, List, Tuple, Union
+
+from tzlocal import get_localzone
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+if TYPE_CHECKING:
+    from .device import Valve
+
+TimestampType = Union[datetime, float, int]
+
+
+def _to_timestamp(value: TimestampType) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("numpy is required to project schedules")
+
+
+def _expand_ranges(first: "np.ndarray", counts: "np.ndarray") -> "np.ndarray":
+    """Returns first[i], first[i] + 1, ..., first[i] + counts[i] - 1 for every i,
+    concatenated, without a python loop"""
+    group_offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(first, counts) + np.arange(counts.sum()) - group_offsets
+
+
+class ScheduleProjection:
+    """
+    Every scheduled run of a set of valves that overlaps a time window.
+
+    Runs are stored as parallel arrays sorted by start time. `zones[i]` is the
+    index in `valves` of the valve doing run `i`, and `starts[i]` and `ends[i]` are
+    its unix timestamps.
+    """
+
+    ends: "np.ndarray"
+    starts: "np.ndarray"
+    valves: List[Valve]
+    window_end: int
+    window_start: int
+    zones: "np.ndarray"
+
+    def __init__(
+        self,
+        valves: List[Valve],
+        zones: "np.ndarray",
+        starts: "np.ndarray",
+        ends: "np.ndarray",
+        window_start: int,
+        window_end: int,
+    ) -> None:
+        self.ends = ends
+        self.starts = starts
+        self.valves = valves
+        self.window_end = window_end
+        self.window_start = window_start
+        self.zones = zones
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def watering_at(self, timestamp: TimestampType) -> "np.ndarray":
+        """Returns the sorted indices in `valves` of the zones watering at the given
+        time"""
+        moment = _to_timestamp(timestamp)
+        return np.unique(self.zones[(self.starts <= moment) & (self.ends > moment)])
+
+    def valves_watering_at(self, timestamp: TimestampType) -> List[Valve]:
+        """Returns the valves watering at the given time"""
+        return [self.valves[index] for index in self.watering_at(timestamp)]
+
+    def minutes_per_day(
+        self, tz: tzinfo | None = None
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Totals the scheduled watering of each zone per calendar day.
+
+        :param tz: The zone the days are counted in. Defaults to the local zone.
+        :return: The unix timestamp each day starts at, and a float array of minutes
+        shaped (len(valves), days). Runs are clipped to the window and split at
+        every midnight they cross, however long they last.
+        """
+
+        if tz is None:
+            tz = get_localzone()
+
+        day = datetime.fromtimestamp(self.window_start, tz=tz).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        edges = [int(day.timestamp())]
+        while edges[-1] < self.window_end:
+            # Adding a calendar day keeps midnight across DST changes
+            day = (day.replace(tzinfo=None) + timedelta(days=1)).replace(tzinfo=tz)
+            edges.append(int(day.timestamp()))
+        day_edges = np.array(edges, dtype=np.int64)
+
+        minutes = np.zeros((len(self.valves), len(edges) - 1), dtype=np.float64)
+
+        starts = np.maximum(self.starts, self.window_start)
+        ends = np.minimum(self.ends, self.window_end)
+
+        # The device accepts runs of up to 65535 minutes, split each run into one
+        # piece per day it overlaps. A run ending at midnight doesn't touch the
+        # next day.
+        first_day = np.searchsorted(day_edges, starts, side="right") - 1
+        last_day = np.searchsorted(day_edges, ends, side="left") - 1
+        counts = np.maximum(last_day - first_day + 1, 0)
+
+        piece_days = _expand_ranges(first_day, counts)
+        piece_starts = np.maximum(np.repeat(starts, counts), day_edges[piece_days])
+        piece_ends = np.minimum(np.repeat(ends, counts), day_edges[piece_days + 1])
+
+        np.add.at(
+            minutes,
+            (np.repeat(self.zones, counts), piece_days),
+            (piece_ends - piece_starts) / 60,
+        )
+
+        return day_edges[:-1], minutes
+
+
+def project_schedules(
+    valves: Iterable[Valve],
+    window_start: TimestampType,
+    window_end: TimestampType,
+    include_disabled: bool = False,
+) -> ScheduleProjection:
+    """
+    Projects every run of the given valves that overlaps the window.
+
+    :param valves: The valves to project, e.g. the `valves` of every device in a
+    fleet.
+    :param window_start: Start of the window, a datetime or unix timestamp.
+    :param window_end: End of the window, a datetime or unix timestamp.
+    :param include_disabled: Also project valves whose schedule is disabled.
+    """
+
+    _require_numpy()
+
+    valves = list(valves)
+    start = _to_timestamp(window_start)
+    end = _to_timestamp(window_end)
+
+    indices: List[int] = []
+    anchors: List[int] = []
+    intervals: List[int] = []
+    durations: List[int] = []
+
+    for index, valve in enumerate(valves):
+        frequency = valve.frequency
+        anchor = frequency.start_timestamp
+
+        if (
+            (not include_disabled and not valve.schedule_enabled)
+            or anchor is None
+            or frequency.interval_hours == 0
+            or frequency.duration_minutes == 0
+        ):
+            continue
+
+        indices.append(index)
+        anchors.append(anchor)
+        intervals.append(frequency.interval_hours * 3600)
+        durations.append(frequency.duration_minutes * 60)
+
+    anchor_array = np.array(anchors, dtype=np.int64)
+    interval_array = np.array(intervals, dtype=np.int64)
+    duration_array = np.array(durations, dtype=np.int64)
+
+    # Runs are anchor + k * interval. Keep the ones that end after the window
+    # starts and start before it ends.
+    first_run = (start - duration_array - anchor_array) // interval_array + 1
+    last_run = -((anchor_array - end) // interval_array) - 1
+    counts = np.maximum(last_run - first_run + 1, 0)
+
+    # Expand each valve into one row per run
+    run_numbers = _expand_ranges(first_run, counts)
+
+    zones = np.repeat(np.array(indices, dtype=np.int64), counts)
+    starts = np.repeat(anchor_array, counts) + run_numbers * np.repeat(
+        interval_array, counts
+    )
+    ends = starts + np.repeat(duration_array, counts)
+
+    order = np.argsort(starts, kind="stable")
+
+    return ScheduleProjection(
+        valves, zones[order], starts[order], ends[order], start, end
+    )
@@ -0,0 +1,526 @@
+""" In-process stand-in for Melnor timers, for load testing without a radio.
+
+    backend = SimulatedBackend(latency_seconds=0.05, jitter_seconds=0.02)
+    devices = [backend.device(backend.add_timer().mac) for _ in range(500)]
+    await DeviceFleet(devices).fetch_all()
+
+Devices built by the backend connect through `SimulatedBackend.establish_connection`
+instead of bleak. Timers follow the firmware: manual watering counts down, schedules
+run, and the battery drains with watering and radio traffic. Time is read from a
+`clock` so tests can move it forward, and the firmware catches up on the next
+operation.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List, Set
+
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+
+from . import protocol
+from .constants import (
+    BATTERY_UUID,
+    MANUFACTURER_UUID,
+    UPDATED_AT_UUID,
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+    VALVE_MODE_UUIDS,
+    VALVE_ON_OFF_UUID,
+)
+from .device import Device
+from .models.model_info import ModelInfo
+from .utils import date
+from .utils.ble import make_ble_device
+
+NotifyCallbackType = Callable[[Any, bytearray], None]
+
+# Share of the latency a write without response pays. It goes out with the next
+# connection event instead of waiting a round trip for the acknowledgement.
+WRITE_WITHOUT_RESPONSE_LATENCY = 0.5
+
+_READ_ONLY = ("read",)
+_READ_WRITE = ("read", "write", "write-without-response", "notify")
+
+_PROPERTIES = {
+    BATTERY_UUID: ("read", "notify"),
+    MANUFACTURER_UUID: _READ_ONLY,
+    UPDATED_AT_UUID: ("write", "write-without-response"),
+    VALVE_MANUAL_SETTINGS_UUID: _READ_WRITE,
+    VALVE_MANUAL_STATES_UUID: ("read", "notify"),
+    VALVE_ON_OFF_UUID: _READ_WRITE,
+    **{uuid: _READ_WRITE for uuid in VALVE_MODE_UUIDS},
+}
+
+
+def _encode_battery(percent: float) -> bytes:
+    """Inverse of `parse_battery_value`"""
+    value = max(percent, 0) / 181.81818181818187 + 2.35
+    whole = int(value)
+    return bytes([whole, min(math.ceil((value - whole) * 256), 255)])
+
+
+class SimulatedCharacteristic:
+    """The parts of `BleakGATTCharacteristic` the library uses"""
+
+    __slots__ = ("handle", "properties", "uuid")
+
+    handle: int
+    properties: List[str]
+    uuid: str
+
+    def __init__(self, uuid: str) -> None:
+        self.handle = int(uuid[4:8], 16)
+        self.properties = list(_PROPERTIES[uuid])
+        self.uuid = uuid
+
+
+class SimulatedServices:
+    """The parts of `BleakGATTServiceCollection` the library uses"""
+
+    __slots__ = ("_characteristics", "_handles")
+
+    _characteristics: Dict[str, SimulatedCharacteristic]
+    _handles: Dict[int, SimulatedCharacteristic]
+
+    def __init__(self) -> None:
+        self._characteristics = {
+            uuid: SimulatedCharacteristic(uuid) for uuid in _PROPERTIES
+        }
+        self._handles = {
+            characteristic.handle: characteristic
+            for characteristic in self._characteristics.values()
+        }
+
+    def get_characteristic(
+        self, specifier: int | str
+    ) -> SimulatedCharacteristic | None:
+        """Returns the characteristic with the given handle or UUID"""
+        if isinstance(specifier, int):
+            return self._handles.get(specifier)
+        return self._characteristics.get(specifier)
+
+
+class SimulatedTimer:
+    """
+    Firmware state of a single timer.
+
+    Every operation waits `latency_seconds` plus up to `jitter_seconds`, and fails
+    with a `BleakError` at `failure_rate`.
+    """
+
+    battery: float
+    end_times: List[int]
+    failure_rate: float
+    jitter_seconds: float
+    latency_seconds: float
+    mac: str
+    manual: List[protocol.ManualSetting]
+    model_info: ModelInfo
+    modes: List[protocol.Mode]
+    schedule_enabled: List[bool]
+    updated_at: int
+
+    _battery_drain_per_operation: float
+    _battery_drain_per_watering_hour: float
+    _clock: Callable[[], float]
+    _last_tick: float
+    _random: random.Random
+    _subscribers: Dict[str, NotifyCallbackType]
+
+    def __init__(
+        self,
+        mac: str,
+        model_number: str = "5908",
+        latency_seconds: float = 0,
+        jitter_seconds: float = 0,
+        failure_rate: float = 0,
+        battery: float = 80,
+        battery_drain_per_watering_hour: float = 0.5,
+        battery_drain_per_operation: float = 0.001,
+        clock: Callable[[], float] = time.time,
+        seed: int | None = None,
+    ) -> None:
+        model_info = ModelInfo.from_model_number(model_number)
+        if model_info is None:
+            raise ValueError(f"Unknown model number {model_number}")
+
+        self.battery = battery
+        self.end_times = [0] * 4
+        self.failure_rate = failure_rate
+        self.jitter_seconds = jitter_seconds
+        self.latency_seconds = latency_seconds
+        self.mac = mac
+        self.manual = [(False, 0)] * 4
+        self.model_info = model_info
+        self.modes = [(0, 0, 0)] * 4
+        self.schedule_enabled = [False] * 4
+        self.updated_at = 0
+
+        self._battery_drain_per_operation = battery_drain_per_operation
+        self._battery_drain_per_watering_hour = battery_drain_per_watering_hour
+        self._clock = clock
+        self._last_tick = clock()
+        self._random = random.Random(seed)
+        self._subscribers = {}
+
+    @property
+    def ble_device(self) -> BLEDevice:
+        """Returns a BLEDevice for building a `Device`"""
+        return make_ble_device(self.mac, "YM Timer", None)
+
+    def is_scheduled_watering(self, index: int, now: float | None = None) -> bool:
+        """Returns whether the schedule of a valve is running"""
+
+        raw_start_time, duration_minutes, interval_hours = self.modes[index]
+        if (
+            not self.schedule_enabled[index]
+            or raw_start_time == 0
+            or duration_minutes == 0
+            or interval_hours == 0
+        ):
+            return False
+
+        now = self._clock() if now is None else now
+        start = date.to_start_time(raw_start_time).timestamp()
+        return (now - start) % (interval_hours * 3600) < duration_minutes * 60
+
+    def watering_valves(self) -> List[int]:
+        """Returns the valves watering manually or on schedule"""
+        now = self._clock()
+        return [
+            index
+            for index in range(self.model_info.valve_count)
+            if self.manual[index][0] or self.is_scheduled_watering(index, now)
+        ]
+
+    async def operation(self, latency_factor: float = 1) -> None:
+        """Waits out the latency of one radio operation, then catches the firmware up
+        with the clock. Raises a `BleakError` at `failure_rate`.
+
+        :param latency_factor: Share of the latency the operation pays.
+        """
+
+        delay = latency_factor * (
+            self.latency_seconds + self._random.uniform(0, self.jitter_seconds)
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self._random.random() < self.failure_rate:
+            raise BleakError(f"Simulated failure on {self.mac}")
+
+        self.battery -= self._battery_drain_per_operation
+        self.tick()
+
+    def tick(self) -> None:
+        """Advances the firmware to the current time"""
+
+        now = self._clock()
+        elapsed = max(now - self._last_tick, 0)
+        self._last_tick = now
+
+        watering = 0
+        expired = False
+        for index in range(4):
+            is_watering, minutes = self.manual[index]
+            if is_watering and self.end_times[index] <= now:
+                self.manual[index] = (False, minutes)
+                self.end_times[index] = 0
+                expired = True
+
+            if is_watering or self.is_scheduled_watering(index, now):
+                watering += 1
+
+        self.battery -= (
+            self._battery_drain_per_watering_hour * watering * elapsed / 3600
+        )
+
+        if expired:
+            self._notify(VALVE_MANUAL_SETTINGS_UUID)
+            self._notify(VALVE_MANUAL_STATES_UUID)
+
+    def read(self, uuid: str) -> bytes:
+        """Returns the current payload of a characteristic"""
+
+        if uuid == BATTERY_UUID:
+            return _encode_battery(self.battery)
+
+        if uuid == MANUFACTURER_UUID:
+            return f"{self.model_info.name}0{self.model_info.valve_count}00".encode()
+
+        if uuid == VALVE_MANUAL_SETTINGS_UUID:
+            return protocol.encode_manual_settings(self.manual)
+
+        if uuid == VALVE_MANUAL_STATES_UUID:
+            shift = date.time_shift()
+            values: List[int] = []
+            for end_time in self.end_times:
+                values += (2 if end_time else 0, end_time + shift if end_time else 0)
+            return protocol.MANUAL_STATES_STRUCT.pack(*values)
+
+        if uuid == VALVE_ON_OFF_UUID:
+            return protocol.encode_on_off(self.schedule_enabled)
+
+        index = protocol.MODE_UUID_VALVE_INDEX.get(uuid)
+        if index is not None:
+            return protocol.encode_mode(self.modes[index])
+
+        raise BleakError(f"Characteristic {uuid} can't be read")
+
+    def write(self, uuid: str, payload: bytes) -> None:
+        """Applies a payload written by a client, like the firmware would"""
+
+        if uuid == VALVE_MANUAL_SETTINGS_UUID:
+            self._write_manual_settings(protocol.decode_manual_settings(payload))
+        elif uuid == VALVE_ON_OFF_UUID:
+            self.schedule_enabled = list(protocol.decode_on_off(payload))
+        elif uuid == UPDATED_AT_UUID:
+            (self.updated_at,) = protocol.UPDATED_AT_STRUCT.unpack(payload)
+            return
+        elif uuid in protocol.MODE_UUID_VALVE_INDEX:
+            self.modes[protocol.MODE_UUID_VALVE_INDEX[uuid]] = protocol.decode_mode(
+                payload
+            )
+        else:
+            raise BleakError(f"Characteristic {uuid} can't be written")
+
+        self._notify(uuid)
+
+    def subscribe(self, uuid: str, callback: NotifyCallbackType | None) -> None:
+        """Sends notifications for a characteristic to the callback, None stops
+        them"""
+        if callback is None:
+            self._subscribers.pop(uuid, None)
+        else:
+            self._subscribers[uuid] = callback
+
+    def _write_manual_settings(self, settings: List[protocol.ManualSetting]) -> None:
+        now = int(self._clock())
+
+        for index, (is_watering, minutes) in enumerate(settings):
+            was_watering, old_minutes = self.manual[index]
+
+            if not is_watering:
+                self.end_times[index] = 0
+            elif not was_watering or minutes != old_minutes:
+                self.end_times[index] = now + minutes * 60
+
+        self.manual = list(settings)
+        self._notify(VALVE_MANUAL_STATES_UUID)
+
+    def _notify(self, uuid: str) -> None:
+        callback = self._subscribers.get(uuid)
+        if callback is not None:
+            callback(SimulatedCharacteristic(uuid), bytearray(self.read(uuid)))
+
+
+class SimulatedClient:
+    """The parts of `BleakClient` the library uses, backed by a `SimulatedTimer`"""
+
+    _disconnected_callback: Callable[[Any], None] | None
+    _is_connected: bool
+    _notifying: Set[str]
+    _on_disconnect: Callable[[SimulatedClient], None]
+    _timer: SimulatedTimer
+    services: SimulatedServices
+
+    def __init__(
+        self,
+        timer: SimulatedTimer,
+        disconnected_callback: Callable[[Any], None] | None,
+        on_disconnect: Callable[[SimulatedClient], None],
+    ) -> None:
+        self._disconnected_callback = disconnected_callback
+        self._is_connected = True
+        self._notifying = set()
+        self._on_disconnect = on_disconnect
+        self._timer = timer
+        self.services = SimulatedServices()
+
+    @property
+    def address(self) -> str:
+        """Returns the MAC address of the simulated timer"""
+        return self._timer.mac
+
+    @property
+    def is_connected(self) -> bool:
+        """Returns whether the link is up"""
+        return self._is_connected
+
+    async def read_gatt_char(self, characteristic: Any, **kwargs) -> bytearray:
+        """Reads a characteristic"""
+        await self._operation()
+        return bytearray(self._timer.read(_uuid(characteristic)))
+
+    async def write_gatt_char(
+        self, characteristic: Any, data: bytes, response: bool = False
+    ) -> None:
+        """Writes a characteristic. Writes without response only pay part of the
+        latency, they don't wait for the device to acknowledge them."""
+        await self._operation(1 if response else WRITE_WITHOUT_RESPONSE_LATENCY)
+        self._timer.write(_uuid(characteristic), bytes(data))
+
+    async def start_notify(
+        self, characteristic: Any, callback: NotifyCallbackType, **kwargs
+    ) -> None:
+        """Subscribes to a characteristic"""
+        await self._operation()
+        uuid = _uuid(characteristic)
+        self._timer.subscribe(uuid, callback)
+        self._notifying.add(uuid)
+
+    async def stop_notify(self, characteristic: Any) -> None:
+        """Unsubscribes from a characteristic"""
+        await self._operation()
+        uuid = _uuid(characteristic)
+        self._timer.subscribe(uuid, None)
+        self._notifying.discard(uuid)
+
+    async def disconnect(self) -> bool:
+        """Closes the link"""
+        self.drop()
+        return True
+
+    def drop(self) -> None:
+        """Closes the link from the timer's side, like going out of range"""
+
+        if not self._is_connected:
+            return
+
+        self._is_connected = False
+
+        for uuid in self._notifying:
+            self._timer.subscribe(uuid, None)
+        self._notifying.clear()
+
+        self._on_disconnect(self)
+
+        if self._disconnected_callback is not None:
+            self._disconnected_callback(self)
+
+    async def _operation(self, latency_factor: float = 1) -> None:
+        if not self._is_connected:
+            raise BleakError(f"Not connected to {self._timer.mac}")
+        await self._timer.operation(latency_factor)
+
+
+def _uuid(characteristic: Any) -> str:
+    return characteristic if isinstance(characteristic, str) else characteristic.uuid
+
+
+class SimulatedBackend:
+    """
+    A radio full of simulated timers.
+
+    `establish_connection` has the signature of the bleak_retry_connector function
+    it replaces, and fails like a real adapter once `connection_limit` links are
+    open.
+    """
+
+    connection_limit: int | None
+    _clients: Set[SimulatedClient]
+    _defaults: Dict[str, Any]
+    _timers: Dict[str, SimulatedTimer]
+
+    def __init__(self, connection_limit: int | None = None, **timer_defaults) -> None:
+        """
+        :param connection_limit: Max number of open links, None for no limit.
+        :param timer_defaults: Defaults for the `SimulatedTimer` arguments of the
+        timers added with `add_timer`.
+        """
+
+        self.connection_limit = connection_limit
+        self._clients = set()
+        self._defaults = timer_defaults
+        self._timers = {}
+
+    @property
+    def connections(self) -> int:
+        """Returns the number of open links"""
+        return len(self._clients)
+
+    @property
+    def timers(self) -> List[SimulatedTimer]:
+        """Returns every simulated timer"""
+        return list(self._timers.values())
+
+    def add_timer(self, mac: str | None = None, **kwargs) -> SimulatedTimer:
+        """Adds a timer. MAC addresses are generated when not given."""
+
+        if mac is None:
+            number = len(self._timers)
+            mac = ":".join(
+                f"{(number >> shift) & 255:02X}" for shift in range(40, -8, -8)
+            )
+
+        timer = SimulatedTimer(mac, **{**self._defaults, **kwargs})
+        self._timers[mac] = timer
+
+        return timer
+
+    def get(self, mac: str) -> SimulatedTimer | None:
+        """Returns the timer with the given MAC address"""
+        return self._timers.get(mac)
+
+    def device(self, mac: str, **kwargs) -> Device:
+        """Returns a `Device` connecting to the simulated timer. Keyword arguments
+        are passed on to `Device`."""
+        return Device(
+            self._timers[mac].ble_device, connector=self.establish_connection, **kwargs
+        )
+
+    def devices(self, **kwargs) -> List[Device]:
+        """Returns a `Device` for every simulated timer"""
+        return [self.device(mac, **kwargs) for mac in self._timers]
+
+    async def establish_connection(
+        self,
+        client_class: Any = None,
+        device: BLEDevice | None = None,
+        name: str | None = None,
+        disconnected_callback: Callable[[Any], None] | None = None,
+        max_attempts: int = 4,
+        on_connect_attempt: Callable[[], None] | None = None,
+        **kwargs,
+    ) -> SimulatedClient:
+        """Connects to a simulated timer, retrying failed attempts
+
+        :param on_connect_attempt: Called before every attempt, like the `connect`
+        of the client class bleak_retry_connector is given.
+        """
+
+        if device is None or device.address not in self._timers:
+            raise BleakError(f"No simulated timer for {name}")
+
+        timer = self._timers[device.address]
+
+        error: BleakError | None = None
+        for _ in range(max(max_attempts, 1)):
+            if on_connect_attempt is not None:
+                on_connect_attempt()
+
+            try:
+                await timer.operation()
+            except BleakError as attempt_error:
+                error = attempt_error
+                continue
+
+            if (
+                self.connection_limit is not None
+                and len(self._clients) >= self.connection_limit
+            ):
+                error = BleakError("No free connection slot on the adapter")
+                continue
+
+            client = SimulatedClient(
+                timer, disconnected_callback, self._clients.discard
+            )
+            self._clients.add(client)
+            return client
+
+        raise error or BleakError(f"Failed to connect to {name}")
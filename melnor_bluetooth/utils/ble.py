@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import inspect
+from typing import Any
+
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+
+# bleak before 0.22 requires the RSSI, later versions deprecate passing it
+_BLE_DEVICE_TAKES_RSSI = "rssi" in inspect.signature(BLEDevice.__init__).parameters
+
+
+def make_ble_device(address: str, name: str | None, details: Any) -> BLEDevice:
+    """Returns a BLEDevice for a device that wasn't just discovered, on every
+    supported bleak version"""
+
+    if _BLE_DEVICE_TAKES_RSSI:
+        return BLEDevice(address, name, details, rssi=0)
+
+    return BLEDevice(address, name, details)
+
+
+def advertisement_rssi(
+    ble_device: BLEDevice, advertisement_data: AdvertisementData
+) -> int | None:
+    """Returns the RSSI a device was discovered with. bleak before 0.19 only keeps
+    it on the BLEDevice"""
+
+    rssi = getattr(advertisement_data, "rssi", None)
+    if rssi is None:
+        rssi = getattr(ble_device, "rssi", None)
+
+    return rssi
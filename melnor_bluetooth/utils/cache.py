@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+
+class ReadCache:
+    """
+    Freshness policy for characteristic reads, keyed by UUID.
+
+    The decoded values live on the device and its valves, so only the time of the
+    last read is kept here. A characteristic is fresh while it's younger than its
+    TTL and stale otherwise. A TTL of 0 means the characteristic is always read.
+    """
+
+    __slots__ = ("_default_ttl", "_owns_ttls", "_read_at", "_ttls")
+
+    _default_ttl: float
+    _owns_ttls: bool
+    _read_at: Dict[str, float]
+    _ttls: Dict[str, float]
+
+    def __init__(
+        self, ttls: Dict[str, float] | None = None, default_ttl: float = 0
+    ) -> None:
+        """
+        :param ttls: Seconds each characteristic stays fresh, keyed by UUID. The
+        mapping is shared, not copied, until `set_ttl` is called.
+        :param default_ttl: Seconds for characteristics missing from `ttls`.
+        """
+
+        self._default_ttl = default_ttl
+        self._owns_ttls = ttls is None
+        self._read_at = {}
+        self._ttls = {} if ttls is None else ttls
+
+    def ttl(self, uuid: str) -> float:
+        """Returns how many seconds a read of the characteristic stays fresh"""
+        return self._ttls.get(uuid, self._default_ttl)
+
+    def set_ttl(self, uuid: str, seconds: float) -> None:
+        """Sets how many seconds a read of the characteristic stays fresh"""
+
+        # Many caches share the default TTLs, copy them before the first change
+        if not self._owns_ttls:
+            self._ttls = dict(self._ttls)
+            self._owns_ttls = True
+
+        self._ttls[uuid] = seconds
+
+    def is_fresh(self, uuid: str, ttl: float | None = None) -> bool:
+        """Returns whether the last read of the characteristic can still be used
+
+        :param ttl: Seconds to use instead of the characteristic's TTL.
+        """
+
+        read_at = self._read_at.get(uuid)
+        if read_at is None:
+            return False
+
+        return time.monotonic() - read_at < (self.ttl(uuid) if ttl is None else ttl)
+
+    def mark(self, uuid: str) -> None:
+        """Records that the characteristic value was just read or written"""
+        self._read_at[uuid] = time.monotonic()
+
+    def invalidate(self, uuid: str | None = None) -> None:
+        """Marks a characteristic, or every characteristic, as stale"""
+        if uuid is None:
+            self._read_at.clear()
+        else:
+            self._read_at.pop(uuid, None)
@@ -1,14 +1,26 @@
+from __future__ import annotations
+
 import logging
 import time
 import zoneinfo
 from datetime import datetime, timedelta, tzinfo
+from typing import Dict, Tuple
 
 from tzlocal import get_localzone
 
 _LOGGER = logging.getLogger(__name__)
 
+_BASE_ZONE = zoneinfo.ZoneInfo("Asia/Shanghai")
+
+# How far ahead we look for the next DST transition before giving up
+_TRANSITION_HORIZON_SECONDS = 366 * 86400
+_TRANSITION_STEP_SECONDS = 86400
+
+# tz -> (valid_from, valid_until, shift)
+_SHIFT_CACHE: Dict[tzinfo, Tuple[float, float, int]] = {}
+
 
-def _time_offset(tz: tzinfo = get_localzone()):
+def _time_offset(tz: tzinfo | None = None):
     """
     Returns the archaic timezone offset in seconds.
 
@@ -20,7 +32,10 @@ def _time_offset(tz: tzinfo = get_localzone()):
     will show bad info we don't replicate the algorithm
     """
 
-    base_time = datetime.now(tz=zoneinfo.ZoneInfo("Asia/Shanghai"))
+    if tz is None:
+        tz = get_localzone()
+
+    base_time = datetime.now(tz=_BASE_ZONE)
     local_time = datetime.now(tz=tz)
 
     base_offset = base_time.utcoffset()
@@ -48,25 +63,88 @@ def _time_offset(tz: tzinfo = get_localzone()):
     )
 
 
-def time_shift(tz: tzinfo = get_localzone()) -> int:
+def _time_shift(tz: tzinfo) -> int:
     date = datetime(1970, 1, 1, tzinfo=tz).replace(fold=1)
 
     return int((date + timedelta(seconds=-_time_offset(tz) - 946656000)).timestamp())
 
 
-def get_timestamp(tz: tzinfo = get_localzone()) -> int:
+def _offsets_at(timestamp: float, zones: Tuple[tzinfo, ...]) -> tuple:
+    """Returns everything the time shift depends on at the given time"""
+    return (
+        *[datetime.fromtimestamp(timestamp, tz=zone).utcoffset() for zone in zones],
+        time.localtime(timestamp).tm_isdst,
+    )
+
+
+def _next_transition(now: float, zones: Tuple[tzinfo, ...]) -> float:
+    """Returns the first time after `now` where any of the zones changes its offset,
+    or the search horizon if none of them do"""
+
+    current = _offsets_at(now, zones)
+    start = int(now)
+
+    while start < now + _TRANSITION_HORIZON_SECONDS:
+        end = start + _TRANSITION_STEP_SECONDS
+
+        if _offsets_at(end, zones) != current:
+            # Narrow the transition down to the second
+            while end - start > 1:
+                middle = (start + end) // 2
+                if _offsets_at(middle, zones) == current:
+                    start = middle
+                else:
+                    end = middle
+            return end
+
+        start = end
+
+    return now + _TRANSITION_HORIZON_SECONDS
+
+
+def time_shift(tz: tzinfo | None = None) -> int:
+    """
+    Returns the number of seconds between the device clock and unix time.
+
+    The shift only changes when one of the zones involved changes its offset, so
+    it's cached until the next DST transition.
+    """
+
+    if tz is None:
+        tz = get_localzone()
+
+    now = time.time()
+
+    cached = _SHIFT_CACHE.get(tz)
+    if cached is not None and cached[0] <= now < cached[1]:
+        return cached[2]
+
+    shift = _time_shift(tz)
+    valid_until = _next_transition(now, (tz, _BASE_ZONE, get_localzone()))
+    _SHIFT_CACHE[tz] = (now, valid_until, shift)
+
+    return shift
+
+
+def get_timestamp(tz: tzinfo | None = None) -> int:
     """
     Returns the current timestamp as a byte array.
     """
 
+    if tz is None:
+        tz = get_localzone()
+
     return int(datetime.now(tz).timestamp() + time_shift(tz))
 
 
-def to_start_time(timestamp: int, tz: tzinfo = get_localzone()) -> datetime:
+def to_start_time(timestamp: int, tz: tzinfo | None = None) -> datetime:
     """
     Returns the current timestamp as a byte array.
     """
 
+    if tz is None:
+        tz = get_localzone()
+
     return datetime.fromtimestamp(
         timestamp,
     ).replace(
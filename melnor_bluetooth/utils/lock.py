@@ -1,21 +1,453 @@
+from __future__ import annotations
+
 import asyncio
+import logging
+import os
+import sys
+import time
+from collections import deque
 from functools import wraps
-from typing import Any, Callable, Coroutine, TypeVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    List,
+    Tuple,
+    TypeVar,
+)
+
+from .metrics import LOCK_WAIT_SECONDS
+
+if TYPE_CHECKING:
+    from .metrics import Metrics
 
-GLOBAL_BLUETOOTH_LOCK: asyncio.Lock = asyncio.Lock()  # type: ignore
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_ADAPTER = "default"
 
 RT = TypeVar("RT")
 
+# Max number of devices using each adapter at the same time
+_ADAPTER_LIMITS: Dict[str, int] = {}
+
+# Semaphores enforcing the limits, keyed by adapter along with the event loop they
+# were created in
+_ADAPTER_SEMAPHORES: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+_PROFILER: LockProfiler | None = None
+
+
+def set_adapter_concurrency(limit: int | None, adapter: str = DEFAULT_ADAPTER) -> None:
+    """
+    Limits how many devices can use an adapter at the same time.
+
+    :param limit: Max number of devices holding their lock on the adapter. None
+    removes the limit.
+    :param adapter: The adapter the limit applies to.
+    """
+
+    # The semaphore is created on first use, inside the event loop that waits on it
+    _ADAPTER_SEMAPHORES.pop(adapter, None)
+
+    if limit is None:
+        _ADAPTER_LIMITS.pop(adapter, None)
+    else:
+        _ADAPTER_LIMITS[adapter] = limit
+
+
+def _adapter_semaphore(adapter: str) -> asyncio.Semaphore | None:
+    """Returns the semaphore limiting an adapter in the running event loop"""
+
+    limit = _ADAPTER_LIMITS.get(adapter)
+    if limit is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    cached = _ADAPTER_SEMAPHORES.get(adapter)
+    if cached is None or cached[0] is not loop:
+        cached = (loop, asyncio.Semaphore(limit))
+        _ADAPTER_SEMAPHORES[adapter] = cached
+
+    return cached[1]
+
+
+def set_lock_profiler(profiler: LockProfiler | None) -> None:
+    """
+    Profiles every bluetooth lock, or stops profiling with None.
+
+    Only acquisitions started while the profiler is set are recorded.
+    """
+
+    global _PROFILER  # pylint: disable=global-statement
+    _PROFILER = profiler
+
+
+class LockRecord:
+    """One hold of a bluetooth lock"""
+
+    __slots__ = ("hold_seconds", "name", "queue_depth", "site", "wait_seconds")
+
+    hold_seconds: float
+    name: str
+    queue_depth: int
+    site: str
+    wait_seconds: float
+
+    def __init__(
+        self,
+        name: str,
+        site: str,
+        wait_seconds: float,
+        hold_seconds: float,
+        queue_depth: int,
+    ) -> None:
+        self.hold_seconds = hold_seconds
+        self.name = name
+        self.queue_depth = queue_depth
+        self.site = site
+        self.wait_seconds = wait_seconds
+
+
+class LockSiteStats:
+    """Aggregated holds of bluetooth locks taken at one call site"""
+
+    __slots__ = (
+        "count",
+        "hold_max",
+        "hold_total",
+        "queue_depth_max",
+        "wait_max",
+        "wait_total",
+    )
+
+    count: int
+    hold_max: float
+    hold_total: float
+    queue_depth_max: int
+    wait_max: float
+    wait_total: float
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.hold_max = 0
+        self.hold_total = 0
+        self.queue_depth_max = 0
+        self.wait_max = 0
+        self.wait_total = 0
+
+    def add(self, record: LockRecord) -> None:
+        """Adds a hold to the totals"""
+        self.count += 1
+        self.hold_max = max(self.hold_max, record.hold_seconds)
+        self.hold_total += record.hold_seconds
+        self.queue_depth_max = max(self.queue_depth_max, record.queue_depth)
+        self.wait_max = max(self.wait_max, record.wait_seconds)
+        self.wait_total += record.wait_seconds
+
+
+class LockProfiler:
+    """
+    Records who holds bluetooth locks, for how long, and how many wait behind them.
+
+    Each hold is attributed to its call site: the function decorated with
+    `bluetooth_lock`, or the function that entered the lock with `async with`.
+    The queue depth is the number of operations already holding or waiting for the
+    lock when an operation asks for it.
+
+        profiler = LockProfiler(hold_warning_seconds=2)
+        set_lock_profiler(profiler)
+        ...
+        print(profiler.report())
+    """
+
+    __slots__ = ("_records", "_sites", "hold_warning_seconds")
+
+    _records: Deque[LockRecord]
+    _sites: Dict[str, LockSiteStats]
+    hold_warning_seconds: float | None
+
+    def __init__(
+        self, hold_warning_seconds: float | None = 5, max_records: int = 1000
+    ) -> None:
+        """
+        :param hold_warning_seconds: Log a warning when a lock is held longer than
+        this. None never warns.
+        :param max_records: Number of recent holds kept in `records`. The per site
+        stats cover every hold.
+        """
+
+        self._records = deque(maxlen=max_records)
+        self._sites = {}
+        self.hold_warning_seconds = hold_warning_seconds
+
+    def record(self, record: LockRecord) -> None:
+        """Records a hold. Called by `BluetoothLock` when it's released."""
+
+        self._records.append(record)
+
+        stats = self._sites.get(record.site)
+        if stats is None:
+            stats = self._sites[record.site] = LockSiteStats()
+        stats.add(record)
+
+        if (
+            self.hold_warning_seconds is not None
+            and record.hold_seconds > self.hold_warning_seconds
+        ):
+            _LOGGER.warning(
+                "%s held the bluetooth lock of %s for %.3fs",
+                record.site,
+                record.name,
+                record.hold_seconds,
+            )
+
+    @property
+    def records(self) -> List[LockRecord]:
+        """Returns the most recent holds, oldest first"""
+        return list(self._records)
+
+    @property
+    def sites(self) -> Dict[str, LockSiteStats]:
+        """Returns the stats of every call site"""
+        return dict(self._sites)
+
+    def report(self, limit: int | None = None) -> str:
+        """Returns a table of the call sites holding the locks the longest in total"""
+
+        sites = sorted(
+            self._sites.items(), key=lambda item: item[1].hold_total, reverse=True
+        )[:limit]
+
+        lines = [
+            f"{'site':<48} {'count':>7} {'hold total':>11} {'hold max':>9}"
+            + f" {'wait total':>11} {'wait max':>9} {'queue':>6}"
+        ]
+        for site, stats in sites:
+            lines.append(
+                f"{site:<48} {stats.count:>7} {stats.hold_total:>10.3f}s"
+                + f" {stats.hold_max:>8.3f}s {stats.wait_total:>10.3f}s"
+                + f" {stats.wait_max:>8.3f}s {stats.queue_depth_max:>6}"
+            )
+
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """Drops every record"""
+        self._records.clear()
+        self._sites.clear()
+
+
+def _call_site() -> str:
+    """Returns the function entering the lock, skipping this module's frames"""
+
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+
+    if frame is None:
+        return "<unknown>"
+
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _function_site(func: Callable[..., Any]) -> str:
+    code = func.__code__
+    return (
+        f"{func.__qualname__} "
+        + f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class BluetoothLock:
+    """
+    Lock hierarchy for a single device.
+
+    The device lock is always taken first so one timer only ever sees one
+    operation at a time. A slot on the adapter is then taken if a concurrency
+    limit was set with `set_adapter_concurrency`. Waiting on the device lock
+    never holds an adapter slot. The lock isn't reentrant: a task taking it again
+    while holding it gets a `RuntimeError` instead of waiting on itself forever.
+
+    `released_at` is the `time.monotonic()` timestamp the lock was last released
+    at, i.e. when the device was last used. With `metrics`, the time spent waiting
+    for the device lock and the adapter slot is recorded as `lock_wait_seconds`.
+    Holds are also recorded by the profiler set with `set_lock_profiler`.
+    """
+
+    __slots__ = (
+        "_hold",
+        "_lock",
+        "_owner",
+        "_queued",
+        "_semaphore",
+        "adapter",
+        "metrics",
+        "name",
+        "released_at",
+    )
+
+    _hold: Tuple[LockProfiler, str, float, float, int] | None
+    _lock: asyncio.Lock
+    _owner: asyncio.Task | None
+    _queued: int
+    _semaphore: asyncio.Semaphore | None
+    adapter: str
+    metrics: Metrics | None
+    name: str
+    released_at: float
+
+    def __init__(
+        self,
+        adapter: str = DEFAULT_ADAPTER,
+        metrics: Metrics | None = None,
+        name: str = "",
+    ) -> None:
+        """
+        :param adapter: The adapter the concurrency limit is taken from.
+        :param metrics: Records the time spent waiting for the lock.
+        :param name: Identifies the lock in profiler records, e.g. the MAC address.
+        """
+
+        self._hold = None
+        self._lock = asyncio.Lock()
+        self._owner = None
+        self._queued = 0
+        self._semaphore = None
+        self.adapter = adapter
+        self.metrics = metrics
+        self.name = name
+        self.released_at = time.monotonic()
+
+    def locked(self) -> bool:
+        """Returns whether the device lock is currently held"""
+        return self._lock.locked()
+
+    @property
+    def holder(self) -> str | None:
+        """Returns the call site holding the lock, if it's held while profiling"""
+        return self._hold[1] if self._hold is not None else None
+
+    @property
+    def queue_depth(self) -> int:
+        """Returns the number of operations holding or waiting for the lock"""
+        return self._queued
+
+    async def acquire(self, site: str | None = None) -> None:
+        """Takes the device lock, then the adapter slot
+
+        :param site: Call site the hold is attributed to when profiling. Found from
+        the stack when not given.
+        """
+
+        task = asyncio.current_task()
+        if task is not None and task is self._owner:
+            raise RuntimeError(
+                f"The bluetooth lock of {self.name or 'the device'} is already held"
+                + " by this task"
+            )
+
+        metrics = self.metrics
+        profiler = _PROFILER
+        timed = metrics is not None or profiler is not None
+        started_at = time.monotonic() if timed else 0
+
+        queue_depth = self._queued
+        self._queued += 1
+
+        try:
+            await self._acquire()
+        except BaseException:
+            self._queued -= 1
+            raise
+
+        self._owner = task
+
+        if not timed:
+            return
+
+        acquired_at = time.monotonic()
+        wait_seconds = acquired_at - started_at
+
+        if metrics is not None:
+            metrics.observe(LOCK_WAIT_SECONDS, wait_seconds)
+
+        if profiler is not None:
+            self._hold = (
+                profiler,
+                site or _call_site(),
+                acquired_at,
+                wait_seconds,
+                queue_depth,
+            )
+
+    async def _acquire(self) -> None:
+        await self._lock.acquire()
+
+        semaphore = _adapter_semaphore(self.adapter)
+        if semaphore is not None:
+            try:
+                await semaphore.acquire()
+            except BaseException:
+                self._lock.release()
+                raise
+
+        self._semaphore = semaphore
+
+    def release(self) -> None:
+        """Gives back the adapter slot, then the device lock"""
+
+        if self._semaphore is not None:
+            self._semaphore.release()
+            self._semaphore = None
+
+        hold = self._hold
+        self._hold = None
+        self._owner = None
+
+        self.released_at = time.monotonic()
+        self._queued -= 1
+        self._lock.release()
+
+        if hold is not None:
+            profiler, site, acquired_at, wait_seconds, queue_depth = hold
+            profiler.record(
+                LockRecord(
+                    self.name,
+                    site,
+                    wait_seconds,
+                    self.released_at - acquired_at,
+                    queue_depth,
+                )
+            )
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *args) -> None:
+        self.release()
+
 
 def bluetooth_lock(
     func: Callable[..., Coroutine[Any, Any, RT]]
 ) -> Callable[..., Coroutine[Any, Any, RT]]:
-    """Decorator to lock bluetooth operations."""
+    """Decorator to lock bluetooth operations. The first argument must expose the
+    `BluetoothLock` for its device as `lock`."""
+
+    site = _function_site(func)
 
     @wraps(func)
     async def wrapped(*args, **kwargs) -> RT:
 
-        async with GLOBAL_BLUETOOTH_LOCK:
+        lock = args[0].lock
+        await lock.acquire(site)
+        try:
             return await func(*args, **kwargs)
+        finally:
+            lock.release()
 
     return wrapped
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import bisect
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Counters
+CONNECTS = "connects"
+CONNECT_FAILURES = "connect_failures"
+READ_BYTES = "read_bytes"
+READ_FAILURES = "read_failures"
+WRITE_BYTES = "write_bytes"
+WRITE_FAILURES = "write_failures"
+
+# Histograms
+CONNECT_ATTEMPTS = "connect_attempts"
+CONNECT_SECONDS = "connect_seconds"
+LOCK_WAIT_SECONDS = "lock_wait_seconds"
+READ_SECONDS = "read_seconds"
+WRITE_SECONDS = "write_seconds"
+
+# Upper bounds of the latency buckets, in seconds. A BLE round trip takes tens of
+# milliseconds, a connect anywhere from one to tens of seconds.
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+
+# Upper bounds of the buckets for connection attempts
+ATTEMPT_BUCKETS: Tuple[float, ...] = (1, 2, 3, 4, 5, 10)
+
+MetricKey = Tuple[str, str]
+
+
+class Counter:
+    """A value that only goes up"""
+
+    __slots__ = ("value",)
+
+    value: float
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def increment(self, amount: float = 1) -> None:
+        """Adds to the counter"""
+        self.value += amount
+
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets.
+
+    Only the bucket counts, sum, min and max are kept, so memory doesn't grow with
+    the number of observations. Percentiles are estimated from the buckets.
+    """
+
+    __slots__ = ("_bounds", "buckets", "count", "max", "min", "sum")
+
+    _bounds: Sequence[float]
+    buckets: List[int]
+    count: int
+    max: float
+    min: float
+    sum: float
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """
+        :param bounds: Sorted upper bounds of the buckets. Values above the last
+        bound go to an extra overflow bucket.
+        """
+
+        self._bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.max = float("-inf")
+        self.min = float("inf")
+        self.sum = 0
+
+    @property
+    def bounds(self) -> Sequence[float]:
+        """Returns the upper bounds of the buckets"""
+        return self._bounds
+
+    def observe(self, value: float) -> None:
+        """Records a value"""
+
+        self.buckets[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """Returns the mean of the observed values"""
+        return self.sum / self.count if self.count else None
+
+    def percentile(self, percent: float) -> float | None:
+        """Returns an estimate of the value below which the given percent of
+        observations fall: the upper bound of the bucket holding it, capped by the
+        largest value observed"""
+
+        if self.count == 0:
+            return None
+
+        rank = percent / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                if index == len(self._bounds):
+                    return self.max
+                return min(self._bounds[index], self.max)
+
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a summary of the histogram"""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "buckets": dict(zip([*self._bounds, float("inf")], self.buckets)),
+        }
+
+
+class Metrics:
+    """
+    Counters and histograms of BLE operations.
+
+    Metrics are collected only for devices created with a `Metrics` instance, so
+    instrumentation costs nothing unless it's asked for. One instance can be shared
+    by many devices to aggregate them, e.g. all devices on an adapter. Metrics
+    about a characteristic are labelled with its UUID.
+
+        metrics = Metrics()
+        device = Device(ble_device, metrics=metrics)
+        ...
+        metrics.histogram(READ_SECONDS, BATTERY_UUID).percentile(99)
+    """
+
+    __slots__ = ("_counters", "_histograms")
+
+    _counters: Dict[MetricKey, Counter]
+    _histograms: Dict[MetricKey, Histogram]
+
+    def __init__(self) -> None:
+        self._counters = {}
+        self._histograms = {}
+
+    def counter(self, name: str, label: str = "") -> Counter:
+        """Returns the counter with the given name and label, creating it if needed"""
+
+        key = (name, label)
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = Counter()
+
+        return counter
+
+    def histogram(self, name: str, label: str = "") -> Histogram:
+        """Returns the histogram with the given name and label, creating it if
+        needed"""
+
+        key = (name, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(
+                ATTEMPT_BUCKETS if name == CONNECT_ATTEMPTS else DEFAULT_BUCKETS
+            )
+
+        return histogram
+
+    def increment(self, name: str, amount: float = 1, label: str = "") -> None:
+        """Adds to a counter"""
+        self.counter(name, label).increment(amount)
+
+    def observe(self, name: str, value: float, label: str = "") -> None:
+        """Records a value in a histogram"""
+        self.histogram(name, label).observe(value)
+
+    @property
+    def counters(self) -> Dict[MetricKey, Counter]:
+        """Returns every counter, keyed by name and label"""
+        return dict(self._counters)
+
+    @property
+    def histograms(self) -> Dict[MetricKey, Histogram]:
+        """Returns every histogram, keyed by name and label"""
+        return dict(self._histograms)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Returns the current value of every metric, as
+        `{"counters": {name: {label: value}}, "histograms": {name: {label: summary}}}`.
+        Unlabelled metrics use the label ""."""
+
+        counters: Dict[str, Dict[str, Any]] = {}
+        for (name, label), counter in self._counters.items():
+            counters.setdefault(name, {})[label] = counter.value
+
+        histograms: Dict[str, Dict[str, Any]] = {}
+        for (name, label), histogram in self._histograms.items():
+            histograms.setdefault(name, {})[label] = histogram.to_dict()
+
+        return {"counters": counters, "histograms": histograms}
+
+    def reset(self) -> None:
+        """Drops every metric"""
+        self._counters.clear()
+        self._histograms.clear()
@@ -2,6 +2,8 @@ import asyncio
 
 import pytest
 
+from melnor_bluetooth.models import model_info
+
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -9,3 +11,9 @@ def event_loop():
     loop = policy.new_event_loop()
     yield loop
     loop.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_model_cache():
+    yield
+    model_info.clear_model_cache()
@@ -0,0 +1,187 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+
+from melnor_bluetooth.adapters import AdapterScheduler
+from melnor_bluetooth.connection import ConnectionPool
+from melnor_bluetooth.device import Device
+from melnor_bluetooth.utils.ble import make_ble_device
+from melnor_bluetooth.utils.lock import set_adapter_concurrency
+from tests.test_device_valves import mocked_bleak_client
+from tests.test_fleet import mocked_ble_device
+from tests.test_scanner import MELNOR_DATA, advertisement_data
+
+MAC = "00:00:00:00:00:01"
+
+
+def sighting(adapter: str, mac: str = MAC) -> BLEDevice:
+    path = f"/org/bluez/{adapter}/dev_{mac.replace(':', '_')}"
+    return make_ble_device(mac, "YM Timer", {"path": path})
+
+
+def patch_failing_adapters(*adapters: str):
+    """Connections through the given adapters fail, the others succeed"""
+
+    async def establish_connection(**kwargs):
+        if any(
+            f"/{adapter}/" in kwargs["device"].details["path"] for adapter in adapters
+        ):
+            raise BleakError("Failed to connect")
+        return mocked_bleak_client()
+
+    return patch(
+        "melnor_bluetooth.device.establish_connection",
+        side_effect=establish_connection,
+    )
+
+
+class TestAdapterScheduler:
+    async def test_candidates_ranked_by_rssi_and_load(self):
+        scheduler = AdapterScheduler(["hci0", "hci1"], load_penalty=10)
+        scheduler.observe("hci0", sighting("hci0"), -60)
+        scheduler.observe("hci1", sighting("hci1"), -65)
+
+        assert scheduler.candidates(MAC) == ["hci0", "hci1"]
+
+        other = Device(sighting("hci0", "00:00:00:00:00:02"))
+        scheduler.observe("hci0", other.ble_device, -50)
+        with patch_failing_adapters():
+            await scheduler.connect(other)
+
+        assert other.adapter == "hci0"
+        assert scheduler.load("hci0") == 1
+        assert scheduler.candidates(MAC) == ["hci1", "hci0"]
+
+    async def test_assign_moves_device(self):
+        scheduler = AdapterScheduler(["hci0", "hci1"])
+        device = Device(mocked_ble_device(MAC))
+
+        assert scheduler.assign(device) is None
+
+        ble_device = sighting("hci1")
+        scheduler.observe("hci1", ble_device, -40)
+
+        assert scheduler.assign(device) == "hci1"
+        assert device.adapter == "hci1"
+        assert device.ble_device is ble_device
+
+    async def test_connect_fails_over(self):
+        scheduler = AdapterScheduler(["hci0", "hci1"], failure_cooldown_seconds=60)
+        scheduler.observe("hci0", sighting("hci0"), -40)
+        scheduler.observe("hci1", sighting("hci1"), -80)
+        device = Device(mocked_ble_device(MAC))
+
+        with patch_failing_adapters("hci0"):
+            assert await scheduler.connect(device, retry_attempts=1) is True
+
+        assert device.adapter == "hci1"
+        assert scheduler.candidates(MAC) == ["hci1"]
+
+    async def test_connect_all_adapters_fail(self):
+        scheduler = AdapterScheduler(["hci0", "hci1"])
+        scheduler.observe("hci0", sighting("hci0"), -40)
+        scheduler.observe("hci1", sighting("hci1"), -80)
+        device = Device(mocked_ble_device(MAC))
+
+        with patch_failing_adapters("hci0", "hci1"):
+            assert await scheduler.connect(device, retry_attempts=1) is False
+
+        assert scheduler.candidates(MAC) == []
+
+    async def test_discover_scans_every_adapter(self):
+        scheduler = AdapterScheduler(["hci0", "hci1", "hci2"])
+        scanned = []
+
+        async def scan_advertisements(addresses, count, scan_timeout_seconds, adapter):
+            scanned.append(adapter)
+            if adapter != "hci2":
+                rssi = -50 if adapter == "hci1" else -70
+                yield sighting(adapter), advertisement_data(MELNOR_DATA, rssi)
+
+        with patch(
+            "melnor_bluetooth.adapters.scan_advertisements", scan_advertisements
+        ):
+            assert await scheduler.discover(scan_timeout_seconds=0.01) == [MAC]
+
+        assert sorted(scanned) == ["hci0", "hci1", "hci2"]
+        assert scheduler.candidates(MAC) == ["hci1", "hci0"]
+
+    async def test_concurrency_limits(self):
+        AdapterScheduler({"hci0": 1, "hci1": None}).apply_concurrency_limits()
+        first = Device(mocked_ble_device(MAC), adapter="hci0")
+        second = Device(mocked_ble_device("00:00:00:00:00:02"), adapter="hci0")
+
+        async def use(device):
+            async with device.lock:
+                pass
+
+        try:
+            async with first.lock:
+                task = asyncio.create_task(use(second))
+                await asyncio.sleep(0.01)
+
+                assert task.done() is False
+
+            await task
+        finally:
+            set_adapter_concurrency(None, "hci0")
+
+    async def test_concurrency_limits_applied_explicitly(self):
+        scheduler = AdapterScheduler({"hci0": 1})
+        first = Device(mocked_ble_device(MAC), adapter="hci0")
+        second = Device(mocked_ble_device("00:00:00:00:00:02"), adapter="hci0")
+
+        assert scheduler.concurrency_limits == {"hci0": 1}
+
+        # Creating the scheduler doesn't limit the adapter
+        async with first.lock:
+            await asyncio.wait_for(second.lock.acquire(), 1)
+            second.lock.release()
+
+    async def test_connect_moves_device_to_adapter_pool(self):
+        scheduler = AdapterScheduler(["hci0", "hci1"], max_connections=1)
+        scheduler.observe("hci0", sighting("hci0"), -40)
+        scheduler.observe("hci1", sighting("hci1"), -80)
+        device = Device(mocked_ble_device(MAC), pool=ConnectionPool())
+
+        with patch_failing_adapters("hci0"):
+            assert await scheduler.connect(device, retry_attempts=1) is True
+
+        assert device.pool is scheduler.pool("hci1")
+        assert MAC in scheduler.pool("hci1")
+        assert len(scheduler.pool("hci0")) == 0
+
+    async def test_connect_keeps_pool_without_max_connections(self):
+        scheduler = AdapterScheduler(["hci0", "hci1"])
+        scheduler.observe("hci1", sighting("hci1"), -40)
+        pool = ConnectionPool()
+        device = Device(mocked_ble_device(MAC), pool=pool)
+
+        with patch_failing_adapters():
+            assert await scheduler.connect(device, retry_attempts=1) is True
+
+        assert device.adapter == "hci1"
+        assert device.pool is pool
+        assert MAC in pool
+
+    async def test_use_adapter_without_pool_leaves_pool(self):
+        device = Device(mocked_ble_device(MAC), pool=ConnectionPool())
+
+        device.use_adapter("hci1")
+
+        assert device.pool is None
+
+    async def test_use_adapter_rejects_busy_device(self):
+        device = Device(mocked_ble_device(MAC))
+
+        async with device.lock:
+            with pytest.raises(RuntimeError):
+                device.use_adapter("hci1")
+
+        assert device.adapter == "default"
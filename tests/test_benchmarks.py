@@ -0,0 +1,110 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import os
+
+from benchmarks.harness import (
+    Result,
+    compare,
+    load_baseline,
+    run,
+    run_async,
+    save_baseline,
+)
+
+BASELINE = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "baseline.json")
+
+
+class TestResult:
+    def test_samples_are_sorted(self):
+        result = Result("op", [0.3, 0.1, 0.2])
+
+        assert result.samples == [0.1, 0.2, 0.3]
+
+    def test_percentile(self):
+        result = Result("op", [float(value) for value in range(1, 102)])
+
+        assert result.percentile(0) == 1
+        assert result.p50 == 51
+        assert result.p99 == 100
+        assert result.percentile(100) == 101
+
+    def test_percentile_single_sample(self):
+        result = Result("op", [0.5])
+
+        assert result.p50 == 0.5
+        assert result.p99 == 0.5
+
+    def test_ops_per_second(self):
+        result = Result("op", [0.1, 0.3])
+
+        assert result.ops_per_second == 5
+
+
+class TestCompare:
+    def test_regression_past_threshold(self, capsys):
+        baseline = {
+            "slower": {"ops_per_second": 100, "p50": 0.01, "p99": 0.01},
+            "noisy": {"ops_per_second": 100, "p50": 0.01, "p99": 0.01},
+            "faster": {"ops_per_second": 100, "p50": 0.01, "p99": 0.01},
+        }
+        results = [
+            Result("slower", [1 / 80] * 10),
+            Result("noisy", [1 / 95] * 10),
+            Result("faster", [1 / 200] * 10),
+            Result("added", [0.01]),
+        ]
+
+        assert compare(results, baseline, threshold=0.1) == ["slower"]
+
+        output = capsys.readouterr().out
+        assert "REGRESSION" in output
+        assert "added" in output and "new" in output
+
+    def test_no_regressions(self):
+        result = Result("op", [0.01] * 10)
+
+        assert compare([result], {"op": result.to_dict()}) == []
+
+
+class TestBaseline:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "baseline.json")
+        results = [Result("a", [0.1, 0.2]), Result("b", [0.3])]
+
+        save_baseline(results, path)
+
+        assert load_baseline(path) == {
+            result.name: result.to_dict() for result in results
+        }
+
+    def test_committed_baseline_loads(self):
+        baseline = load_baseline(BASELINE)
+
+        assert "device.push_state/pipelined" in baseline
+        assert all(
+            set(summary) == {"ops_per_second", "p50", "p99"}
+            for summary in baseline.values()
+        )
+
+
+class TestRun:
+    def test_run_batches_samples(self):
+        calls = []
+
+        result = run("op", lambda: calls.append(1), iterations=50, batch=10)
+
+        assert len(result.samples) == 5
+        # The warmup runs one batch
+        assert len(calls) == 60
+
+    async def test_run_async(self):
+        calls = []
+
+        async def operation():
+            calls.append(1)
+
+        result = await run_async("op", operation, iterations=3, warmup=2)
+
+        assert len(result.samples) == 3
+        assert len(calls) == 5
@@ -0,0 +1,263 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+from __future__ import annotations
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from bleak.exc import BleakError
+
+from melnor_bluetooth.connection import (
+    ConnectionManager,
+    ConnectionPool,
+    next_activity,
+)
+from melnor_bluetooth.constants import (
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+)
+from melnor_bluetooth.device import Device
+from melnor_bluetooth.utils.lock import set_adapter_concurrency
+from tests.test_device_valves import mocked_bleak_client, patch_establish_connection
+from tests.test_fleet import mocked_ble_device
+
+MAC = "00:00:00:00:00:01"
+
+
+def pooled_device(mac: str = MAC, pool: ConnectionPool | None = None):
+    bleak_client = mocked_bleak_client()
+    device = Device(mocked_ble_device(mac), pool=pool)
+
+    bleak_client.disconnect = AsyncMock(
+        side_effect=lambda: device.disconnected_callback(bleak_client)
+    )
+
+    return device, bleak_client
+
+
+async def connected_device(mac: str = MAC, pool: ConnectionPool | None = None):
+    device, bleak_client = pooled_device(mac, pool)
+
+    with patch_establish_connection(bleak_client):
+        await device.connect()
+
+    return device, bleak_client
+
+
+class TestConnectionManager:
+    async def test_disconnects_idle_devices(self):
+        device, bleak_client = await connected_device()
+        manager = ConnectionManager([device], idle_timeout_seconds=0)
+
+        await manager.apply()
+
+        assert device.is_connected is False
+        bleak_client.disconnect.assert_called_once()
+
+        # Disconnecting doesn't count as using the device
+        assert manager.is_hot(device) is False
+
+    async def test_keeps_recently_used_devices(self):
+        device, bleak_client = await connected_device()
+        manager = ConnectionManager([device], idle_timeout_seconds=60)
+
+        await manager.apply()
+
+        assert device.is_connected is True
+        bleak_client.disconnect.assert_not_called()
+
+    async def test_keeps_pinned_devices(self):
+        device, _ = await connected_device()
+        manager = ConnectionManager([device], idle_timeout_seconds=0)
+        manager.keep_connected(MAC)
+
+        await manager.apply()
+
+        assert device.is_connected is True
+
+    async def test_preconnects_before_scheduled_run(self):
+        bleak_client = mocked_bleak_client()
+        device = Device(mocked_ble_device(MAC))
+        device.lock.released_at = time.monotonic() - 3600
+
+        manager = ConnectionManager(
+            [device], idle_timeout_seconds=60, preconnect_seconds=120
+        )
+
+        with patch(
+            "melnor_bluetooth.connection.next_activity",
+            return_value=int(time.time()) + 600,
+        ):
+            with patch_establish_connection(bleak_client):
+                await manager.apply()
+
+            assert device.is_connected is False
+
+        with patch(
+            "melnor_bluetooth.connection.next_activity",
+            return_value=int(time.time()) + 60,
+        ):
+            with patch_establish_connection(bleak_client):
+                await manager.apply()
+
+            assert device.is_connected is True
+
+    async def test_start_and_stop(self):
+        device, _ = await connected_device()
+
+        async with ConnectionManager(
+            [device], idle_timeout_seconds=0, interval_seconds=0.01
+        ) as manager:
+            task = manager.start()
+            await asyncio.sleep(0.05)
+
+            assert device.is_connected is False
+
+        assert task.done()
+
+    async def test_failed_connect_is_not_use(self):
+        device = Device(mocked_ble_device(MAC))
+        device.lock.released_at = time.monotonic() - 3600
+        manager = ConnectionManager([device], idle_timeout_seconds=60)
+
+        with patch(
+            "melnor_bluetooth.device.establish_connection",
+            side_effect=BleakError("unreachable"),
+        ):
+            await device.connect()
+
+        assert manager.is_hot(device) is False
+
+    async def test_slow_connect_doesnt_block_disconnects(self):
+        idle, _ = await connected_device()
+        slow = Device(mocked_ble_device("00:00:00:00:00:02"))
+        connecting = asyncio.Event()
+
+        async def establish_connection(**kwargs):
+            connecting.set()
+            await asyncio.sleep(3600)
+
+        manager = ConnectionManager(
+            [idle, slow], idle_timeout_seconds=0.05, interval_seconds=0.01
+        )
+        manager.keep_connected(slow.mac)
+
+        with patch(
+            "melnor_bluetooth.device.establish_connection",
+            side_effect=establish_connection,
+        ):
+            async with manager:
+                await asyncio.wait_for(connecting.wait(), 1)
+                await asyncio.sleep(0.2)
+
+                assert idle.is_connected is False
+                assert slow.is_connected is False
+
+        # Stopping the manager cancels the connect
+        assert slow.lock.locked() is False
+
+    async def test_next_activity_manual_watering(self):
+        device = Device(mocked_ble_device(MAC))
+        end_time = int(time.time()) + 300
+
+        assert next_activity(device) is None
+
+        for valve in device.valves:
+            valve.apply_decoded(VALVE_MANUAL_SETTINGS_UUID, [(True, 5)] * 4)
+            valve.apply_decoded(VALVE_MANUAL_STATES_UUID, [end_time] * 4)
+
+        assert next_activity(device) == end_time
+
+
+class TestConnectionPool:
+    async def test_evicts_least_recently_used(self):
+        pool = ConnectionPool(max_connections=2)
+        first, first_client = await connected_device("00:00:00:00:00:01", pool)
+        second, _ = await connected_device("00:00:00:00:00:02", pool)
+        first.lock.released_at = second.last_used - 10
+
+        third, _ = await connected_device("00:00:00:00:00:03", pool)
+
+        first_client.disconnect.assert_called_once()
+        assert first.is_connected is False
+        assert second.is_connected is True
+        assert third.is_connected is True
+        assert len(pool) == 2
+        assert "00:00:00:00:00:01" not in pool
+
+    async def test_waits_for_busy_devices(self):
+        pool = ConnectionPool(max_connections=1, poll_seconds=0.01)
+        busy, busy_client = await connected_device("00:00:00:00:00:01", pool)
+        waiting, waiting_client = pooled_device("00:00:00:00:00:02", pool)
+
+        with patch_establish_connection(waiting_client):
+            async with busy.lock:
+                task = asyncio.create_task(waiting.connect())
+                await asyncio.sleep(0.05)
+
+                assert waiting.is_connected is False
+                busy_client.disconnect.assert_not_called()
+
+            await task
+
+        assert busy.is_connected is False
+        assert waiting.is_connected is True
+        assert pool.connected == [waiting]
+
+    def test_pool_used_in_several_event_loops(self):
+        # Created outside of any event loop, like a module level pool
+        pool = ConnectionPool(max_connections=1, poll_seconds=0.01)
+
+        async def connect_while_busy():
+            busy, _ = await connected_device("00:00:00:00:00:01", pool)
+            waiting, waiting_client = pooled_device("00:00:00:00:00:02", pool)
+
+            with patch_establish_connection(waiting_client):
+                async with busy.lock:
+                    task = asyncio.create_task(waiting.connect())
+                    await asyncio.sleep(0.03)
+
+                await task
+
+            assert pool.connected == [waiting]
+            await waiting.disconnect()
+
+        asyncio.run(connect_while_busy())
+        asyncio.run(connect_while_busy())
+
+    async def test_waiting_for_slot_holds_no_adapter_slot(self):
+        pool = ConnectionPool(max_connections=1)
+        first, first_client = await connected_device("00:00:00:00:00:01", pool)
+        second, second_client = pooled_device("00:00:00:00:00:02", pool)
+
+        # Evicting the first device needs the only adapter slot
+        set_adapter_concurrency(1)
+        try:
+            with patch_establish_connection(second_client):
+                await asyncio.wait_for(second.connect(), 1)
+        finally:
+            set_adapter_concurrency(None)
+
+        first_client.disconnect.assert_called_once()
+        assert second.is_connected is True
+        assert pool.connected == [second]
+
+    async def test_failed_connect_releases_slot(self):
+        pool = ConnectionPool(max_connections=1)
+        device = Device(mocked_ble_device(MAC), pool=pool)
+
+        with patch(
+            "melnor_bluetooth.device.establish_connection",
+            side_effect=BleakError("out of slots"),
+        ):
+            await device.connect()
+
+        assert device.is_connected is False
+        assert len(pool) == 0
+
+    async def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            ConnectionPool(max_connections=0)
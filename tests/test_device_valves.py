@@ -10,11 +10,15 @@ import freezegun
 import pytest
 from bleak.backends.characteristic import BleakGATTCharacteristic
 from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
 from bleak_retry_connector import BleakClient  # type: ignore - this is a valid import
 
 from melnor_bluetooth.constants import (
     BATTERY_UUID,
+    EDEN,
     MANUFACTURER_UUID,
+    MELNOR,
+    PUSH_PIPELINED,
     VALVE_0_MODE_UUID,
     VALVE_1_MODE_UUID,
     VALVE_2_MODE_UUID,
@@ -24,6 +28,12 @@ from melnor_bluetooth.constants import (
     VALVE_ON_OFF_UUID,
 )
 from melnor_bluetooth.device import Device, Valve
+from melnor_bluetooth.models.model_info import (
+    cache_model,
+    cached_model,
+    is_model_verified,
+    parse_advertisement,
+)
 from tests.constants import TEST_UUID
 
 zone_manual_setting_bytes = struct.pack(
@@ -61,6 +71,38 @@ def fixture_mocked_ble_device() -> BLEDevice:
     return ble_device
 
 
+def mocked_services(characteristic_properties: tuple) -> Mock:
+    """Mock a BleakGATTServiceCollection, looking characteristics up by UUID or by
+    handle"""
+
+    characteristics = {}
+    handles = {}
+
+    def get_characteristic_side_effect(specifier):
+        if isinstance(specifier, int):
+            return handles.get(specifier)
+
+        if specifier not in characteristics:
+            characteristic = Mock(spec=BleakGATTCharacteristic)
+            characteristic.uuid = specifier
+            characteristic.handle = int(specifier[4:8], 16)
+            characteristic.properties = list(characteristic_properties)
+            characteristics[specifier] = characteristic
+            handles[characteristic.handle] = characteristic
+
+        return characteristics[specifier]
+
+    services = Mock()
+    services.get_characteristic = Mock(side_effect=get_characteristic_side_effect)
+
+    return services
+
+
+def read_uuids(bleak_client: Mock) -> list:
+    """The UUIDs of every characteristic read from a mocked BleakClient"""
+    return [call.args[0].uuid for call in bleak_client.read_gatt_char.call_args_list]
+
+
 def mocked_bleak_client(
     manufacturer_bytes: bytes = b"111110400",
     valve_manual_settings_bytes: bytes = struct.pack(
@@ -99,35 +141,33 @@ def mocked_bleak_client(
     ),
     valve_frequency_bytes: bytes = struct.pack(">BIHB", 0, 333333, 10, 10),
     valve_on_off_bytes: bytes = struct.pack(">BBBB", 0, 0, 0, 0),
+    characteristic_properties: tuple = ("read", "write", "notify"),
 ):
     """Mock a BleakClient"""
 
     bleak_client = Mock(spec=BleakClient)
 
-    # Services
-    bleak_client.services = Mock()
-    gatt_service = Mock(spec=BleakGATTCharacteristic)
-    gatt_service.handle = 1
-    bleak_client.services.get_characteristic = Mock(return_value=gatt_service)
+    bleak_client.services = mocked_services(characteristic_properties)
 
     # Read/Write Characteristics
     def read_gatt_char_side_effect(*args):
-        if args[0] == VALVE_MANUAL_SETTINGS_UUID:
+        uuid = args[0].uuid
+        if uuid == VALVE_MANUAL_SETTINGS_UUID:
             return valve_manual_settings_bytes
-        if args[0] == VALVE_MANUAL_STATES_UUID:
+        if uuid == VALVE_MANUAL_STATES_UUID:
             return valve_manual_states_bytes
-        if args[0] == BATTERY_UUID:
+        if uuid == BATTERY_UUID:
             return b"\x02\x85"
-        if args[0] == MANUFACTURER_UUID:
+        if uuid == MANUFACTURER_UUID:
             return manufacturer_bytes
         if (
-            args[0] == VALVE_0_MODE_UUID
-            or args[0] == VALVE_1_MODE_UUID
-            or args[0] == VALVE_2_MODE_UUID
-            or args[0] == VALVE_3_MODE_UUID
+            uuid == VALVE_0_MODE_UUID
+            or uuid == VALVE_1_MODE_UUID
+            or uuid == VALVE_2_MODE_UUID
+            or uuid == VALVE_3_MODE_UUID
         ):
             return valve_frequency_bytes
-        if args[0] == VALVE_ON_OFF_UUID:
+        if uuid == VALVE_ON_OFF_UUID:
             return valve_on_off_bytes
 
     bleak_client.read_gatt_char = AsyncMock(side_effect=read_gatt_char_side_effect)
@@ -136,6 +176,15 @@ def mocked_bleak_client(
     return bleak_client
 
 
+def _last_write(bleak_client: BleakClient, uuid: str) -> bytes:
+    """Returns the last payload written to a characteristic"""
+    return [
+        call.args[1]
+        for call in bleak_client.write_gatt_char.call_args_list
+        if call.args[0].uuid == uuid
+    ][-1]
+
+
 def patch_establish_connection(bleak_client: BleakClient = mocked_bleak_client()):
     return patch(
         "melnor_bluetooth.device.establish_connection",
@@ -186,17 +235,17 @@ class TestValveZone:
             assert zone.manual_watering_minutes == 20
 
     async def test_zone_byte_payload(self, mocked_ble_device):
-        with patch_establish_connection():
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
             device = Device(ble_device=mocked_ble_device)
             await device.connect()
 
-            zone = Valve(0, device)
-
-            await zone.set_is_watering(True)
-            await zone.set_manual_watering_minutes(10)
+            await device.zone1.set_is_watering(True)
+            await device.zone1.set_manual_watering_minutes(10)
 
-            # pylint: disable=protected-access
-            assert zone._manual_setting_bytes() == b"\x01\x00\n\x00\n"
+            assert _last_write(bleak_client, VALVE_MANUAL_SETTINGS_UUID)[:5] == (
+                b"\x01\x00\n\x00\n"
+            )
 
 
 class TestDevice:
@@ -211,6 +260,69 @@ class TestDevice:
             assert device.valve_count == 4
             assert device.rssi == mocked_ble_device.rssi
 
+    async def test_model_from_advertisement(self, mocked_ble_device):
+        cache_model(TEST_UUID, parse_advertisement({13: b"\x59\x09"}))
+
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+
+            assert device.valve_count == 2
+
+            await device.connect()
+
+            # Connecting trusts the advertisement and skips the model read
+            assert device.model == "93101"
+            assert MANUFACTURER_UUID not in read_uuids(bleak_client)
+
+            await device.fetch_state()
+
+        # The read disagrees with the advertisement, so it replaces the model
+        assert device.model == "11111"
+        assert device.valve_count == 4
+        assert cached_model(TEST_UUID).name == "11111"
+        assert is_model_verified(TEST_UUID)
+
+    async def test_advertised_model_kept_when_read_agrees(self, mocked_ble_device):
+        cache_model(TEST_UUID, parse_advertisement({13: b"\x59\x09"}))
+
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"931010200")
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+
+            await device.connect()
+            await device.fetch_state()
+            await device.fetch_state(force=True)
+
+        assert device.model == "93101"
+        assert device.brand == MELNOR
+        assert cached_model(TEST_UUID).model_number == "5909"
+        assert read_uuids(bleak_client).count(MANUFACTURER_UUID) == 1
+
+    async def test_verified_model_not_read_again(self, mocked_ble_device):
+        cache_model(TEST_UUID, parse_advertisement({13: b"\x59\x09"}), verified=True)
+
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"931010200")
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+
+            await device.connect()
+            await device.fetch_state()
+
+        assert MANUFACTURER_UUID not in read_uuids(bleak_client)
+
+    async def test_brand_from_model_read(self, mocked_ble_device):
+        with patch_establish_connection(
+            mocked_bleak_client(manufacturer_bytes=b"254430400")
+        ):
+            device = Device(ble_device=mocked_ble_device)
+            assert device.brand is None
+
+            await device.connect()
+
+        assert device.model == "25443"
+        assert device.brand == EDEN
+
     async def test_get_item(self, mocked_ble_device):
         with patch_establish_connection():
             device = Device(ble_device=mocked_ble_device)
@@ -249,9 +361,8 @@ class TestDevice:
             assert device.zone4 is None
 
     async def test_1_valve_has_all_bytes(self, mocked_ble_device):
-        with patch_establish_connection(
-            mocked_bleak_client(manufacturer_bytes=b"111110200")
-        ):
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"111110200")
+        with patch_establish_connection(bleak_client):
             device = Device(ble_device=mocked_ble_device)
 
             await device.connect()
@@ -260,14 +371,7 @@ class TestDevice:
             await device.zone1.set_manual_watering_minutes(10)
 
             assert (
-                (
-                    # pylint: disable=protected-access
-                    # pylint: disable=line-too-long
-                    device._valves[0]._manual_setting_bytes()
-                    + device._valves[1]._manual_setting_bytes()
-                    + device._valves[2]._manual_setting_bytes()
-                    + device._valves[3]._manual_setting_bytes()
-                )
+                _last_write(bleak_client, VALVE_MANUAL_SETTINGS_UUID)
                 == b"\x01\x00\n\x00\n\x00\x00\x14\x00\x14\x00\x00\x14\x00\x14\x00\x00\x14\x00\x14"  # noqa: E501
             )
 
@@ -292,6 +396,34 @@ class TestDevice:
             assert device._valves[2] is not None
             assert device._valves[3] is not None
 
+    async def test_1_valve_reads_single_mode(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"111110100")
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+
+            await device.connect()
+            await device.fetch_state()
+
+            read_uuids = {
+                call.args[0].uuid for call in bleak_client.read_gatt_char.call_args_list
+            }
+            assert VALVE_0_MODE_UUID in read_uuids
+            assert VALVE_1_MODE_UUID not in read_uuids
+            assert VALVE_2_MODE_UUID not in read_uuids
+            assert VALVE_3_MODE_UUID not in read_uuids
+
+    async def test_1_valve_skips_missing_mode_writes(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"111110100")
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+
+            await device.connect()
+
+            # pylint: disable=protected-access
+            await device._valves[1].set_frequency_interval_hours(12)
+
+            assert bleak_client.write_gatt_char.call_count == 0
+
     async def test_device_connect_noop_when_connected(self, mocked_ble_device):
         with patch_establish_connection() as mocked_establish_connection:
             device = Device(ble_device=mocked_ble_device)
@@ -335,6 +467,494 @@ class TestDevice:
             assert device.zone4.manual_watering_minutes == 0
             assert device.zone4.watering_end_time == 0
 
+    async def test_push_only_writes_dirty_characteristics(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            await device.zone1.set_is_watering(True)
+
+            # Manual settings and the updated at timestamp
+            assert bleak_client.write_gatt_char.call_count == 2
+            assert device.zone1.dirty_characteristics == set()
+
+    async def test_push_frequency_writes_single_mode(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            await device.zone2.set_frequency_interval_hours(12)
+
+            written_uuids = [
+                call.args[0].uuid
+                for call in bleak_client.write_gatt_char.call_args_list
+            ]
+            assert VALVE_1_MODE_UUID in written_uuids
+            assert VALVE_0_MODE_UUID not in written_uuids
+            assert VALVE_ON_OFF_UUID not in written_uuids
+            assert device.zone2.frequency.is_dirty is False
+
+    async def test_push_noop_when_clean(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            await device.push_state()
+
+            assert bleak_client.write_gatt_char.call_count == 0
+
+    async def test_transaction_pushes_once(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            async with device.transaction() as transaction:
+                for valve in device.valves:
+                    transaction.set(
+                        valve,
+                        manual_watering_minutes=15,
+                        is_watering=True,
+                        frequency_interval_hours=12,
+                        frequency_enabled=True,
+                    )
+
+                # Staged changes are applied when the block exits
+                assert device.zone1.is_watering is False
+
+            written_uuids = [
+                call.args[0].uuid
+                for call in bleak_client.write_gatt_char.call_args_list
+            ]
+
+            # Manual settings, on/off, four modes and the updated at timestamp
+            assert len(written_uuids) == 7
+            assert len(set(written_uuids)) == 7
+            assert all(valve.is_watering for valve in device.valves)
+            assert all(valve.frequency.interval_hours == 12 for valve in device.valves)
+            assert all(not valve.dirty_characteristics for valve in device.valves)
+
+    async def test_transaction_discarded_on_error(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            with pytest.raises(RuntimeError):
+                async with device.transaction() as transaction:
+                    transaction.set("zone1", is_watering=True)
+                    raise RuntimeError
+
+            assert device.zone1.is_watering is False
+            assert device.zone1.dirty_characteristics == set()
+            assert bleak_client.write_gatt_char.call_count == 0
+            assert device.lock.locked() is False
+
+    async def test_transaction_failed_setter_changes_nothing(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            interval_hours = device.zone1.frequency.interval_hours
+
+            with pytest.raises(AttributeError):
+                async with device.transaction() as transaction:
+                    transaction.set(
+                        "zone1", is_watering=True, frequency_interval_hours=1
+                    )
+                    # Not a datetime.time
+                    transaction.set("zone2", frequency_start_time="08:00")
+
+            assert device.zone1.is_watering is False
+            assert device.zone1.frequency.interval_hours == interval_hours
+            assert all(not valve.dirty_characteristics for valve in device.valves)
+            assert bleak_client.write_gatt_char.call_count == 0
+
+    async def test_transaction_rejects_locking_setters(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            with pytest.raises(RuntimeError):
+                async with device.transaction():
+                    await device.zone1.set_is_watering(True)
+
+            assert device.lock.locked() is False
+            assert device.zone1.is_watering is False
+
+    async def test_transaction_rejects_other_device_valve(self, mocked_ble_device):
+        device = Device(ble_device=mocked_ble_device)
+        other = Device(ble_device=mocked_ble_device)
+
+        async with device.transaction() as transaction:
+            with pytest.raises(ValueError):
+                transaction.set(other.zone1, is_watering=True)
+
+        assert transaction.changes == {}
+
+    async def test_apply(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            await device.apply(
+                {
+                    "zone1": {"is_watering": True, "manual_watering_minutes": 5},
+                    device.zone2: {"frequency_duration_minutes": 30},
+                }
+            )
+
+            assert device.zone1.is_watering is True
+            assert device.zone1.manual_watering_minutes == 5
+            assert device.zone2.frequency.duration_minutes == 30
+
+            # Manual settings, the zone 2 mode and the updated at timestamp
+            assert bleak_client.write_gatt_char.call_count == 3
+
+    async def test_apply_rejects_unknown_fields(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            with pytest.raises(ValueError):
+                await device.apply({"zone1": {"is_watering": True, "colour": "red"}})
+
+            with pytest.raises(ValueError):
+                await device.apply({"zone5": {"is_watering": True}})
+
+            assert bleak_client.write_gatt_char.call_count == 0
+
+    async def test_fetch_discards_dirty_state(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            device.zone1.is_watering = True
+            device.zone1.frequency.duration_minutes = 30
+
+            await device.fetch_state()
+            await device.push_state()
+
+            assert device.zone1.dirty_characteristics == set()
+            assert bleak_client.write_gatt_char.call_count == 0
+
+    async def test_start_notify(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            callback = Mock()
+            await device.start_notify(callback)
+
+            assert device.is_notifying is True
+            assert bleak_client.start_notify.call_count == 7
+
+            handler = bleak_client.start_notify.call_args_list[0].args[1]
+            handler(1, bytearray(zone_manual_setting_bytes))
+
+            assert device.zone1.is_watering is True
+            assert device.zone4.manual_watering_minutes == 20
+            callback.assert_called_once_with(device)
+
+    async def test_fetch_skips_subscribed_characteristics(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.start_notify()
+            bleak_client.read_gatt_char.reset_mock()
+
+            # Nothing was notified yet, so everything is read once
+            await device.fetch_state()
+
+            assert bleak_client.read_gatt_char.call_count == 8
+
+            bleak_client.read_gatt_char.reset_mock()
+            await device.fetch_state()
+
+            assert bleak_client.read_gatt_char.call_count == 0
+
+    async def test_fetch_polls_stalled_subscriptions(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.start_notify()
+            await device.fetch_state()
+            bleak_client.read_gatt_char.reset_mock()
+
+            with patch("melnor_bluetooth.device.NOTIFY_POLL_SECONDS", 0):
+                await device.fetch_state()
+
+            read_uuids = {
+                call.args[0].uuid for call in bleak_client.read_gatt_char.call_args_list
+            }
+            assert VALVE_MANUAL_SETTINGS_UUID in read_uuids
+            assert BATTERY_UUID not in read_uuids
+
+    async def test_notify_only_subscribes_existing_valves(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"111110200")
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.start_notify()
+
+            subscribed = {
+                call.args[0].uuid for call in bleak_client.start_notify.call_args_list
+            }
+            assert VALVE_1_MODE_UUID in subscribed
+            assert VALVE_2_MODE_UUID not in subscribed
+            assert len(subscribed) == 5
+
+    async def test_notification_deferred_while_locked(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+
+            callback = Mock()
+            await device.start_notify(callback)
+            handler = bleak_client.start_notify.call_args_list[0].args[1]
+
+            async with device.lock:
+                handler(1, bytearray(zone_manual_setting_bytes))
+
+            assert device.zone1.is_watering is False
+            assert not device.read_cache.is_fresh(VALVE_MANUAL_SETTINGS_UUID)
+            callback.assert_not_called()
+
+    async def test_notify_restored_after_reconnect(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.start_notify()
+
+            device.disconnected_callback(bleak_client)
+
+            assert device.is_notifying is False
+
+            await device.connect()
+
+            assert device.is_notifying is True
+            assert bleak_client.start_notify.call_count == 14
+
+    async def test_stop_notify(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.start_notify()
+
+            await device.stop_notify()
+
+            assert device.is_notifying is False
+            assert bleak_client.stop_notify.call_count == 7
+
+    async def test_fetch_skips_fresh_characteristics(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.fetch_state()
+            bleak_client.read_gatt_char.reset_mock()
+
+            await device.fetch_state()
+
+            read_uuids = {
+                call.args[0].uuid for call in bleak_client.read_gatt_char.call_args_list
+            }
+            assert read_uuids == {
+                VALVE_MANUAL_SETTINGS_UUID,
+                VALVE_MANUAL_STATES_UUID,
+                VALVE_ON_OFF_UUID,
+            }
+
+    async def test_fetch_force_reads_everything(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.fetch_state()
+            bleak_client.read_gatt_char.reset_mock()
+
+            await device.fetch_state(force=True)
+
+            assert bleak_client.read_gatt_char.call_count == 8
+
+    async def test_disconnect_invalidates_read_cache(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device, read_ttls={BATTERY_UUID: 0})
+            await device.connect()
+            await device.fetch_state()
+
+            assert device.read_cache.is_fresh(BATTERY_UUID) is False
+            assert device.read_cache.is_fresh(VALVE_0_MODE_UUID) is True
+
+            device.disconnected_callback(bleak_client)
+
+            assert device.read_cache.is_fresh(VALVE_0_MODE_UUID) is False
+
+    async def test_characteristics_resolved_once(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.fetch_state()
+            resolved = bleak_client.services.get_characteristic.call_count
+
+            await device.fetch_state(force=True)
+            await device.zone1.set_is_watering(True)
+            await device.zone2.set_frequency_interval_hours(12)
+
+            assert bleak_client.services.get_characteristic.call_count == resolved
+
+    async def test_characteristics_resolved_again_after_reconnect(
+        self, mocked_ble_device
+    ):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.fetch_state()
+            resolved = bleak_client.services.get_characteristic.call_count
+
+            device.disconnected_callback(bleak_client)
+            await device.connect()
+            await device.fetch_state()
+
+            assert bleak_client.services.get_characteristic.call_count == 2 * resolved
+
+    async def test_services_change_resolves_again(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            await device.connect()
+            await device.fetch_state()
+
+            services = Mock()
+            services.get_characteristic = Mock(return_value=None)
+            bleak_client.services = services
+            bleak_client.read_gatt_char.reset_mock()
+
+            await device.fetch_state(force=True)
+
+            assert services.get_characteristic.call_count > 0
+            assert bleak_client.read_gatt_char.call_count == 0
+
+    async def test_pipelined_push(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client(
+            characteristic_properties=("read", "write", "write-without-response")
+        )
+        written = {}
+
+        async def write_gatt_char(characteristic, data, response):
+            written[characteristic.uuid] = data
+
+        async def read_gatt_char(characteristic):
+            return written[characteristic.uuid]
+
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device, push_strategy=PUSH_PIPELINED)
+            await device.connect()
+
+            bleak_client.write_gatt_char = AsyncMock(side_effect=write_gatt_char)
+            bleak_client.read_gatt_char = AsyncMock(side_effect=read_gatt_char)
+
+            await device.zone1.set_is_watering(True)
+
+        assert all(
+            call.args[2] is False
+            for call in bleak_client.write_gatt_char.call_args_list
+        )
+        assert bleak_client.read_gatt_char.call_count == 1
+        assert device.zone1.dirty_characteristics == set()
+
+    async def test_pipelined_push_verifies_every_write(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client(
+            characteristic_properties=("read", "write", "write-without-response")
+        )
+        written = {}
+
+        async def write_gatt_char(characteristic, data, response):
+            written[characteristic.uuid] = data
+
+        async def read_gatt_char(characteristic):
+            # The device dropped the on/off write
+            if characteristic.uuid == VALVE_ON_OFF_UUID:
+                return b"\x00\x00\x00\x00"
+            return written[characteristic.uuid]
+
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device, push_strategy=PUSH_PIPELINED)
+            await device.connect()
+
+            bleak_client.write_gatt_char = AsyncMock(side_effect=write_gatt_char)
+            bleak_client.read_gatt_char = AsyncMock(side_effect=read_gatt_char)
+
+            with pytest.raises(BleakError):
+                async with device.transaction() as transaction:
+                    transaction.set(device.zone1, is_watering=True)
+                    transaction.set(device.zone2, frequency_enabled=True)
+
+        read_uuids = {
+            call.args[0].uuid for call in bleak_client.read_gatt_char.call_args_list
+        }
+        assert read_uuids == {VALVE_MANUAL_SETTINGS_UUID, VALVE_ON_OFF_UUID}
+        assert device.zone1.dirty_characteristics == set()
+        assert device.zone2.dirty_characteristics == {VALVE_ON_OFF_UUID}
+
+    async def test_pipelined_push_verification_failure(self, mocked_ble_device):
+        bleak_client = mocked_bleak_client(
+            characteristic_properties=("read", "write", "write-without-response")
+        )
+
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device, push_strategy=PUSH_PIPELINED)
+            await device.connect()
+
+            with pytest.raises(BleakError):
+                await device.zone1.set_is_watering(True)
+
+        assert device.zone1.dirty_characteristics == {VALVE_MANUAL_SETTINGS_UUID}
+
+    async def test_pipelined_push_falls_back_to_acknowledged_writes(
+        self, mocked_ble_device
+    ):
+        bleak_client = mocked_bleak_client()
+
+        with patch_establish_connection(bleak_client):
+            device = Device(ble_device=mocked_ble_device)
+            device.push_strategy = PUSH_PIPELINED
+            await device.connect()
+
+            with pytest.raises(BleakError):
+                await device.zone1.set_is_watering(True)
+
+        assert all(
+            call.args[2] is True for call in bleak_client.write_gatt_char.call_args_list
+        )
+
+    async def test_unknown_push_strategy(self, mocked_ble_device):
+        with pytest.raises(ValueError):
+            Device(ble_device=mocked_ble_device, push_strategy="eventually")
+
+    async def test_state_objects_are_slotted(self, mocked_ble_device):
+        device = Device(ble_device=mocked_ble_device)
+
+        assert not hasattr(device, "__dict__")
+        assert not hasattr(device.zone1, "__dict__")
+        assert not hasattr(device.zone1.frequency, "__dict__")
+
     async def test_str(self, snapshot, mocked_ble_device):
         device = Device(ble_device=mocked_ble_device)
 
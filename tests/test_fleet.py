@@ -0,0 +1,155 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+from bleak.backends.device import BLEDevice
+
+from melnor_bluetooth.connection import ConnectionPool
+from melnor_bluetooth.device import Device
+from melnor_bluetooth.fleet import DeviceFleet
+from tests.test_device_valves import mocked_bleak_client
+
+
+def mocked_ble_device(address: str) -> BLEDevice:
+    ble_device = Mock(spec=BLEDevice)
+    ble_device.address = address
+    ble_device.details = {"name": "Test"}
+    ble_device.name = "YM Timer"
+    ble_device.rssi = 6
+
+    return ble_device
+
+
+def slow_bleak_client(delay_seconds: float):
+    bleak_client = mocked_bleak_client()
+    read = bleak_client.read_gatt_char.side_effect
+
+    async def slow_read(*args):
+        await asyncio.sleep(delay_seconds)
+        return read(*args)
+
+    bleak_client.read_gatt_char = AsyncMock(side_effect=slow_read)
+
+    return bleak_client
+
+
+def patch_establish_connection(clients: dict):
+    async def establish_connection(**kwargs):
+        return clients[kwargs["device"].address]
+
+    return patch(
+        "melnor_bluetooth.device.establish_connection",
+        side_effect=establish_connection,
+    )
+
+
+class TestDeviceFleet:
+    async def test_index_by_mac(self):
+        first = Device(mocked_ble_device("00:00:00:00:00:01"))
+        second = Device(mocked_ble_device("00:00:00:00:00:02"))
+
+        fleet = DeviceFleet([first, second])
+
+        assert len(fleet) == 2
+        assert "00:00:00:00:00:01" in fleet
+        assert fleet["00:00:00:00:00:02"] is second
+        assert fleet.get("00:00:00:00:00:03") is None
+        assert fleet.add(Device(mocked_ble_device("00:00:00:00:00:01"))) is first
+
+        assert fleet.remove("00:00:00:00:00:01") is first
+        assert "00:00:00:00:00:01" not in fleet
+
+    async def test_add_ble_device_refreshes_existing(self):
+        fleet = DeviceFleet()
+        ble_device = mocked_ble_device("00:00:00:00:00:01")
+
+        device = fleet.add_ble_device(ble_device)
+        refreshed = mocked_ble_device("00:00:00:00:00:01")
+        refreshed.rssi = -40
+
+        assert fleet.add_ble_device(refreshed) is device
+        assert device.rssi == -40
+
+    async def test_add_ble_device_uses_pool(self):
+        pool = ConnectionPool(max_connections=2)
+        fleet = DeviceFleet(pool=pool)
+
+        device = fleet.add_ble_device(mocked_ble_device("00:00:00:00:00:01"))
+
+        assert device.pool is pool
+
+    async def test_fetch_all_runs_concurrently(self):
+        addresses = [f"00:00:00:00:00:0{i}" for i in range(5)]
+        clients = {address: slow_bleak_client(0.05) for address in addresses}
+
+        with patch_establish_connection(clients):
+            fleet = DeviceFleet(
+                [Device(mocked_ble_device(address)) for address in addresses]
+            )
+
+            started = asyncio.get_running_loop().time()
+            result = await fleet.fetch_all()
+            elapsed = asyncio.get_running_loop().time() - started
+
+        assert result.ok
+        assert sorted(result.succeeded) == addresses
+        # Each fetch needs two sequential reads, model and state
+        assert elapsed < 0.05 * 2 * len(addresses)
+        assert all(device.battery_level == 30 for device in fleet)
+
+    async def test_fetch_all_partial_failure(self):
+        clients = {
+            "00:00:00:00:00:01": mocked_bleak_client(),
+            "00:00:00:00:00:02": slow_bleak_client(1),
+        }
+
+        with patch_establish_connection(clients):
+            fleet = DeviceFleet(
+                [Device(mocked_ble_device(address)) for address in clients]
+            )
+
+            result = await fleet.fetch_all(timeout_seconds=0.1)
+
+        assert result.ok is False
+        assert result.succeeded == ["00:00:00:00:00:01"]
+        assert isinstance(result.failed["00:00:00:00:00:02"], asyncio.TimeoutError)
+
+    async def test_push_all(self):
+        clients = {
+            "00:00:00:00:00:01": mocked_bleak_client(),
+            "00:00:00:00:00:02": mocked_bleak_client(),
+        }
+
+        with patch_establish_connection(clients):
+            fleet = DeviceFleet(
+                [Device(mocked_ble_device(address)) for address in clients]
+            )
+            fleet["00:00:00:00:00:01"].zone1.is_watering = True
+
+            result = await fleet.push_all()
+
+        assert result.ok
+        assert clients["00:00:00:00:00:01"].write_gatt_char.call_count == 2
+        assert clients["00:00:00:00:00:02"].write_gatt_char.call_count == 0
+
+    async def test_max_concurrency(self):
+        active, peak = [], []
+
+        async def operation(device):
+            active.append(device)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.remove(device)
+
+        fleet = DeviceFleet(
+            [Device(mocked_ble_device(f"00:00:00:00:00:0{i}")) for i in range(6)],
+            max_concurrency=2,
+        )
+
+        # pylint: disable=protected-access
+        result = await fleet._run(operation, None)
+
+        assert result.ok
+        assert max(peak) == 2
@@ -3,11 +3,13 @@
 
 import datetime
 import struct
+from unittest.mock import patch
 
 import freezegun
 from tzlocal import get_localzone
 
 from melnor_bluetooth.device import Frequency
+from melnor_bluetooth.utils.date import time_shift
 
 start_date = datetime.datetime(year=2023, month=6, day=5, tzinfo=get_localzone())
 
@@ -53,3 +55,73 @@ class TestFrequency:
         assert frequency.is_watering is True
         assert frequency.next_run_time == start_date.replace(hour=0, minute=0)
         assert frequency.schedule_end == start_date.replace(hour=0, minute=10)
+
+    async def test_dirty_tracking(self):
+        frequency = Frequency()
+
+        assert frequency.is_dirty is False
+
+        frequency.interval_hours = 6
+
+        assert frequency.is_dirty is True
+
+        frequency.mark_clean()
+
+        assert frequency.is_dirty is False
+
+        frequency.duration_minutes = 10
+        frequency.update_state(struct.pack(">BIHB", 0, 0, 0, 0))
+
+        assert frequency.is_dirty is False
+
+    @freezegun.freeze_time(start_date.replace(hour=1, minute=0))
+    async def test_schedule_computed_lazily(self):
+        frequency = Frequency()
+
+        with patch.object(
+            Frequency,
+            "_compute_dates",
+            autospec=True,
+            side_effect=Frequency._compute_dates,
+        ) as compute_dates:
+            frequency.duration_minutes = 10
+            frequency.interval_hours = 6
+            frequency.start_time = datetime.time(hour=0, minute=0)
+
+            assert compute_dates.call_count == 0
+
+            assert frequency.next_run_time == start_date.replace(hour=6, minute=0)
+            assert frequency.is_watering is False
+            assert frequency.schedule_end_timestamp == int(
+                start_date.replace(hour=6, minute=10).timestamp()
+            )
+
+            assert compute_dates.call_count == 1
+
+    async def test_schedule_recomputed_when_run_starts(self):
+        with freezegun.freeze_time(start_date.replace(hour=5, minute=59)) as frozen:
+            frequency = Frequency()
+            frequency.duration_minutes = 10
+            frequency.interval_hours = 6
+            frequency.start_time = datetime.time(hour=0, minute=0)
+
+            assert frequency.is_watering is False
+
+            frozen.move_to(start_date.replace(hour=6, minute=1))
+
+            assert frequency.is_watering is True
+            assert frequency.schedule_end == start_date.replace(hour=6, minute=10)
+
+    async def test_schedule_recomputed_when_offset_changes(self):
+        frequency = Frequency()
+        frequency.duration_minutes = 10
+        frequency.interval_hours = 6
+        frequency.start_time = datetime.time(hour=0, minute=0)
+
+        next_run = frequency.next_run_timestamp
+
+        with patch(
+            "melnor_bluetooth.models.frequency.date.time_shift",
+            return_value=time_shift() + 3600,
+        ):
+            assert frequency.next_run_timestamp != next_run
@@ -0,0 +1,56 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+from melnor_bluetooth.constants import EDEN, MELNOR
+from melnor_bluetooth.models.model_info import (
+    ModelInfo,
+    cache_model,
+    cached_model,
+    is_model_verified,
+    parse_advertisement,
+)
+
+
+class TestModelInfo:
+    def test_parse_advertisement(self):
+        model_info = parse_advertisement({13: b"\x59\x08"})
+
+        assert model_info is not None
+        assert model_info.model_number == "5908"
+        assert model_info.name == "93280"
+        assert model_info.brand == MELNOR
+        assert model_info.valve_count == 4
+        assert model_info.sensor is False
+
+    def test_parse_advertisement_rejects_unknown_data(self):
+        assert parse_advertisement({}) is None
+        assert parse_advertisement({13: b"\x59"}) is None
+        assert parse_advertisement({13: b"\x00\x00\x00\x00"}) is None
+
+    def test_from_name(self):
+        model_info = ModelInfo.from_name("25441")
+
+        assert model_info is not None
+        assert model_info.brand == EDEN
+        assert model_info.valve_count == 1
+        assert ModelInfo.from_name("11111") is None
+
+    def test_cache(self):
+        model_info = ModelInfo.from_model_number("5910")
+        assert model_info is not None
+
+        cache_model("00:00:00:00:00:01", model_info)
+
+        assert cached_model("00:00:00:00:00:01") == model_info
+        assert cached_model("00:00:00:00:00:02") is None
+
+    def test_verified(self):
+        model_info = ModelInfo.from_model_number("5910")
+        assert model_info is not None
+
+        cache_model("00:00:00:00:00:01", model_info, verified=True)
+        assert is_model_verified("00:00:00:00:00:01")
+
+        # An advertised model replaces the verified one and has to be checked again
+        cache_model("00:00:00:00:00:01", model_info)
+        assert not is_model_verified("00:00:00:00:00:01")
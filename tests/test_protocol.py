@@ -0,0 +1,72 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from melnor_bluetooth import protocol
+from melnor_bluetooth.constants import (
+    BATTERY_UUID,
+    MANUFACTURER_UUID,
+    VALVE_2_MODE_UUID,
+    VALVE_MANUAL_SETTINGS_UUID,
+    VALVE_MANUAL_STATES_UUID,
+    VALVE_ON_OFF_UUID,
+)
+
+
+class TestProtocol:
+    def test_manual_settings_round_trip(self):
+        settings = [(True, 5), (False, 10), (True, 15), (False, 20)]
+
+        payload = protocol.encode_manual_settings(settings)
+
+        assert payload == struct.pack(
+            ">?HH?HH?HH?HH", True, 5, 5, False, 10, 10, True, 15, 15, False, 20, 20
+        )
+        assert protocol.decode_manual_settings(payload) == settings
+
+    def test_manual_states(self):
+        payload = struct.pack(">BIBIBIBI", 1, 1000, 1, 0, 2, 2000, 0, 0)
+
+        with patch("melnor_bluetooth.protocol.date.time_shift", return_value=100):
+            assert protocol.decode_manual_states(payload) == [900, 0, 1900, 0]
+
+    def test_on_off_round_trip(self):
+        payload = protocol.encode_on_off([True, False, False, True])
+
+        assert payload == b"\x01\x00\x00\x01"
+        assert protocol.decode_on_off(payload) == (True, False, False, True)
+
+    def test_mode_round_trip(self):
+        payload = protocol.encode_mode((333333, 10, 24))
+
+        assert payload == struct.pack(">BIHB", 0, 333333, 10, 24)
+        assert protocol.decode_mode(payload) == (333333, 10, 24)
+
+    def test_updated_at(self):
+        assert protocol.encode_updated_at(700290000) == struct.pack(">I", 700290000)
+
+    def test_decode_dispatch(self):
+        assert protocol.decode(BATTERY_UUID, b"\x02\xa8") == 55
+        assert protocol.decode(VALVE_ON_OFF_UUID, b"\x00\x01\x00\x00") == (
+            False,
+            True,
+            False,
+            False,
+        )
+        assert (
+            protocol.decode(
+                VALVE_MANUAL_SETTINGS_UUID,
+                protocol.encode_manual_settings([(True, 1)] * 4),
+            )
+            == [(True, 1)] * 4
+        )
+        assert VALVE_MANUAL_STATES_UUID in protocol.DECODERS
+        assert protocol.MODE_UUID_VALVE_INDEX[VALVE_2_MODE_UUID] == 2
+
+    def test_decode_unknown_characteristic(self):
+        with pytest.raises(KeyError):
+            protocol.decode(MANUFACTURER_UUID, b"111110400")
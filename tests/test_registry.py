@@ -0,0 +1,192 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from melnor_bluetooth.connection import ConnectionPool
+from melnor_bluetooth.constants import BATTERY_UUID, MANUFACTURER_UUID
+from melnor_bluetooth.device import Device
+from melnor_bluetooth.models.model_info import cache_model, parse_advertisement
+from melnor_bluetooth.registry import DeviceRegistry, RegistryEntry
+from melnor_bluetooth.utils.ble import make_ble_device
+from melnor_bluetooth.utils.metrics import Metrics
+from tests.test_device_valves import (
+    mocked_bleak_client,
+    patch_establish_connection,
+    read_uuids,
+)
+from tests.test_fleet import mocked_ble_device
+from tests.test_scanner import MELNOR_DATA, advertisement_data
+
+MAC = "00:00:00:00:00:01"
+
+
+class TestDeviceRegistry:
+    async def test_record_and_reload(self, tmp_path):
+        path = str(tmp_path / "devices.json")
+        ble_device = mocked_ble_device(MAC)
+        ble_device.details = {"path": "/org/bluez/hci0/dev_00_00_00_00_00_01"}
+
+        with patch_establish_connection():
+            device = Device(ble_device)
+            await device.connect()
+
+        registry = DeviceRegistry(path)
+        registry.record(device)
+        registry.save()
+
+        entry = DeviceRegistry(path).get(MAC)
+
+        assert entry is not None
+        assert entry.model == "11111"
+        assert entry.valve_count == 4
+        assert entry.rssi is None
+        assert entry.path == "/org/bluez/hci0/dev_00_00_00_00_00_01"
+        assert entry.handles[BATTERY_UUID] == 0xEC08
+
+    async def test_device_uses_recorded_model(self, tmp_path):
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+        registry.record(Device(mocked_ble_device(MAC)))
+        entry = registry.get(MAC)
+        assert entry is not None
+        entry.model = "93101"
+        entry.valve_count = 2
+
+        bleak_client = mocked_bleak_client(manufacturer_bytes=b"931010200")
+        with patch_establish_connection(bleak_client):
+            device = registry.device(MAC)
+
+            assert device.ble_device.address == MAC
+            assert device.valve_count == 2
+
+            await device.connect()
+            await device.fetch_state()
+
+        assert device.model == "93101"
+        assert device.valve_count == 2
+        assert MANUFACTURER_UUID not in read_uuids(bleak_client)
+
+    async def test_advertised_model_not_recorded(self, tmp_path):
+        cache_model(MAC, parse_advertisement({13: b"\x59\x09"}))
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+
+        entry = registry.record(Device(mocked_ble_device(MAC)))
+
+        assert entry.model is None
+
+    async def test_save_is_atomic(self, tmp_path):
+        path = tmp_path / "devices.json"
+        registry = DeviceRegistry(str(path))
+        registry.record(Device(mocked_ble_device(MAC)))
+        registry.save()
+
+        with patch("json.dump", side_effect=ValueError):
+            registry.record(Device(mocked_ble_device("00:00:00:00:00:02")))
+            try:
+                registry.save()
+            except ValueError:
+                pass
+
+        assert [item["mac"] for item in json.loads(path.read_text())["devices"]] == [
+            MAC
+        ]
+        assert list(tmp_path.iterdir()) == [path]
+
+    async def test_corrupt_file_is_empty(self, tmp_path):
+        path = tmp_path / "devices.json"
+        path.write_text("{")
+
+        assert len(DeviceRegistry(str(path))) == 0
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            [],
+            {"version": 1, "devices": ["00:00:00:00:00:01"]},
+            {"version": 1, "devices": [{"name": "YM Timer"}]},
+            {"version": 1, "devices": [{"mac": MAC, "unknown": 1}, 5]},
+        ],
+    )
+    async def test_malformed_file_is_empty(self, tmp_path, data):
+        path = tmp_path / "devices.json"
+        path.write_text(json.dumps(data))
+
+        assert len(DeviceRegistry(str(path))) == 0
+
+    async def test_device_forwards_options(self, tmp_path):
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+        registry.record(Device(mocked_ble_device(MAC)))
+        metrics = Metrics()
+        pool = ConnectionPool(max_connections=1)
+        connector = AsyncMock()
+
+        device = registry.device(MAC, pool=pool, connector=connector, metrics=metrics)
+
+        assert device.metrics is metrics
+        assert device.pool is pool
+
+    async def test_device_resolves_recorded_handles(self, tmp_path):
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+        bleak_client = mocked_bleak_client()
+        with patch_establish_connection(bleak_client):
+            device = Device(mocked_ble_device(MAC))
+            await device.connect()
+            registry.record(device)
+            await device.disconnect()
+
+            device = registry.device(MAC)
+            bleak_client.services.get_characteristic.reset_mock()
+            await device.connect()
+            await device.fetch_state()
+
+        specifiers = [
+            call.args[0]
+            for call in bleak_client.services.get_characteristic.call_args_list
+        ]
+        assert specifiers
+        assert all(isinstance(specifier, int) for specifier in specifiers)
+
+    async def test_refresh_stale_entries(self, tmp_path):
+        registry = DeviceRegistry(str(tmp_path / "devices.json"))
+        registry.record(Device(mocked_ble_device(MAC)))
+        registry.record(Device(mocked_ble_device("00:00:00:00:00:02")))
+
+        stale = registry.get(MAC)
+        assert stale is not None
+        stale.updated_at = time.time() - 7200
+
+        async def scan_advertisements(addresses, scan_timeout_seconds):
+            assert addresses == [MAC]
+            path = "/org/bluez/hci0/dev_00_00_00_00_00_01"
+            yield make_ble_device(MAC, "YM Timer", {"path": path}), advertisement_data(
+                MELNOR_DATA, rssi=-40
+            )
+
+        with patch(
+            "melnor_bluetooth.registry.scan_advertisements", scan_advertisements
+        ):
+            task = registry.refresh_in_background(max_age_seconds=3600)
+            assert await task == [MAC]
+
+        assert stale.rssi == -40
+        assert stale.path == "/org/bluez/hci0/dev_00_00_00_00_00_01"
+        assert DeviceRegistry(registry.path).get(MAC) is not None
+
+
+class TestRegistryEntry:
+    def test_round_trip(self):
+        entry = RegistryEntry(MAC, model="93280", brand="Melnor", handles={"a": 3})
+
+        restored = RegistryEntry.from_dict(json.loads(json.dumps(entry.to_dict())))
+
+        assert restored.to_dict() == entry.to_dict()
+
+    def test_ble_device_without_path(self):
+        ble_device = RegistryEntry(MAC, name="YM Timer").to_ble_device()
+
+        assert ble_device.address == MAC
+        assert ble_device.details is None
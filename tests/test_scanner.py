@@ -1,3 +1,271 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import asyncio
+import datetime
+from typing import List, Tuple
+from unittest.mock import Mock, patch
+
+from bleak.backends.device import BLEDevice
+from bleak.backends.scanner import AdvertisementData
+from freezegun import freeze_time
+
+from melnor_bluetooth.models.model_info import ModelInfo, cache_model, cached_model
+from melnor_bluetooth.scanner import (
+    CHANGED_ADVERTISEMENT,
+    NEW_DEVICE,
+    AdvertisementCache,
+    scan,
+    scan_advertisements,
+    scanner,
+)
+from melnor_bluetooth.utils.ble import make_ble_device
+
+MELNOR_DATA = {13: b"\x59\x08"}
+OTHER_DATA = {47: b"\x00\x00\x00\x00\x00\x00\x00\x00"}
+
+
+def advertisement_data(manufacturer_data: dict, rssi: int = -60) -> AdvertisementData:
+    return AdvertisementData(
+        local_name="YM Timer",
+        manufacturer_data=manufacturer_data,
+        service_data={},
+        service_uuids=[],
+        tx_power=None,
+        rssi=rssi,
+        platform_data=(),
+    )
+
+
+def advertisement(
+    address: str, manufacturer_data: dict, delay: float = 0, rssi: int = -60
+) -> Tuple[float, BLEDevice, AdvertisementData]:
+    ble_device = make_ble_device(address, "YM Timer", None)
+
+    return delay, ble_device, advertisement_data(manufacturer_data, rssi)
+
+
+def patch_bleak_scanner(
+    advertisements: List[Tuple[float, BLEDevice, AdvertisementData]]
+):
+    """Replays the advertisements after the scanner starts"""
+
+    scanners = []
+
+    class FakeBleakScanner:
+        def __init__(self, detection_callback=None, **kwargs):
+            self.detection_callback = detection_callback
+            self.kwargs = kwargs
+            self.stopped = False
+            scanners.append(self)
+
+        async def start(self):
+            loop = asyncio.get_running_loop()
+            for delay, ble_device, advertisement_data in advertisements:
+                loop.call_later(
+                    delay, self.detection_callback, ble_device, advertisement_data
+                )
+
+        async def stop(self):
+            self.stopped = True
+
+    return patch("melnor_bluetooth.scanner.BleakScanner", FakeBleakScanner), scanners
+
+
+class TestAdvertisementCache:
+    def test_new_device(self):
+        cache = AdvertisementCache()
+
+        assert cache.event(*advertisement("00:00:00:00:00:01", MELNOR_DATA)[1:]) == (
+            NEW_DEVICE
+        )
+
+    def test_repeats_suppressed(self):
+        cache = AdvertisementCache()
+        _, ble_device, advertisement_data = advertisement(
+            "00:00:00:00:00:01", MELNOR_DATA
+        )
+
+        cache.event(ble_device, advertisement_data)
+
+        assert cache.event(ble_device, advertisement_data) is None
+
+    def test_changed_advertisement_rate_limited(self):
+        cache = AdvertisementCache(min_interval_seconds=5)
+        address = "00:00:00:00:00:01"
+
+        with freeze_time("2022-01-01") as frozen_time:
+            cache.event(*advertisement(address, MELNOR_DATA)[1:])
+
+            changed = advertisement(address, {13: b"\x59\x09"})[1:]
+            assert cache.event(*changed) is None
+
+            frozen_time.tick(datetime.timedelta(seconds=6))
+            assert cache.event(*changed) == CHANGED_ADVERTISEMENT
+            assert cache.event(*changed) is None
+
+    def test_lru_eviction(self):
+        cache = AdvertisementCache(max_size=2)
+
+        first = advertisement("00:00:00:00:00:01", MELNOR_DATA)[1:]
+        cache.event(*first)
+        cache.event(*advertisement("00:00:00:00:00:02", MELNOR_DATA)[1:])
+
+        # Seeing the first device again makes the second the least recently used
+        cache.event(*first)
+        cache.event(*advertisement("00:00:00:00:00:03", MELNOR_DATA)[1:])
+
+        assert len(cache) == 2
+        assert cache.event(*first) is None
+        assert (
+            cache.event(*advertisement("00:00:00:00:00:02", MELNOR_DATA)[1:])
+            == NEW_DEVICE
+        )
+
+
+class TestScanner:
+    async def test_reports_every_advertisement(self):
+        repeated = advertisement("00:00:00:00:00:01", MELNOR_DATA)
+        patcher, _ = patch_bleak_scanner([repeated, repeated])
+        callback = Mock()
+
+        with patcher:
+            await scanner(callback)
+            await asyncio.sleep(0.01)
+
+        assert callback.call_count == 2
+
+    async def test_filters_repeats_with_cache(self):
+        repeated = advertisement("00:00:00:00:00:01", MELNOR_DATA)
+        patcher, _ = patch_bleak_scanner([repeated, repeated])
+        callback = Mock()
+
+        with patcher:
+            await scanner(callback, advertisement_cache=AdvertisementCache())
+            await asyncio.sleep(0.01)
+
+        assert callback.call_count == 1
+
+
+class TestScan:
+    async def test_yields_unique_melnor_devices(self):
+        patcher, scanners = patch_bleak_scanner(
+            [
+                advertisement("00:00:00:00:00:01", MELNOR_DATA),
+                advertisement("00:00:00:00:00:01", MELNOR_DATA),
+                advertisement("00:00:00:00:00:02", OTHER_DATA),
+                advertisement("00:00:00:00:00:03", MELNOR_DATA),
+            ]
+        )
+
+        with patcher:
+            found = [
+                ble_device.address
+                async for ble_device in scan(scan_timeout_seconds=0.05)
+            ]
+
+        assert found == ["00:00:00:00:00:01", "00:00:00:00:00:03"]
+        assert scanners[0].stopped is True
+
+    async def test_caches_advertised_model(self):
+        patcher, _ = patch_bleak_scanner(
+            [advertisement("00:00:00:00:00:01", MELNOR_DATA)]
+        )
+
+        with patcher:
+            async for _ in scan(count=1, scan_timeout_seconds=0.05):
+                pass
+
+        model_info = cached_model("00:00:00:00:00:01")
+        assert model_info is not None
+        assert model_info.model_number == "5908"
+
+    async def test_keeps_verified_model(self):
+        verified = ModelInfo.from_model_number("5910")
+        assert verified is not None
+        cache_model("00:00:00:00:00:01", verified, verified=True)
+
+        patcher, _ = patch_bleak_scanner(
+            [advertisement("00:00:00:00:00:01", MELNOR_DATA)]
+        )
+
+        with patcher:
+            async for _ in scan(count=1, scan_timeout_seconds=0.05):
+                pass
+
+        assert cached_model("00:00:00:00:00:01") is verified
+
+    async def test_scans_with_adapter(self):
+        patcher, scanners = patch_bleak_scanner([])
+
+        with patcher:
+            async for _ in scan(scan_timeout_seconds=0.01, adapter="hci1"):
+                pass
+            async for _ in scan(scan_timeout_seconds=0.01):
+                pass
+
+        assert scanners[0].kwargs == {"adapter": "hci1"}
+        assert scanners[1].kwargs == {}
+
+    async def test_stops_when_addresses_found(self):
+        patcher, scanners = patch_bleak_scanner(
+            [
+                advertisement("00:00:00:00:00:01", MELNOR_DATA),
+                advertisement("00:00:00:00:00:02", MELNOR_DATA, delay=0.01),
+                advertisement("00:00:00:00:00:03", MELNOR_DATA, delay=0.02),
+            ]
+        )
+
+        with patcher:
+            started = asyncio.get_running_loop().time()
+            found = [
+                ble_device.address
+                async for ble_device in scan(
+                    addresses=["00:00:00:00:00:02"], scan_timeout_seconds=5
+                )
+            ]
+            elapsed = asyncio.get_running_loop().time() - started
+
+        assert found == ["00:00:00:00:00:02"]
+        assert elapsed < 1
+        assert scanners[0].stopped is True
+
+    async def test_stops_at_count(self):
+        patcher, _ = patch_bleak_scanner(
+            [
+                advertisement("00:00:00:00:00:01", MELNOR_DATA),
+                advertisement("00:00:00:00:00:02", MELNOR_DATA),
+                advertisement("00:00:00:00:00:03", MELNOR_DATA),
+            ]
+        )
+
+        with patcher:
+            found = [
+                ble_device.address
+                async for ble_device in scan(count=2, scan_timeout_seconds=5)
+            ]
+
+        assert found == ["00:00:00:00:00:01", "00:00:00:00:00:02"]
+
+    async def test_yields_advertisements(self):
+        patcher, _ = patch_bleak_scanner(
+            [
+                advertisement("00:00:00:00:00:01", MELNOR_DATA, rssi=-70),
+                advertisement("00:00:00:00:00:02", MELNOR_DATA, rssi=-40),
+            ]
+        )
+
+        with patcher:
+            found = [
+                (ble_device.address, data.rssi)
+                async for ble_device, data in scan_advertisements(
+                    count=2, scan_timeout_seconds=5
+                )
+            ]
+
+        assert found == [("00:00:00:00:00:01", -70), ("00:00:00:00:00:02", -40)]
+
+
 # import asyncio
 # from typing import Callable, Dict, Type, TypedDict
 
@@ -0,0 +1,133 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import datetime
+
+import pytest
+from tzlocal import get_localzone
+
+from melnor_bluetooth import protocol
+from melnor_bluetooth.constants import VALVE_ON_OFF_UUID
+from melnor_bluetooth.device import Valve
+from melnor_bluetooth.utils import date
+
+np = pytest.importorskip("numpy")
+
+# pylint: disable=wrong-import-position
+from melnor_bluetooth.schedule import project_schedules  # noqa: E402
+
+start_date = datetime.datetime(year=2023, month=6, day=5, tzinfo=get_localzone())
+
+
+def scheduled_valve(
+    identifier: int,
+    start: datetime.datetime,
+    interval_hours: int,
+    duration_minutes: int,
+    enabled: bool = True,
+) -> Valve:
+    valve = Valve(identifier, None)
+    valve.frequency.update_state(
+        protocol.encode_mode(
+            (date.from_start_time(start), duration_minutes, interval_hours)
+        )
+    )
+    valve.update_state(protocol.encode_on_off([enabled] * 4), VALVE_ON_OFF_UUID)
+
+    return valve
+
+
+class TestScheduleProjection:
+    async def test_projects_every_run(self):
+        valve = scheduled_valve(0, start_date.replace(hour=0), 6, 10)
+
+        projection = project_schedules(
+            [valve], start_date, start_date + datetime.timedelta(days=1)
+        )
+
+        assert len(projection) == 4
+        assert list(projection.starts) == [
+            int(start_date.replace(hour=hour).timestamp()) for hour in (0, 6, 12, 18)
+        ]
+        assert list(projection.ends - projection.starts) == [600] * 4
+
+    async def test_matches_frequency_next_run(self):
+        valve = scheduled_valve(0, start_date.replace(hour=3, minute=15), 8, 30)
+        now = datetime.datetime.now(tz=get_localzone())
+
+        projection = project_schedules([valve], now, now + datetime.timedelta(days=2))
+
+        assert projection.starts[0] == valve.frequency.next_run_timestamp
+
+    async def test_run_overlapping_window_start(self):
+        valve = scheduled_valve(0, start_date.replace(hour=0), 24, 60)
+
+        projection = project_schedules(
+            [valve],
+            start_date.replace(hour=0, minute=30),
+            start_date.replace(hour=12),
+        )
+
+        assert list(projection.starts) == [int(start_date.timestamp())]
+
+    async def test_disabled_valves_skipped(self):
+        valves = [
+            scheduled_valve(0, start_date, 24, 10),
+            scheduled_valve(1, start_date, 24, 10, enabled=False),
+        ]
+        window = (start_date, start_date + datetime.timedelta(days=2))
+
+        assert set(project_schedules(valves, *window).zones) == {0}
+        assert set(project_schedules(valves, *window, include_disabled=True).zones) == {
+            0,
+            1,
+        }
+
+    async def test_watering_at(self):
+        valves = [
+            scheduled_valve(0, start_date.replace(hour=0), 6, 30),
+            scheduled_valve(1, start_date.replace(hour=0, minute=20), 12, 30),
+            scheduled_valve(2, start_date.replace(hour=1), 24, 10),
+        ]
+
+        projection = project_schedules(
+            valves, start_date, start_date + datetime.timedelta(days=1)
+        )
+
+        assert list(projection.watering_at(start_date.replace(minute=25))) == [0, 1]
+        assert projection.valves_watering_at(start_date.replace(hour=1)) == [valves[2]]
+        assert len(projection.watering_at(start_date.replace(hour=2))) == 0
+
+    async def test_minutes_per_day(self):
+        valves = [
+            scheduled_valve(0, start_date.replace(hour=6), 12, 10),
+            # Crosses midnight, each day gets the 30 minute tail of the previous
+            # run and the 30 minute head of its own
+            scheduled_valve(1, start_date.replace(hour=23, minute=30), 24, 60),
+        ]
+
+        days, minutes = project_schedules(
+            valves, start_date, start_date + datetime.timedelta(days=2)
+        ).minutes_per_day(get_localzone())
+
+        assert list(days) == [
+            int(start_date.timestamp()),
+            int((start_date + datetime.timedelta(days=1)).timestamp()),
+        ]
+        assert minutes.tolist() == [[20, 20], [60, 60]]
+
+    async def test_minutes_per_day_long_runs(self):
+        # The device accepts runs longer than the app's 6 hour limit
+        valve = scheduled_valve(0, start_date.replace(hour=12), 168, 48 * 60)
+
+        _, minutes = project_schedules(
+            [valve], start_date, start_date + datetime.timedelta(days=4)
+        ).minutes_per_day(get_localzone())
+
+        assert minutes.tolist() == [[720, 1440, 720, 0]]
+
+    async def test_empty(self):
+        projection = project_schedules([], start_date, start_date)
+
+        assert len(projection) == 0
+        assert projection.minutes_per_day()[1].shape == (0, 0)
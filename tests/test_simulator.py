@@ -0,0 +1,114 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import time
+
+import pytest
+
+from melnor_bluetooth.connection import ConnectionPool
+from melnor_bluetooth.constants import BATTERY_UUID
+from melnor_bluetooth.fleet import DeviceFleet
+from melnor_bluetooth.protocol import decode
+from melnor_bluetooth.simulator import SimulatedBackend, SimulatedTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+class TestSimulatedTimer:
+    @pytest.mark.parametrize("percent", [0, 1, 30, 55, 99, 100])
+    def test_battery_round_trip(self, percent):
+        timer = SimulatedTimer("00:00:00:00:00:01", battery=percent)
+
+        assert decode(BATTERY_UUID, timer.read(BATTERY_UUID)) == percent
+
+    def test_unknown_model(self):
+        with pytest.raises(ValueError):
+            SimulatedTimer("00:00:00:00:00:01", model_number="0000")
+
+    async def test_battery_drains_while_watering(self):
+        clock = FakeClock()
+        timer = SimulatedTimer(
+            "00:00:00:00:00:01",
+            battery=50,
+            battery_drain_per_watering_hour=1,
+            battery_drain_per_operation=0,
+            clock=clock,
+        )
+        timer.manual[0] = (True, 120)
+        timer.end_times[0] = int(clock.now) + 7200
+
+        clock.now += 3600
+        await timer.operation()
+
+        assert timer.battery == pytest.approx(49)
+
+
+class TestSimulatedBackend:
+    async def test_fleet_fetch(self):
+        backend = SimulatedBackend(latency_seconds=0.001, jitter_seconds=0.001)
+        for _ in range(50):
+            backend.add_timer(battery=55, battery_drain_per_operation=0)
+
+        fleet = DeviceFleet(backend.devices(), max_concurrency=50)
+        result = await fleet.fetch_all()
+
+        assert result.ok
+        assert len(fleet) == 50
+        assert all(device.battery_level == 55 for device in fleet)
+        assert all(device.model == "93280" for device in fleet)
+
+    async def test_manual_watering_counts_down(self):
+        clock = FakeClock()
+        backend = SimulatedBackend(clock=clock)
+        timer = backend.add_timer("00:00:00:00:00:01", model_number="5910")
+        device = backend.device(timer.mac)
+
+        await device.connect()
+        await device.zone1.set_manual_watering_minutes(5)
+        await device.zone1.set_is_watering(True)
+
+        assert timer.watering_valves() == [0]
+
+        notified = []
+        await device.start_notify(notified.append)
+
+        clock.now += 6 * 60
+        timer.tick()
+
+        assert device.valve_count == 2
+        assert device.zone1.is_watering is False
+        assert timer.watering_valves() == []
+        assert notified == [device, device]
+
+    async def test_failures(self):
+        backend = SimulatedBackend(failure_rate=1, seed=1)
+        device = backend.device(backend.add_timer().mac)
+
+        await device.connect(retry_attempts=3)
+
+        assert device.is_connected is False
+
+    async def test_connection_limit(self):
+        backend = SimulatedBackend(connection_limit=2)
+        devices = [backend.device(backend.add_timer().mac) for _ in range(3)]
+
+        for device in devices:
+            await device.connect(retry_attempts=1)
+
+        assert [device.is_connected for device in devices] == [True, True, False]
+
+        pool = ConnectionPool(max_connections=2)
+        backend = SimulatedBackend(connection_limit=2)
+        devices = [backend.device(backend.add_timer().mac, pool=pool) for _ in range(3)]
+
+        for device in devices:
+            await device.connect(retry_attempts=1)
+
+        assert [device.is_connected for device in devices] == [False, True, True]
+        assert backend.connections == 2
@@ -0,0 +1,27 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import warnings
+
+from melnor_bluetooth.utils.ble import advertisement_rssi, make_ble_device
+from tests.test_scanner import MELNOR_DATA, advertisement_data
+
+
+class TestMakeBleDevice:
+    def test_builds_device_without_warnings(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            ble_device = make_ble_device("00:00:00:00:00:01", "YM Timer", None)
+
+        assert ble_device.address == "00:00:00:00:00:01"
+        assert ble_device.name == "YM Timer"
+        assert ble_device.details is None
+
+
+class TestAdvertisementRssi:
+    def test_rssi_from_advertisement(self):
+        ble_device = make_ble_device("00:00:00:00:00:01", "YM Timer", None)
+
+        assert (
+            advertisement_rssi(ble_device, advertisement_data(MELNOR_DATA, -55)) == -55
+        )
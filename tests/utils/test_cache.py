@@ -0,0 +1,56 @@
+import datetime
+
+from freezegun import freeze_time
+
+from melnor_bluetooth.utils.cache import ReadCache
+
+
+class TestReadCache:
+    def test_unread_is_stale(self):
+        cache = ReadCache({"a": 10})
+
+        assert cache.is_fresh("a") is False
+
+    def test_fresh_until_ttl(self):
+        cache = ReadCache({"a": 10})
+
+        with freeze_time("2022-01-01") as frozen_time:
+            cache.mark("a")
+
+            assert cache.is_fresh("a") is True
+
+            frozen_time.tick(datetime.timedelta(seconds=11))
+
+            assert cache.is_fresh("a") is False
+
+    def test_ttl_override(self):
+        cache = ReadCache({"a": 0})
+        cache.mark("a")
+
+        assert cache.is_fresh("a") is False
+        assert cache.is_fresh("a", 10) is True
+
+    def test_default_ttl(self):
+        cache = ReadCache(default_ttl=0)
+        cache.mark("a")
+
+        assert cache.ttl("a") == 0
+        assert cache.is_fresh("a") is False
+
+        cache.set_ttl("a", 10)
+
+        assert cache.is_fresh("a") is True
+
+    def test_invalidate(self):
+        cache = ReadCache({"a": 10, "b": 10})
+        cache.mark("a")
+        cache.mark("b")
+
+        cache.invalidate("a")
+
+        assert cache.is_fresh("a") is False
+        assert cache.is_fresh("b") is True
+
+        cache.invalidate()
+
+        assert cache.is_fresh("b") is False
@@ -1,4 +1,5 @@
 from datetime import datetime
+from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
 from freezegun import freeze_time
@@ -25,3 +26,34 @@ class TestDateTester:
     @freeze_time(no_dst)
     def test_get_timestamp(self):
         assert date.get_timestamp(ZoneInfo("UTC")) == 700290000
+
+    def test_time_shift_is_cached(self):
+        date._SHIFT_CACHE.clear()  # pylint: disable=protected-access
+
+        with freeze_time(no_dst), patch.object(
+            date, "_time_shift", wraps=date._time_shift  # pylint: disable=W0212
+        ) as computed:
+            first = date.time_shift(tz)
+            second = date.time_shift(tz)
+
+        assert first == second
+        assert computed.call_count == 1
+
+    def test_time_shift_recomputed_after_transition(self):
+        date._SHIFT_CACHE.clear()  # pylint: disable=protected-access
+
+        with freeze_time(datetime(2022, 3, 13, 1, 0, 0, tzinfo=tz)) as frozen_time:
+            with patch.object(
+                date, "_time_shift", wraps=date._time_shift  # pylint: disable=W0212
+            ) as computed:
+                date.time_shift(tz)
+                frozen_time.move_to(datetime(2022, 3, 13, 4, 0, 0, tzinfo=tz))
+                date.time_shift(tz)
+
+        assert computed.call_count == 2
+
+    def test_next_transition(self):
+        # pylint: disable=protected-access
+        transition = date._next_transition(no_dst.timestamp(), (tz,))
+
+        assert transition == datetime(2022, 3, 13, 3, 0, 0, tzinfo=tz).timestamp()
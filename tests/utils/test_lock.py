@@ -0,0 +1,191 @@
+import asyncio
+
+import pytest
+
+from melnor_bluetooth.utils.lock import (
+    BluetoothLock,
+    LockProfiler,
+    bluetooth_lock,
+    set_adapter_concurrency,
+    set_lock_profiler,
+)
+
+
+async def _hold(lock: BluetoothLock, active: list, peak: list):
+    async with lock:
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+
+
+class TestBluetoothLock:
+    async def test_devices_run_in_parallel(self):
+        active, peak = [], []
+
+        await asyncio.gather(*[_hold(BluetoothLock(), active, peak) for _ in range(3)])
+
+        assert max(peak) == 3
+
+    async def test_same_device_is_serialized(self):
+        lock = BluetoothLock()
+        active, peak = [], []
+
+        await asyncio.gather(*[_hold(lock, active, peak) for _ in range(3)])
+
+        assert max(peak) == 1
+
+    async def test_adapter_concurrency_limit(self):
+        set_adapter_concurrency(2, "hci9")
+        active, peak = [], []
+
+        try:
+            await asyncio.gather(
+                *[_hold(BluetoothLock("hci9"), active, peak) for _ in range(4)]
+            )
+        finally:
+            set_adapter_concurrency(None, "hci9")
+
+        assert max(peak) == 2
+
+    async def test_adapter_concurrency_limit_changed(self):
+        active, peak = [], []
+
+        try:
+            set_adapter_concurrency(3, "hci9")
+            await asyncio.gather(
+                *[_hold(BluetoothLock("hci9"), active, peak) for _ in range(4)]
+            )
+            assert max(peak) == 3
+
+            peak.clear()
+            set_adapter_concurrency(1, "hci9")
+            await asyncio.gather(
+                *[_hold(BluetoothLock("hci9"), active, peak) for _ in range(4)]
+            )
+            assert max(peak) == 1
+        finally:
+            set_adapter_concurrency(None, "hci9")
+
+    def test_adapter_concurrency_limit_outside_event_loop(self):
+        set_adapter_concurrency(1, "hci9")
+
+        async def hold_all(active: list, peak: list):
+            await asyncio.gather(
+                *[_hold(BluetoothLock("hci9"), active, peak) for _ in range(2)]
+            )
+
+        try:
+            # The limit applies in every event loop, not just the first one
+            for _ in range(2):
+                active: list = []
+                peak: list = []
+                asyncio.run(hold_all(active, peak))
+
+                assert max(peak) == 1
+        finally:
+            set_adapter_concurrency(None, "hci9")
+
+    async def test_locked(self):
+        lock = BluetoothLock()
+
+        assert lock.locked() is False
+
+        async with lock:
+            assert lock.locked() is True
+
+        assert lock.locked() is False
+
+    async def test_reentry_raises(self):
+        lock = BluetoothLock(name="00:00:00:00:00:01")
+
+        async with lock:
+            with pytest.raises(RuntimeError):
+                await lock.acquire()
+
+            assert lock.queue_depth == 1
+
+        # Other tasks still wait for the lock instead of raising
+        async with lock:
+            task = asyncio.create_task(lock.acquire())
+            await asyncio.sleep(0.01)
+            assert task.done() is False
+
+        await task
+        lock.release()
+        assert lock.locked() is False
+
+
+@pytest.fixture
+def profiler():
+    profiler = LockProfiler(hold_warning_seconds=None)
+    set_lock_profiler(profiler)
+    yield profiler
+    set_lock_profiler(None)
+
+
+class TestLockProfiler:
+    async def test_records_async_with_call_site(self, profiler):
+        lock = BluetoothLock(name="00:00:00:00:00:01")
+
+        async with lock:
+            assert "test_records_async_with_call_site" in lock.holder
+
+        assert lock.holder is None
+
+        (record,) = profiler.records
+        assert record.name == "00:00:00:00:00:01"
+        assert "test_records_async_with_call_site (test_lock.py:" in record.site
+        assert record.queue_depth == 0
+
+    async def test_records_decorated_function(self, profiler):
+        class Owner:
+            lock = BluetoothLock()
+
+            @bluetooth_lock
+            async def operation(self):
+                await asyncio.sleep(0.01)
+
+        await Owner().operation()
+
+        (site,) = profiler.sites
+        assert site.startswith(
+            "TestLockProfiler.test_records_decorated_function.<locals>.Owner.operation"
+        )
+        assert profiler.sites[site].hold_max >= 0.01
+
+    async def test_queue_depth_and_wait(self, profiler):
+        lock = BluetoothLock()
+
+        await asyncio.gather(*[_hold(lock, [], []) for _ in range(3)])
+
+        assert [record.queue_depth for record in profiler.records] == [0, 1, 2]
+        assert profiler.records[2].wait_seconds >= 0.02
+        assert lock.queue_depth == 0
+
+        (stats,) = profiler.sites.values()
+        assert stats.count == 3
+        assert stats.queue_depth_max == 2
+
+    async def test_hold_warning(self, profiler, caplog):
+        profiler.hold_warning_seconds = 0.005
+        lock = BluetoothLock(name="00:00:00:00:00:01")
+
+        await _hold(lock, [], [])
+
+        assert "held the bluetooth lock of 00:00:00:00:00:01" in caplog.text
+
+    async def test_report(self, profiler):
+        lock = BluetoothLock()
+
+        await _hold(lock, [], [])
+
+        report = profiler.report()
+        assert report.splitlines()[0].startswith("site")
+        assert "_hold (test_lock.py:" in report.splitlines()[1]
+
+    async def test_disabled(self):
+        lock = BluetoothLock()
+
+        async with lock:
+            assert lock.holder is None
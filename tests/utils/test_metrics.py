@@ -0,0 +1,145 @@
+# pylint: disable=missing-function-docstring
+# pylint: disable=missing-class-docstring
+
+import asyncio
+
+from melnor_bluetooth.constants import BATTERY_UUID, VALVE_MANUAL_SETTINGS_UUID
+from melnor_bluetooth.simulator import SimulatedBackend
+from melnor_bluetooth.utils.lock import BluetoothLock
+from melnor_bluetooth.utils.metrics import (
+    CONNECT_ATTEMPTS,
+    CONNECT_FAILURES,
+    CONNECT_SECONDS,
+    CONNECTS,
+    LOCK_WAIT_SECONDS,
+    READ_BYTES,
+    READ_SECONDS,
+    WRITE_BYTES,
+    WRITE_SECONDS,
+    Histogram,
+    Metrics,
+)
+
+
+class TestHistogram:
+    def test_empty(self):
+        histogram = Histogram()
+
+        assert histogram.mean is None
+        assert histogram.percentile(50) is None
+        assert histogram.to_dict()["min"] is None
+
+    def test_observe(self):
+        histogram = Histogram((1, 2, 5))
+
+        for value in (0.5, 1.5, 1.5, 4, 9):
+            histogram.observe(value)
+
+        assert histogram.count == 5
+        assert histogram.buckets == [1, 2, 1, 1]
+        assert histogram.min == 0.5
+        assert histogram.max == 9
+        assert histogram.mean == 16.5 / 5
+
+    def test_percentile_uses_bucket_bounds(self):
+        histogram = Histogram((1, 2, 5))
+
+        for value in (0.5, 1.5, 1.5, 4, 9):
+            histogram.observe(value)
+
+        assert histogram.percentile(50) == 2
+        assert histogram.percentile(80) == 5
+        assert histogram.percentile(99) == 9
+
+    def test_percentile_capped_by_max(self):
+        histogram = Histogram((1, 2, 5))
+        histogram.observe(3)
+
+        assert histogram.percentile(50) == 3
+
+
+class TestMetrics:
+    def test_labels_are_separate(self):
+        metrics = Metrics()
+
+        metrics.increment(READ_BYTES, 2, BATTERY_UUID)
+        metrics.increment(READ_BYTES, 5, VALVE_MANUAL_SETTINGS_UUID)
+        metrics.increment(READ_BYTES, 3, BATTERY_UUID)
+
+        assert metrics.counter(READ_BYTES, BATTERY_UUID).value == 5
+        assert metrics.snapshot()["counters"][READ_BYTES] == {
+            BATTERY_UUID: 5,
+            VALVE_MANUAL_SETTINGS_UUID: 5,
+        }
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.observe(CONNECT_SECONDS, 1)
+
+        metrics.reset()
+
+        assert metrics.snapshot() == {"counters": {}, "histograms": {}}
+
+    async def test_lock_wait(self):
+        metrics = Metrics()
+        lock = BluetoothLock(metrics=metrics)
+
+        async def hold():
+            async with lock:
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(hold(), hold())
+
+        histogram = metrics.histogram(LOCK_WAIT_SECONDS)
+        assert histogram.count == 2
+        assert histogram.max >= 0.02
+
+
+class TestDeviceMetrics:
+    async def test_disabled_by_default(self):
+        backend = SimulatedBackend()
+        device = backend.device(backend.add_timer().mac)
+
+        await device.connect()
+        await device.fetch_state()
+
+        assert device.metrics is None
+        assert device.lock.metrics is None
+
+    async def test_connect(self):
+        metrics = Metrics()
+        backend = SimulatedBackend()
+        device = backend.device(backend.add_timer().mac, metrics=metrics)
+
+        await device.connect()
+
+        assert metrics.counter(CONNECTS).value == 1
+        assert metrics.histogram(CONNECT_ATTEMPTS).sum == 1
+        assert metrics.histogram(CONNECT_SECONDS).count == 1
+
+    async def test_connect_failure(self):
+        metrics = Metrics()
+        backend = SimulatedBackend(failure_rate=1)
+        device = backend.device(backend.add_timer().mac, metrics=metrics)
+
+        await device.connect(retry_attempts=3)
+
+        assert not device.is_connected
+        assert metrics.counter(CONNECT_FAILURES).value == 1
+        assert metrics.counter(CONNECTS).value == 0
+        assert metrics.histogram(CONNECT_ATTEMPTS).sum == 3
+
+    async def test_reads_and_writes(self):
+        metrics = Metrics()
+        backend = SimulatedBackend()
+        device = backend.device(backend.add_timer().mac, metrics=metrics)
+
+        await device.connect()
+        await device.fetch_state()
+        await device.zone1.set_is_watering(True)
+
+        assert metrics.histogram(READ_SECONDS, BATTERY_UUID).count == 1
+        assert metrics.counter(READ_BYTES, BATTERY_UUID).value == 2
+        assert metrics.histogram(WRITE_SECONDS, VALVE_MANUAL_SETTINGS_UUID).count == 1
+        assert metrics.counter(WRITE_BYTES, VALVE_MANUAL_SETTINGS_UUID).value == 20
+        assert metrics.histogram(LOCK_WAIT_SECONDS).count == 3